@@ -4,7 +4,7 @@ This module provides a client interface to interact with the Open Notebook API.
 """
 
 import os
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import httpx
 from loguru import logger
@@ -162,6 +162,8 @@ class APIClient:
         description: str,
         prompt: str,
         apply_default: bool = False,
+        execution_mode: str = "auto",
+        section_tokens: Optional[int] = None,
     ) -> Dict:
         """Create a new transformation."""
         data = {
@@ -170,6 +172,8 @@ class APIClient:
             "description": description,
             "prompt": prompt,
             "apply_default": apply_default,
+            "execution_mode": execution_mode,
+            "section_tokens": section_tokens,
         }
         return self._make_request("POST", "/api/transformations", json=data)
 
@@ -188,13 +192,18 @@ class APIClient:
         return self._make_request("DELETE", f"/api/transformations/{transformation_id}")
 
     def execute_transformation(
-        self, transformation_id: str, input_text: str, model_id: str
+        self,
+        transformation_id: str,
+        input_text: str,
+        model_id: str,
+        bypass_cache: bool = False,
     ) -> Dict:
         """Execute a transformation on input text."""
         data = {
             "transformation_id": transformation_id,
             "input_text": input_text,
             "model_id": model_id,
+            "bypass_cache": bypass_cache,
         }
         # Use extended timeout for transformation operations
         return self._make_request(
@@ -289,13 +298,17 @@ class APIClient:
         transformations: Optional[List[str]] = None,
         embed: bool = False,
         delete_source: bool = False,
+        async_processing: bool = False,
+        force: bool = False,
     ) -> Dict:
-        """Create a new source."""
+        """Create a new source. With async_processing, returns a job ID instead."""
         data = {
             "notebook_id": notebook_id,
             "type": source_type,
             "embed": embed,
             "delete_source": delete_source,
+            "async_processing": async_processing,
+            "force": force,
         }
         if url:
             data["url"] = url
@@ -347,10 +360,17 @@ class APIClient:
         )
 
     def create_source_insight(
-        self, source_id: str, transformation_id: str, model_id: Optional[str] = None
+        self,
+        source_id: str,
+        transformation_id: str,
+        model_id: Optional[str] = None,
+        bypass_cache: bool = False,
     ) -> Dict:
         """Create a new insight for a source by running a transformation."""
-        data = {"transformation_id": transformation_id}
+        data: Dict[str, Any] = {
+            "transformation_id": transformation_id,
+            "bypass_cache": bypass_cache,
+        }
         if model_id:
             data["model_id"] = model_id
         return self._make_request(
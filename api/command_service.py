@@ -4,6 +4,7 @@ from loguru import logger
 from surreal_commands import get_command_status, submit_command
 
 from api.models import ErrorResponse
+from open_notebook.progress import get_command_progress
 
 
 class CommandService:
@@ -21,7 +22,10 @@ class CommandService:
             # Ensure command modules are imported before submitting
             # This is needed because submit_command validates against local registry
             try:
+                import commands.chat_commands  # noqa: F401
+                import commands.embedding_commands  # noqa: F401
                 import commands.podcast_commands  # noqa: F401
+                import commands.source_commands  # noqa: F401
             except ImportError as import_err:
                 logger.error(f"Failed to import command modules: {import_err}")
                 raise ValueError("Command modules not available")
@@ -48,6 +52,10 @@ class CommandService:
         """Get status of any command job"""
         try:
             status = await get_command_status(job_id)
+            progress = getattr(status, "progress", None) if status else None
+            if status and progress is None:
+                # Commands such as process_source store progress on the record
+                progress = await get_command_progress(job_id)
             return {
                 "job_id": job_id,
                 "status": status.status if status else "unknown",
@@ -61,7 +69,7 @@ class CommandService:
                 "updated": str(status.updated)
                 if status and hasattr(status, "updated") and status.updated
                 else None,
-                "progress": getattr(status, "progress", None) if status else None,
+                "progress": progress,
             }
         except Exception as e:
             logger.error(f"Failed to get command status: {e}")
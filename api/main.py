@@ -1,13 +1,19 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.auth import PasswordAuthMiddleware
-from api.routers import commands as commands_router
+from api.pagination import NEXT_CURSOR_HEADER
 from api.routers import (
+    chat,
     context,
     embedding,
     episode_profiles,
+    ingestion,
     insights,
+    metrics,
     models,
     notebooks,
     notes,
@@ -18,12 +24,16 @@ from api.routers import (
     speaker_profiles,
     transformations,
 )
+from api.routers import commands as commands_router
 
 # Import commands to register them in the API process
 try:
     from loguru import logger
 
+    import commands.chat_commands
+    import commands.embedding_commands
     import commands.podcast_commands
+    import commands.source_commands
 
     logger.info("Commands imported in API process")
 except Exception as e:
@@ -31,10 +41,54 @@ except Exception as e:
 
     logger.error(f"Failed to import commands in API process: {e}")
 
+
+async def _ensure_vector_indexes() -> None:
+    from open_notebook.domain.vector_index import ensure_vector_indexes
+
+    try:
+        await ensure_vector_indexes()
+    except Exception as e:
+        logger.error(f"Failed to set up vector indexes: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from open_notebook.database.repository import close_db_pool, init_db_pool
+    from open_notebook.domain.vector_backends import get_vector_backend
+    from open_notebook.executors import shutdown_executors
+    from open_notebook.graphs.chat import close_async_graph
+
+    try:
+        await init_db_pool()
+    except Exception as e:
+        # Requests fall back to per-call connections until the DB is reachable
+        logger.error(f"Failed to start database connection pool: {e}")
+    # Building the indexes can take long on large tables; searches use exact
+    # scans until they are ready
+    index_task = asyncio.create_task(_ensure_vector_indexes())
+    try:
+        await get_vector_backend().load()
+    except Exception as e:
+        logger.error(f"Failed to load vector search backend: {e}")
+    yield
+    index_task.cancel()
+    try:
+        await get_vector_backend().close()
+    except Exception as e:
+        logger.error(f"Failed to close vector search backend: {e}")
+    try:
+        await close_async_graph()
+    except Exception as e:
+        logger.error(f"Failed to close chat checkpointer: {e}")
+    await close_db_pool()
+    shutdown_executors()
+
+
 app = FastAPI(
     title="Open Notebook API",
     description="API for Open Notebook - Research Assistant",
     version="0.2.2",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -44,6 +98,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Add password authentication middleware
@@ -58,12 +113,15 @@ app.include_router(notes.router, prefix="/api", tags=["notes"])
 app.include_router(embedding.router, prefix="/api", tags=["embedding"])
 app.include_router(settings.router, prefix="/api", tags=["settings"])
 app.include_router(context.router, prefix="/api", tags=["context"])
+app.include_router(chat.router, prefix="/api", tags=["chat"])
+app.include_router(ingestion.router, prefix="/api", tags=["sources"])
 app.include_router(sources.router, prefix="/api", tags=["sources"])
 app.include_router(insights.router, prefix="/api", tags=["insights"])
 app.include_router(commands_router.router, prefix="/api", tags=["commands"])
 app.include_router(podcasts.router, prefix="/api", tags=["podcasts"])
 app.include_router(episode_profiles.router, prefix="/api", tags=["episode-profiles"])
 app.include_router(speaker_profiles.router, prefix="/api", tags=["speaker-profiles"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 
 @app.get("/")
@@ -16,13 +16,24 @@ class NotebookUpdate(BaseModel):
 
 class NotebookResponse(BaseModel):
     id: str
-    name: str
-    description: str
+    name: Optional[str]
+    description: Optional[str]
     archived: bool
     created: str
     updated: str
 
 
+class NotebookListResponse(BaseModel):
+    """A notebook in GET /notebooks; columns left out of `fields` are null."""
+
+    id: str
+    name: Optional[str]
+    description: Optional[str]
+    archived: Optional[bool]
+    created: Optional[str]
+    updated: Optional[str]
+
+
 # Search models
 class SearchRequest(BaseModel):
     query: str = Field(..., description="Search query")
@@ -44,11 +55,109 @@ class AskRequest(BaseModel):
     strategy_model: str = Field(..., description="Model ID for query strategy")
     answer_model: str = Field(..., description="Model ID for individual answers")
     final_answer_model: str = Field(..., description="Model ID for final answer")
+    stream_answers: bool = Field(
+        False,
+        description="Also stream the answer of each search token by token "
+        "(streaming endpoint only)",
+    )
 
 
 class AskResponse(BaseModel):
     answer: str = Field(..., description="Final answer from the knowledge base")
     question: str = Field(..., description="Original question")
+    stages: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Latency and token usage of each step of the answer",
+    )
+
+
+# Events of the /search/ask stream
+class AskStrategyEvent(BaseModel):
+    type: Literal["strategy"] = "strategy"
+    reasoning: str
+    searches: List[Dict[str, str]]
+
+
+class AskAnswerTokenEvent(BaseModel):
+    type: Literal["answer_token"] = "answer_token"
+    content: str
+    answer_id: str = Field(..., description="Tells apart concurrent answers")
+
+
+class AskAnswerEvent(BaseModel):
+    type: Literal["answer"] = "answer"
+    content: str
+
+
+class AskFinalAnswerTokenEvent(BaseModel):
+    type: Literal["final_answer_token"] = "final_answer_token"
+    content: str
+
+
+class AskFinalAnswerEvent(BaseModel):
+    type: Literal["final_answer"] = "final_answer"
+    content: str
+
+
+class AskCompleteEvent(BaseModel):
+    type: Literal["complete"] = "complete"
+    final_answer: Optional[str] = None
+    stages: List[Dict[str, Any]] = Field(default_factory=list)
+    ttft_ms: Optional[float] = Field(
+        None, description="Time to the first token of the final answer"
+    )
+
+
+class AskErrorEvent(BaseModel):
+    type: Literal["error"] = "error"
+    message: str
+
+
+class ChatStreamRequest(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    session_id: str = Field(..., description="Chat session ID, the conversation thread")
+    message: str = Field(..., description="User message")
+    notebook_id: Optional[str] = Field(None, description="Notebook the chat is about")
+    context: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Context for the answer, e.g. from POST /notebooks/{id}/context; "
+        "the session's previous context is kept when omitted",
+    )
+    model_id: Optional[str] = Field(None, description="Model ID (uses default if not provided)")
+
+
+class CheckpointUsage(BaseModel):
+    sessions: int = Field(..., description="Chat sessions with stored checkpoints")
+    checkpoints: int = Field(..., description="Stored checkpoints")
+    writes: int = Field(..., description="Stored pending writes")
+    bytes: int = Field(..., description="Bytes of checkpoint and write data")
+
+
+class NotebookCheckpointUsage(CheckpointUsage):
+    notebook_id: str
+
+
+class CheckpointStorageResponse(BaseModel):
+    file_bytes: int = Field(..., description="Size of the checkpoint file and its WAL")
+    notebooks: List[NotebookCheckpointUsage] = Field(
+        ..., description="Usage per notebook, largest first"
+    )
+    unassigned: CheckpointUsage = Field(
+        ..., description="Threads not linked to a notebook, e.g. of deleted sessions"
+    )
+
+
+class CompactCheckpointsRequest(BaseModel):
+    keep: Optional[int] = Field(
+        None, ge=1, description="Checkpoints to keep per thread (default CHAT_CHECKPOINT_KEEP)"
+    )
+
+
+class CompactCheckpointsResponse(BaseModel):
+    job_id: str = Field(..., description="Command job ID for status tracking")
+    status: str = Field(..., description="Job submission status")
+    message: str = Field(..., description="Result message")
 
 
 # Models API models
@@ -84,6 +193,12 @@ class TransformationCreate(BaseModel):
     description: str = Field(..., description="Description of what this transformation does")
     prompt: str = Field(..., description="The transformation prompt")
     apply_default: bool = Field(False, description="Whether to apply this transformation by default")
+    execution_mode: Literal["auto", "single", "map_reduce", "refine"] = Field(
+        "auto", description="How documents longer than one section are processed"
+    )
+    section_tokens: Optional[int] = Field(
+        None, gt=0, description="Section size in tokens for map_reduce and refine"
+    )
 
 
 class TransformationUpdate(BaseModel):
@@ -92,6 +207,12 @@ class TransformationUpdate(BaseModel):
     description: Optional[str] = Field(None, description="Description of what this transformation does")
     prompt: Optional[str] = Field(None, description="The transformation prompt")
     apply_default: Optional[bool] = Field(None, description="Whether to apply this transformation by default")
+    execution_mode: Optional[Literal["auto", "single", "map_reduce", "refine"]] = Field(
+        None, description="How documents longer than one section are processed"
+    )
+    section_tokens: Optional[int] = Field(
+        None, gt=0, description="Section size in tokens for map_reduce and refine"
+    )
 
 
 class TransformationResponse(BaseModel):
@@ -101,6 +222,8 @@ class TransformationResponse(BaseModel):
     description: str
     prompt: str
     apply_default: bool
+    execution_mode: str = "auto"
+    section_tokens: Optional[int] = None
     created: str
     updated: str
 
@@ -111,6 +234,7 @@ class TransformationExecuteRequest(BaseModel):
     transformation_id: str = Field(..., description="ID of the transformation to execute")
     input_text: str = Field(..., description="Text to transform")
     model_id: str = Field(..., description="Model ID to use for the transformation")
+    bypass_cache: bool = Field(False, description="Run the model even if a cached result exists")
 
 
 class TransformationExecuteResponse(BaseModel):
@@ -119,6 +243,7 @@ class TransformationExecuteResponse(BaseModel):
     output: str = Field(..., description="Transformed text")
     transformation_id: str = Field(..., description="ID of the transformation used")
     model_id: str = Field(..., description="Model ID used")
+    cached: bool = Field(False, description="Whether the output came from the cache")
 
 
 # Notes API models
@@ -144,10 +269,25 @@ class NoteResponse(BaseModel):
     updated: str
 
 
+class NoteListResponse(BaseModel):
+    """A note in GET /notes; columns left out of `fields` are null."""
+
+    id: str
+    title: Optional[str]
+    content: Optional[str]
+    note_type: Optional[str]
+    created: Optional[str]
+    updated: Optional[str]
+
+
 # Embedding API models
 class EmbedRequest(BaseModel):
     item_id: str = Field(..., description="ID of the item to embed")
     item_type: str = Field(..., description="Type of item (source, note)")
+    incremental: bool = Field(
+        True,
+        description="For sources that are already embedded, only embed chunks whose content changed",
+    )
 
 
 class EmbedResponse(BaseModel):
@@ -157,6 +297,19 @@ class EmbedResponse(BaseModel):
     item_type: str = Field(..., description="Type of item that was embedded")
 
 
+class RebuildEmbeddingsRequest(BaseModel):
+    reembed: bool = Field(
+        True,
+        description="Re-embed all content before rebuilding the vector indexes (needed after changing the embedding model)",
+    )
+
+
+class RebuildEmbeddingsResponse(BaseModel):
+    job_id: str = Field(..., description="Command job ID for status tracking")
+    status: str = Field(..., description="Job submission status")
+    message: str = Field(..., description="Result message")
+
+
 # Settings API models
 class SettingsResponse(BaseModel):
     default_content_processing_engine_doc: Optional[str] = None
@@ -190,6 +343,14 @@ class SourceCreate(BaseModel):
     transformations: Optional[List[str]] = Field(default_factory=list, description="Transformation IDs to apply")
     embed: bool = Field(False, description="Whether to embed content for vector search")
     delete_source: bool = Field(False, description="Whether to delete uploaded file after processing")
+    async_processing: bool = Field(
+        False,
+        description="Process the source in a background job and return its job ID at once",
+    )
+    force: bool = Field(
+        False,
+        description="Ingest even if a source with the same URL, file or content exists",
+    )
 
 
 class SourceUpdate(BaseModel):
@@ -206,6 +367,72 @@ class SourceResponse(BaseModel):
     embedded_chunks: int
     created: str
     updated: str
+    duplicate: bool = False
+
+
+class SourceJobResponse(BaseModel):
+    job_id: str = Field(..., description="Command job ID for status tracking")
+    status: str = Field(..., description="Job submission status")
+    message: str = Field(..., description="Result message")
+
+
+class BulkIngestItem(BaseModel):
+    url: Optional[str] = Field(None, description="URL to ingest")
+    file_path: Optional[str] = Field(None, description="Path of a file on the server")
+    content: Optional[str] = Field(None, description="Text content")
+    title: Optional[str] = Field(None, description="Source title")
+    key: Optional[str] = Field(None, description="Unique key of the item in the run")
+
+
+class BulkIngestRequest(BaseModel):
+    notebook_id: str = Field(..., description="Notebook ID to add the sources to")
+    path: Optional[str] = Field(
+        None,
+        description="Server path of a directory, a JSON manifest or a JSONL/text list of URLs",
+    )
+    items: List[BulkIngestItem] = Field(
+        default_factory=list, description="Items to ingest, in addition to path"
+    )
+    transformations: List[str] = Field(
+        default_factory=list, description="Transformation IDs to apply to every source"
+    )
+    embed: bool = Field(True, description="Whether to embed content for vector search")
+    force: bool = Field(
+        False, description="Ingest items even if they duplicate existing sources"
+    )
+    concurrency: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Items allowed at once per stage: extract, embed, transform",
+    )
+
+
+class BulkIngestResponse(BaseModel):
+    run_id: str = Field(..., description="Ingestion run ID")
+    job_id: str = Field(..., description="Command job ID for status tracking")
+    total: int = Field(..., description="Number of items in the run")
+    status: str = Field(..., description="Job submission status")
+    message: str = Field(..., description="Result message")
+
+
+class BulkIngestItemStatus(BaseModel):
+    id: str
+    key: str
+    status: str
+    source: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    updated: Optional[str] = None
+
+
+class BulkIngestStatusResponse(BaseModel):
+    run_id: str
+    status: str
+    notebook_id: Optional[str]
+    total: int
+    counts: Dict[str, int]
+    items: List[BulkIngestItemStatus]
+    created: str
+    updated: str
 
 
 class SourceListResponse(BaseModel):
@@ -213,10 +440,10 @@ class SourceListResponse(BaseModel):
     title: Optional[str]
     topics: Optional[List[str]]
     asset: Optional[AssetModel]
-    embedded_chunks: int
-    insights_count: int
-    created: str
-    updated: str
+    embedded_chunks: Optional[int]
+    insights_count: Optional[int]
+    created: Optional[str]
+    updated: Optional[str]
 
 
 # Context API models
@@ -256,6 +483,7 @@ class CreateSourceInsightRequest(BaseModel):
     
     transformation_id: str = Field(..., description="ID of transformation to apply")
     model_id: Optional[str] = Field(None, description="Model ID (uses default if not provided)")
+    bypass_cache: bool = Field(False, description="Run the model even if a cached result exists")
 
 
 # Error response
@@ -0,0 +1,24 @@
+"""Query parameters and response headers shared by paginated list endpoints."""
+
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Turn a `fields=a,b,c` query value into a list, or None for all fields."""
+    if not fields:
+        return None
+    parsed = [field.strip() for field in fields.split(",") if field.strip()]
+    if not parsed:
+        raise HTTPException(status_code=400, detail="fields cannot be empty")
+    return parsed
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """Send the cursor of the next page; no header means this was the last page."""
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
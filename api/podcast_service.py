@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import HTTPException
 from loguru import logger
@@ -7,6 +7,7 @@ from surreal_commands import get_command_status, submit_command
 
 from open_notebook.domain.notebook import Notebook
 from open_notebook.domain.podcast import EpisodeProfile, PodcastEpisode, SpeakerProfile
+from open_notebook.exceptions import InvalidInputError
 
 
 class PodcastGenerationRequest(BaseModel):
@@ -136,11 +137,19 @@ class PodcastService:
             )
 
     @staticmethod
-    async def list_episodes() -> list:
-        """List all podcast episodes"""
+    async def list_episodes(
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> list:
+        """List podcast episodes, newest first"""
         try:
-            episodes = await PodcastEpisode.get_all(order_by="created desc")
+            episodes = await PodcastEpisode.get_all(
+                order_by="created desc", limit=limit, cursor=cursor, fields=fields
+            )
             return episodes
+        except InvalidInputError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"Failed to list podcast episodes: {e}")
             raise HTTPException(
@@ -0,0 +1,141 @@
+import json
+import time
+from typing import Any, AsyncGenerator, Dict
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from loguru import logger
+
+from api.command_service import CommandService
+from api.models import (
+    ChatStreamRequest,
+    CheckpointStorageResponse,
+    CompactCheckpointsRequest,
+    CompactCheckpointsResponse,
+)
+from open_notebook.domain.notebook import ChatSession, Notebook
+from open_notebook.exceptions import NotFoundError
+from open_notebook.graphs.chat import chat_stream_stats, get_async_graph
+from open_notebook.graphs.checkpoints import get_checkpoint_storage
+
+router = APIRouter()
+
+
+async def stream_chat_response(
+    session: ChatSession, state: Dict[str, Any], config: RunnableConfig
+) -> AsyncGenerator[str, None]:
+    """Stream the answer token by token as Server-Sent Events."""
+    started = time.perf_counter()
+    ttft = None
+    content = ""
+    try:
+        chat_graph = await get_async_graph()
+        async for message, metadata in chat_graph.astream(
+            state, config=config, stream_mode="messages"
+        ):
+            if metadata.get("langgraph_node") != "agent":
+                continue
+            if not isinstance(message, AIMessageChunk):
+                continue
+            token = message.text()
+            if not token:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            content += token
+            yield f"data: {json.dumps({'type': 'token', 'content': token})}\n\n"
+
+        duration = time.perf_counter() - started
+        if ttft is None:
+            ttft = duration
+        chat_stream_stats.record(ttft, duration)
+        logger.debug(
+            f"Chat answer for {session.id}: first token after {ttft * 1000:.0f}ms, "
+            f"done after {duration * 1000:.0f}ms"
+        )
+        await session.save()
+
+        complete_data = {
+            "type": "complete",
+            "content": content,
+            "ttft_ms": round(ttft * 1000, 2),
+            "duration_ms": round(duration * 1000, 2),
+        }
+        yield f"data: {json.dumps(complete_data)}\n\n"
+
+    except Exception as e:
+        logger.error(f"Error in chat streaming: {str(e)}")
+        error_data = {"type": "error", "message": str(e)}
+        yield f"data: {json.dumps(error_data)}\n\n"
+
+
+@router.post("/chat/stream")
+async def stream_chat(chat_request: ChatStreamRequest):
+    """Send a message to a chat session and stream the answer."""
+    try:
+        session = await ChatSession.get(chat_request.session_id)
+        state: Dict[str, Any] = {
+            "messages": [HumanMessage(content=chat_request.message)]
+        }
+        if chat_request.notebook_id:
+            state["notebook"] = await Notebook.get(chat_request.notebook_id)
+        if chat_request.context is not None:
+            state["context"] = chat_request.context
+
+        config = RunnableConfig(
+            configurable={
+                "thread_id": session.id,
+                "model_id": chat_request.model_id,
+            }
+        )
+        return StreamingResponse(
+            stream_chat_response(session, state, config),
+            media_type="text/event-stream",
+        )
+
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+
+
+@router.get("/chat/checkpoints", response_model=CheckpointStorageResponse)
+async def get_chat_checkpoints():
+    """Storage used by chat history checkpoints, per notebook."""
+    try:
+        return CheckpointStorageResponse(**await get_checkpoint_storage())
+    except Exception as e:
+        logger.error(f"Error reading checkpoint storage: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error reading checkpoint storage: {str(e)}"
+        )
+
+
+@router.post("/chat/checkpoints/compact", response_model=CompactCheckpointsResponse)
+async def compact_chat_checkpoints(request: CompactCheckpointsRequest):
+    """
+    Prune old chat checkpoints and vacuum the checkpoint file in the
+    background. The latest checkpoint of a thread holds its whole history.
+    """
+    try:
+        command_args = {"keep": request.keep} if request.keep else {}
+        job_id = await CommandService.submit_command_job(
+            module_name="open_notebook",
+            command_name="compact_checkpoints",
+            command_args=command_args,
+        )
+        return CompactCheckpointsResponse(
+            job_id=job_id,
+            status="submitted",
+            message="Checkpoint compaction started",
+        )
+
+    except Exception as e:
+        logger.error(f"Error submitting checkpoint compaction: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error submitting checkpoint compaction: {str(e)}",
+        )
@@ -1,7 +1,13 @@
 from fastapi import APIRouter, HTTPException
 from loguru import logger
 
-from api.models import EmbedRequest, EmbedResponse
+from api.command_service import CommandService
+from api.models import (
+    EmbedRequest,
+    EmbedResponse,
+    RebuildEmbeddingsRequest,
+    RebuildEmbeddingsResponse,
+)
 from open_notebook.domain.models import model_manager
 from open_notebook.domain.notebook import Note, Source
 
@@ -34,25 +40,28 @@ async def embed_content(embed_request: EmbedRequest):
             if not source_item:
                 raise HTTPException(status_code=404, detail="Source not found")
 
-            # Check if already embedded
-            if await source_item.get_embedded_chunks() > 0:
-                return EmbedResponse(
-                    success=True,
-                    message="Source is already embedded",
-                    item_id=item_id,
-                    item_type=item_type,
+            # Already embedded sources are refreshed, by default only the
+            # chunks whose content changed since the last run
+            incremental = (
+                embed_request.incremental
+                and await source_item.get_embedded_chunks() > 0
+            )
+            stats = await source_item.vectorize(incremental=incremental)
+            if incremental:
+                message = (
+                    f"Source re-embedded: {stats['embedded']} chunks embedded, "
+                    f"{stats['reused']} reused, {stats['deleted']} removed"
                 )
-
-            # Perform embedding
-            await source_item.vectorize()
-            message = "Source embedded successfully"
+            else:
+                message = "Source embedded successfully"
 
         elif item_type == "note":
             note_item = await Note.get(item_id)
             if not note_item:
                 raise HTTPException(status_code=404, detail="Note not found")
 
-            await note_item.vectorize()
+            await note_item.save(reembed=True)
+            message = "Note embedded successfully"
 
         return EmbedResponse(
             success=True, message=message, item_id=item_id, item_type=item_type
@@ -67,3 +76,36 @@ async def embed_content(embed_request: EmbedRequest):
         raise HTTPException(
             status_code=500, detail=f"Error embedding content: {str(e)}"
         )
+
+
+@router.post("/embed/rebuild", response_model=RebuildEmbeddingsResponse)
+async def rebuild_embeddings(request: RebuildEmbeddingsRequest):
+    """
+    Re-embed all content and rebuild the vector indexes in the background.
+    Use this after changing the default embedding model.
+    """
+    try:
+        if not await model_manager.get_embedding_model():
+            raise HTTPException(
+                status_code=400,
+                detail="No embedding model configured. Please configure one in the Models section.",
+            )
+
+        job_id = await CommandService.submit_command_job(
+            module_name="open_notebook",
+            command_name="rebuild_embeddings",
+            command_args={"reembed": request.reembed},
+        )
+        return RebuildEmbeddingsResponse(
+            job_id=job_id,
+            status="submitted",
+            message="Embedding rebuild started",
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error submitting embedding rebuild: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error submitting embedding rebuild: {str(e)}"
+        )
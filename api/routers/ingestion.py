@@ -0,0 +1,164 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from loguru import logger
+
+from api.command_service import CommandService
+from api.models import (
+    BulkIngestItemStatus,
+    BulkIngestRequest,
+    BulkIngestResponse,
+    BulkIngestStatusResponse,
+)
+from open_notebook.domain.ingestion import (
+    IngestionRun,
+    create_run,
+    discover_items,
+    get_run_status,
+    normalize_item,
+)
+from open_notebook.domain.notebook import Notebook
+from open_notebook.domain.transformation import Transformation
+from open_notebook.exceptions import InvalidInputError, NotFoundError
+from open_notebook.executors import run_in_thread
+
+router = APIRouter()
+
+# Command states in which a bulk_ingest job may still process the run's items
+ACTIVE_COMMAND_STATUSES = {"new", "running"}
+
+
+async def _submit_run(run: IngestionRun, concurrency: dict) -> str:
+    job_id = await CommandService.submit_command_job(
+        module_name="open_notebook",
+        command_name="bulk_ingest",
+        command_args={"run_id": run.id, "concurrency": concurrency},
+    )
+    run.command = job_id
+    await run.save()
+    return job_id
+
+
+@router.post("/sources/bulk", response_model=BulkIngestResponse, status_code=202)
+async def bulk_ingest(request: BulkIngestRequest):
+    """
+    Ingest many sources in a background job. Items come from a server-side
+    directory or manifest (`path`) and/or the `items` list; follow them with
+    GET /api/sources/bulk/{run_id}.
+    """
+    try:
+        await Notebook.get(request.notebook_id)
+        for transformation_id in request.transformations:
+            await Transformation.get(transformation_id)
+
+        items = []
+        if request.path:
+            items = await run_in_thread(discover_items, request.path)
+        items += [
+            normalize_item(item.model_dump(exclude_none=True))
+            for item in request.items
+        ]
+        run = await create_run(
+            items,
+            notebook_id=request.notebook_id,
+            transformations=request.transformations,
+            embed=request.embed,
+            force=request.force,
+            origin=request.path,
+        )
+        job_id = await _submit_run(run, request.concurrency)
+        return BulkIngestResponse(
+            run_id=run.id,
+            job_id=job_id,
+            total=run.total,
+            status="submitted",
+            message=f"Ingestion of {run.total} items started",
+        )
+    except NotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error starting bulk ingestion: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error starting bulk ingestion: {str(e)}"
+        )
+
+
+@router.get("/sources/bulk/{run_id}", response_model=BulkIngestStatusResponse)
+async def get_bulk_ingest_status(
+    run_id: str,
+    status: Optional[str] = Query(None, description="Only list items in this status"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of items"),
+    offset: int = Query(0, ge=0, description="Items to skip"),
+):
+    """Item counts per status and the items of an ingestion run."""
+    try:
+        result = await get_run_status(run_id, status=status, limit=limit, start=offset)
+        run = result["run"]
+        return BulkIngestStatusResponse(
+            run_id=run.id,
+            status=run.status,
+            notebook_id=run.notebook_id,
+            total=run.total,
+            counts=result["counts"],
+            items=[
+                BulkIngestItemStatus(
+                    id=item["id"],
+                    key=item["key"],
+                    status=item["status"],
+                    source=item.get("source"),
+                    error=item.get("error"),
+                    attempts=item.get("attempts") or 0,
+                    updated=str(item["updated"]) if item.get("updated") else None,
+                )
+                for item in result["items"]
+            ],
+            created=str(run.created),
+            updated=str(run.updated),
+        )
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Ingestion run not found")
+    except Exception as e:
+        logger.error(f"Error fetching ingestion run {run_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching ingestion run: {str(e)}"
+        )
+
+
+@router.post(
+    "/sources/bulk/{run_id}/resume", response_model=BulkIngestResponse, status_code=202
+)
+async def resume_bulk_ingest(
+    run_id: str,
+    force: bool = Query(
+        False, description="Resume even if the run's job still looks active"
+    ),
+):
+    """Process the items of a run that are not done yet, e.g. after a crash."""
+    try:
+        run = await IngestionRun.get(run_id)
+        if run.command and not force:
+            job = await CommandService.get_command_status(run.command)
+            if job["status"] in ACTIVE_COMMAND_STATUSES:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Ingestion run is still being processed by {run.command}",
+                )
+        job_id = await _submit_run(run, {})
+        return BulkIngestResponse(
+            run_id=run.id,
+            job_id=job_id,
+            total=run.total,
+            status="submitted",
+            message="Ingestion resumed",
+        )
+    except HTTPException:
+        raise
+    except NotFoundError:
+        raise HTTPException(status_code=404, detail="Ingestion run not found")
+    except Exception as e:
+        logger.error(f"Error resuming ingestion run {run_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Error resuming ingestion run: {str(e)}"
+        )
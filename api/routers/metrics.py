@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+
+from open_notebook.domain.embeddings import embedding_cache
+from open_notebook.domain.notebook_context import notebook_context_cache
+from open_notebook.domain.transformation_cache import transformation_cache
+from open_notebook.executors import executor_stats
+from open_notebook.graphs.chat import chat_stream_stats
+from open_notebook.graphs.chat_context import token_sizes
+from open_notebook.rate_limits import rate_limit_stats
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Runtime metrics of this API process."""
+    return {
+        "executors": executor_stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "transformation_cache": transformation_cache.stats(),
+        "notebook_context_cache": notebook_context_cache.stats(),
+        "llm": rate_limit_stats(),
+        "chat_streams": chat_stream_stats.snapshot(),
+        "chat_token_sizes": token_sizes.stats(),
+    }
@@ -199,7 +199,11 @@ async def update_default_models(defaults_data: DefaultModelsResponse):
             defaults.default_text_to_speech_model = defaults_data.default_text_to_speech_model
         if defaults_data.default_speech_to_text_model is not None:
             defaults.default_speech_to_text_model = defaults_data.default_speech_to_text_model
+        embedding_model_changed = False
         if defaults_data.default_embedding_model is not None:
+            embedding_model_changed = (
+                defaults.default_embedding_model != defaults_data.default_embedding_model
+            )
             defaults.default_embedding_model = defaults_data.default_embedding_model
         if defaults_data.default_tools_model is not None:
             defaults.default_tools_model = defaults_data.default_tools_model
@@ -209,6 +213,15 @@ async def update_default_models(defaults_data: DefaultModelsResponse):
         # Refresh the model manager cache
         from open_notebook.domain.models import model_manager
         await model_manager.refresh_defaults()
+
+        if embedding_model_changed:
+            # Indexes are kept only if stored vectors match the new dimension;
+            # otherwise search falls back to exact scans until POST /embed/rebuild
+            from open_notebook.domain.vector_index import ensure_vector_indexes
+            try:
+                await ensure_vector_indexes()
+            except Exception as e:
+                logger.warning(f"Could not update vector indexes: {str(e)}")
         
         return DefaultModelsResponse(
             default_chat_model=defaults.default_chat_model,
@@ -1,39 +1,72 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from loguru import logger
 
-from api.models import ErrorResponse, NotebookCreate, NotebookResponse, NotebookUpdate
+from api.models import (
+    ErrorResponse,
+    NotebookCreate,
+    NotebookListResponse,
+    NotebookResponse,
+    NotebookUpdate,
+)
+from api.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    parse_fields,
+    set_next_cursor,
+)
 from open_notebook.domain.notebook import Notebook
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
 
 router = APIRouter()
 
 
-@router.get("/notebooks", response_model=List[NotebookResponse])
+@router.get("/notebooks", response_model=List[NotebookListResponse])
 async def get_notebooks(
+    response: Response,
     archived: Optional[bool] = Query(None, description="Filter by archived status"),
     order_by: str = Query("updated desc", description="Order by field and direction"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of notebooks"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Continue after a previous page ({NEXT_CURSOR_HEADER})"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. name,updated"
+    ),
 ):
-    """Get all notebooks with optional filtering and ordering."""
+    """Get notebooks with optional filtering, ordering and keyset pagination."""
     try:
-        notebooks = await Notebook.get_all(order_by=order_by)
-        
-        # Filter by archived status if specified
-        if archived is not None:
-            notebooks = [nb for nb in notebooks if nb.archived == archived]
-        
+        requested = parse_fields(fields)
+        notebooks = await Notebook.get_all(
+            order_by=order_by,
+            limit=limit,
+            cursor=cursor,
+            filters={"archived": archived} if archived is not None else None,
+            fields=requested,
+        )
+        set_next_cursor(response, Notebook.page_cursor(notebooks, limit, order_by))
+
         return [
-            NotebookResponse(
+            NotebookListResponse(
                 id=nb.id,
                 name=nb.name,
                 description=nb.description,
-                archived=nb.archived or False,
-                created=str(nb.created),
-                updated=str(nb.updated),
+                # Fields left out of `fields` are null, not their defaults
+                archived=nb.archived or False
+                if requested is None or "archived" in requested
+                else None,
+                created=str(nb.created) if nb.created else None,
+                updated=str(nb.updated) if nb.updated else None,
             )
             for nb in notebooks
         ]
+    except HTTPException:
+        raise
+    except InvalidInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching notebooks: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching notebooks: {str(e)}")
@@ -1,45 +1,73 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from loguru import logger
 
-from api.models import NoteCreate, NoteResponse, NoteUpdate
+from api.models import NoteCreate, NoteListResponse, NoteResponse, NoteUpdate
+from api.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    parse_fields,
+    set_next_cursor,
+)
 from open_notebook.domain.notebook import Note
 from open_notebook.exceptions import InvalidInputError
 
 router = APIRouter()
 
 
-@router.get("/notes", response_model=List[NoteResponse])
+NOTE_LIST_FIELDS = ["title", "content", "note_type", "created", "updated"]
+
+
+@router.get("/notes", response_model=List[NoteListResponse])
 async def get_notes(
-    notebook_id: Optional[str] = Query(None, description="Filter by notebook ID")
+    response: Response,
+    notebook_id: Optional[str] = Query(None, description="Filter by notebook ID"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of notes"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Continue after a previous page ({NEXT_CURSOR_HEADER})"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. title,note_type"
+    ),
 ):
-    """Get all notes with optional notebook filtering."""
+    """Get notes, newest first, with optional notebook filtering and pagination."""
     try:
+        filters = None
         if notebook_id:
             # Get notes for a specific notebook
             from open_notebook.domain.notebook import Notebook
             notebook = await Notebook.get(notebook_id)
             if not notebook:
                 raise HTTPException(status_code=404, detail="Notebook not found")
-            notes = await notebook.get_notes()
-        else:
-            # Get all notes
-            notes = await Note.get_all(order_by="updated desc")
-        
+            filters = {"id": await notebook.get_note_ids()}
+
+        notes = await Note.get_all(
+            order_by="updated desc",
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+            fields=parse_fields(fields) or NOTE_LIST_FIELDS,
+        )
+        set_next_cursor(response, Note.page_cursor(notes, limit))
+
         return [
-            NoteResponse(
+            NoteListResponse(
                 id=note.id,
                 title=note.title,
                 content=note.content,
                 note_type=note.note_type,
-                created=str(note.created),
-                updated=str(note.updated),
+                created=str(note.created) if note.created else None,
+                updated=str(note.updated) if note.updated else None,
             )
             for note in notes
         ]
     except HTTPException:
         raise
+    except InvalidInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching notes: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching notes: {str(e)}")
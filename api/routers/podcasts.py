@@ -1,10 +1,16 @@
 from typing import List, Optional
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from loguru import logger
 from pydantic import BaseModel
 
+from api.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    parse_fields,
+    set_next_cursor,
+)
 from api.podcast_service import (
     PodcastGenerationRequest,
     PodcastGenerationResponse,
@@ -17,10 +23,10 @@ router = APIRouter()
 
 class PodcastEpisodeResponse(BaseModel):
     id: str
-    name: str
-    episode_profile: dict
-    speaker_profile: dict
-    briefing: str
+    name: Optional[str] = None
+    episode_profile: Optional[dict] = None
+    speaker_profile: Optional[dict] = None
+    briefing: Optional[str] = None
     audio_file: Optional[str] = None
     transcript: Optional[dict] = None
     outline: Optional[dict] = None
@@ -73,11 +79,54 @@ async def get_podcast_job_status(job_id: str):
         )
 
 
+# Everything but the source content the episode was generated from
+EPISODE_LIST_FIELDS = [
+    "name",
+    "episode_profile",
+    "speaker_profile",
+    "briefing",
+    "audio_file",
+    "transcript",
+    "outline",
+    "command",
+    "created",
+]
+
+
 @router.get("/podcasts/episodes", response_model=List[PodcastEpisodeResponse])
-async def list_podcast_episodes():
-    """List all podcast episodes"""
+async def list_podcast_episodes(
+    response: Response,
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of episodes"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Continue after a previous page ({NEXT_CURSOR_HEADER})"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. name,audio_file"
+    ),
+):
+    """List podcast episodes, newest first. Pages can hold fewer than `limit`
+    episodes because unfinished ones are skipped; keep following the cursor."""
     try:
-        episodes = await PodcastService.list_episodes()
+        requested = parse_fields(fields)
+        # command and audio_file decide which episodes are listed
+        episode_fields = (
+            list(
+                dict.fromkeys(
+                    [f for f in requested if f != "job_status"]
+                    + ["command", "audio_file"]
+                )
+            )
+            if requested
+            else EPISODE_LIST_FIELDS
+        )
+        episodes = await PodcastService.list_episodes(
+            limit=limit, cursor=cursor, fields=episode_fields
+        )
+        set_next_cursor(
+            response, PodcastEpisode.page_cursor(episodes, limit, "created desc")
+        )
 
         response_episodes = []
         for episode in episodes:
@@ -113,6 +162,8 @@ async def list_podcast_episodes():
 
         return response_episodes
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing podcast episodes: {str(e)}")
         raise HTTPException(
@@ -1,15 +1,30 @@
-import json
-from typing import AsyncGenerator
+import time
+from typing import AsyncGenerator, Dict
 
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessageChunk
 from loguru import logger
+from pydantic import BaseModel
 
-from api.models import AskRequest, AskResponse, SearchRequest, SearchResponse
+from api.models import (
+    AskAnswerEvent,
+    AskAnswerTokenEvent,
+    AskCompleteEvent,
+    AskErrorEvent,
+    AskFinalAnswerEvent,
+    AskFinalAnswerTokenEvent,
+    AskRequest,
+    AskResponse,
+    AskStrategyEvent,
+    SearchRequest,
+    SearchResponse,
+)
 from open_notebook.domain.models import Model, model_manager
 from open_notebook.domain.notebook import text_search, vector_search
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
 from open_notebook.graphs.ask import graph as ask_graph
+from open_notebook.utils import ThinkingStreamFilter
 
 router = APIRouter()
 
@@ -58,14 +73,31 @@ async def search_knowledge_base(search_request: SearchRequest):
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
+def _sse(event: BaseModel) -> str:
+    return f"data: {event.model_dump_json()}\n\n"
+
+
 async def stream_ask_response(
-    question: str, strategy_model: Model, answer_model: Model, final_answer_model: Model
+    question: str,
+    strategy_model: Model,
+    answer_model: Model,
+    final_answer_model: Model,
+    stream_answers: bool = False,
 ) -> AsyncGenerator[str, None]:
-    """Stream the ask response as Server-Sent Events."""
+    """
+    Stream the ask response as Server-Sent Events: the strategy, the answer
+    of each search (token by token with `stream_answers`) and the final
+    answer token by token, followed by the whole final answer.
+    """
+    started = time.perf_counter()
+    ttft = None
     try:
         final_answer = None
+        stages = []
+        # One thinking filter per streamed answer
+        filters: Dict[str, ThinkingStreamFilter] = {}
 
-        async for chunk in ask_graph.astream(
+        async for mode, chunk in ask_graph.astream(
             input=dict(question=question),
             config=dict(
                 configurable=dict(
@@ -74,37 +106,70 @@ async def stream_ask_response(
                     final_answer_model=final_answer_model.id,
                 )
             ),
-            stream_mode="updates",
+            stream_mode=["messages", "updates"],
         ):
+            if mode == "messages":
+                message, metadata = chunk
+                node = metadata.get("langgraph_node")
+                if not isinstance(message, AIMessageChunk):
+                    continue
+                if node == "write_final_answer":
+                    answer_id = node
+                elif node == "provide_answer" and stream_answers:
+                    answer_id = metadata.get("langgraph_checkpoint_ns", node)
+                else:
+                    continue
+                token = filters.setdefault(answer_id, ThinkingStreamFilter()).feed(
+                    message.text()
+                )
+                if not token:
+                    continue
+                if node == "write_final_answer":
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    yield _sse(AskFinalAnswerTokenEvent(content=token))
+                else:
+                    yield _sse(AskAnswerTokenEvent(content=token, answer_id=answer_id))
+                continue
+
+            for update in chunk.values():
+                stages += (update or {}).get("stages", [])
             if "agent" in chunk:
-                strategy_data = {
-                    "type": "strategy",
-                    "reasoning": chunk["agent"]["strategy"].reasoning,
-                    "searches": [
-                        {"term": search.term, "instructions": search.instructions}
-                        for search in chunk["agent"]["strategy"].searches
-                    ],
-                }
-                yield f"data: {json.dumps(strategy_data)}\n\n"
+                strategy = chunk["agent"]["strategy"]
+                yield _sse(
+                    AskStrategyEvent(
+                        reasoning=strategy.reasoning,
+                        searches=[
+                            {"term": search.term, "instructions": search.instructions}
+                            for search in strategy.searches
+                        ],
+                    )
+                )
 
             elif "provide_answer" in chunk:
                 for answer in chunk["provide_answer"]["answers"]:
-                    answer_data = {"type": "answer", "content": answer}
-                    yield f"data: {json.dumps(answer_data)}\n\n"
+                    yield _sse(AskAnswerEvent(content=answer))
 
             elif "write_final_answer" in chunk:
+                stream_filter = filters.pop("write_final_answer", None)
+                rest = stream_filter.flush() if stream_filter else ""
+                if rest:
+                    yield _sse(AskFinalAnswerTokenEvent(content=rest))
                 final_answer = chunk["write_final_answer"]["final_answer"]
-                final_data = {"type": "final_answer", "content": final_answer}
-                yield f"data: {json.dumps(final_data)}\n\n"
+                yield _sse(AskFinalAnswerEvent(content=final_answer))
 
         # Send completion signal
-        complete_data = {"type": "complete", "final_answer": final_answer}
-        yield f"data: {json.dumps(complete_data)}\n\n"
+        yield _sse(
+            AskCompleteEvent(
+                final_answer=final_answer,
+                stages=stages,
+                ttft_ms=round(ttft * 1000, 2) if ttft is not None else None,
+            )
+        )
 
     except Exception as e:
         logger.error(f"Error in ask streaming: {str(e)}")
-        error_data = {"type": "error", "message": str(e)}
-        yield f"data: {json.dumps(error_data)}\n\n"
+        yield _sse(AskErrorEvent(message=str(e)))
 
 
 @router.post("/search/ask")
@@ -142,7 +207,11 @@ async def ask_knowledge_base(ask_request: AskRequest):
         # For streaming response
         return StreamingResponse(
             stream_ask_response(
-                ask_request.question, strategy_model, answer_model, final_answer_model
+                ask_request.question,
+                strategy_model,
+                answer_model,
+                final_answer_model,
+                stream_answers=ask_request.stream_answers,
             ),
             media_type="text/event-stream",
         )
@@ -188,6 +257,7 @@ async def ask_knowledge_base_simple(ask_request: AskRequest):
 
         # Run the ask graph and get final result
         final_answer = None
+        stages = []
         async for chunk in ask_graph.astream(
             input=dict(question=ask_request.question),
             config=dict(
@@ -199,13 +269,17 @@ async def ask_knowledge_base_simple(ask_request: AskRequest):
             ),
             stream_mode="updates",
         ):
+            for update in chunk.values():
+                stages += (update or {}).get("stages", [])
             if "write_final_answer" in chunk:
                 final_answer = chunk["write_final_answer"]["final_answer"]
 
         if not final_answer:
             raise HTTPException(status_code=500, detail="No answer generated")
 
-        return AskResponse(answer=final_answer, question=ask_request.question)
+        return AskResponse(
+            answer=final_answer, question=ask_request.question, stages=stages
+        )
 
     except HTTPException:
         raise
@@ -1,17 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from loguru import logger
 
+from api.command_service import CommandService
 from api.models import (
     AssetModel,
     CreateSourceInsightRequest,
     SourceCreate,
     SourceInsightResponse,
+    SourceJobResponse,
     SourceListResponse,
     SourceResponse,
     SourceUpdate,
 )
+from api.pagination import (
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    parse_fields,
+    set_next_cursor,
+)
 from open_notebook.domain.notebook import Notebook, Source
 from open_notebook.domain.transformation import Transformation
 from open_notebook.exceptions import InvalidInputError
@@ -20,55 +28,99 @@ from open_notebook.graphs.source import source_graph
 router = APIRouter()
 
 
+SOURCE_LIST_FIELDS = ["title", "topics", "asset", "created", "updated"]
+SOURCE_COUNT_FIELDS = {"embedded_chunks", "insights_count"}
+
+
 @router.get("/sources", response_model=List[SourceListResponse])
 async def get_sources(
+    response: Response,
     notebook_id: Optional[str] = Query(None, description="Filter by notebook ID"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of sources"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Continue after a previous page ({NEXT_CURSOR_HEADER})"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. title,insights_count"
+    ),
 ):
-    """Get all sources with optional notebook filtering."""
+    """Get sources, newest first, with optional notebook filtering and pagination."""
     try:
+        filters = None
         if notebook_id:
-            # Get sources for a specific notebook
             notebook = await Notebook.get(notebook_id)
             if not notebook:
                 raise HTTPException(status_code=404, detail="Notebook not found")
-            sources = await notebook.get_sources()
+            filters = {"id": await notebook.get_source_ids()}
+
+        requested = parse_fields(fields)
+        if requested is None:
+            source_fields = SOURCE_LIST_FIELDS
+            with_counts = True
         else:
-            # Get all sources
-            sources = await Source.get_all(order_by="updated desc")
+            source_fields = [f for f in requested if f not in SOURCE_COUNT_FIELDS]
+            with_counts = bool(SOURCE_COUNT_FIELDS & set(requested))
+
+        sources = await Source.get_all(
+            order_by="updated desc",
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+            fields=source_fields or ["id"],
+        )
+        set_next_cursor(response, Source.page_cursor(sources, limit))
 
-        # Create response list with async insights count
+        counts = (
+            await Source.get_counts([source.id for source in sources])
+            if with_counts
+            else {}
+        )
         response_list = []
         for source in sources:
-            insights = await source.get_insights()
+            source_counts = counts.get(source.id, {}) if with_counts else None
             response_list.append(
                 SourceListResponse(
                     id=source.id,
                     title=source.title,
-                    topics=source.topics or [],
+                    topics=source.topics or []
+                    if "topics" in source_fields
+                    else None,
                     asset=AssetModel(
                         file_path=source.asset.file_path if source.asset else None,
                         url=source.asset.url if source.asset else None,
                     )
                     if source.asset
                     else None,
-                    embedded_chunks=await source.get_embedded_chunks(),
-                    insights_count=len(insights),
-                    created=str(source.created),
-                    updated=str(source.updated),
+                    embedded_chunks=source_counts.get("embedded_chunks", 0)
+                    if source_counts is not None
+                    else None,
+                    insights_count=source_counts.get("insights_count", 0)
+                    if source_counts is not None
+                    else None,
+                    created=str(source.created) if source.created else None,
+                    updated=str(source.updated) if source.updated else None,
                 )
             )
 
         return response_list
     except HTTPException:
         raise
+    except InvalidInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching sources: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching sources: {str(e)}")
 
 
-@router.post("/sources", response_model=SourceResponse)
-async def create_source(source_data: SourceCreate):
-    """Create a new source."""
+@router.post("/sources", response_model=Union[SourceResponse, SourceJobResponse])
+async def create_source(source_data: SourceCreate, response: Response):
+    """
+    Create a new source. With async_processing the source is processed by a
+    background job and the response is its job ID; poll
+    /api/commands/jobs/{job_id} for progress and the resulting source ID.
+    """
     try:
         # Verify notebook exists
         notebook = await Notebook.get(source_data.notebook_id)
@@ -103,6 +155,30 @@ async def create_source(source_data: SourceCreate):
                 detail="Invalid source type. Must be link, upload, or text",
             )
 
+        if source_data.async_processing:
+            for trans_id in source_data.transformations or []:
+                if not await Transformation.get(trans_id):
+                    raise HTTPException(
+                        status_code=404, detail=f"Transformation {trans_id} not found"
+                    )
+            job_id = await CommandService.submit_command_job(
+                module_name="open_notebook",
+                command_name="process_source",
+                command_args={
+                    "content_state": content_state,
+                    "notebook_id": source_data.notebook_id,
+                    "transformations": source_data.transformations or [],
+                    "embed": source_data.embed,
+                    "force": source_data.force,
+                },
+            )
+            response.status_code = 202
+            return SourceJobResponse(
+                job_id=job_id,
+                status="submitted",
+                message="Source processing started",
+            )
+
         # Get transformations to apply
         transformations = []
         if source_data.transformations:
@@ -121,6 +197,7 @@ async def create_source(source_data: SourceCreate):
                 "notebook_id": source_data.notebook_id,
                 "apply_transformations": transformations,
                 "embed": source_data.embed,
+                "force": source_data.force,
             }
         )
 
@@ -136,10 +213,11 @@ async def create_source(source_data: SourceCreate):
             )
             if source.asset
             else None,
-            full_text=source.full_text,
+            full_text=await source.load_full_text(),
             embedded_chunks=await source.get_embedded_chunks(),
             created=str(source.created),
             updated=str(source.updated),
+            duplicate=bool(result.get("duplicate")),
         )
     except HTTPException:
         raise
@@ -154,7 +232,7 @@ async def create_source(source_data: SourceCreate):
 async def get_source(source_id: str):
     """Get a specific source by ID."""
     try:
-        source = await Source.get(source_id)
+        source = await Source.get(source_id, load=["full_text"])
         if not source:
             raise HTTPException(status_code=404, detail="Source not found")
 
@@ -184,7 +262,7 @@ async def get_source(source_id: str):
 async def update_source(source_id: str, source_update: SourceUpdate):
     """Update a source."""
     try:
-        source = await Source.get(source_id)
+        source = await Source.get(source_id, load=["full_text"])
         if not source:
             raise HTTPException(status_code=404, detail="Source not found")
 
@@ -285,7 +363,12 @@ async def create_source_insight(
         # Run transformation graph
         from open_notebook.graphs.transformation import graph as transform_graph
         await transform_graph.ainvoke(
-            input=dict(source=source, transformation=transformation)
+            input=dict(
+                source=source,
+                transformation=transformation,
+                bypass_cache=request.bypass_cache,
+            ),
+            config=dict(configurable={"model_id": request.model_id}),
         )
         
         # Get the newly created insight (last one)
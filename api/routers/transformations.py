@@ -32,6 +32,8 @@ async def get_transformations():
                 description=transformation.description,
                 prompt=transformation.prompt,
                 apply_default=transformation.apply_default,
+                execution_mode=transformation.execution_mode,
+                section_tokens=transformation.section_tokens,
                 created=str(transformation.created),
                 updated=str(transformation.updated),
             )
@@ -54,6 +56,8 @@ async def create_transformation(transformation_data: TransformationCreate):
             description=transformation_data.description,
             prompt=transformation_data.prompt,
             apply_default=transformation_data.apply_default,
+            execution_mode=transformation_data.execution_mode,
+            section_tokens=transformation_data.section_tokens,
         )
         await new_transformation.save()
 
@@ -64,6 +68,8 @@ async def create_transformation(transformation_data: TransformationCreate):
             description=new_transformation.description,
             prompt=new_transformation.prompt,
             apply_default=new_transformation.apply_default,
+            execution_mode=new_transformation.execution_mode,
+            section_tokens=new_transformation.section_tokens,
             created=str(new_transformation.created),
             updated=str(new_transformation.updated),
         )
@@ -93,6 +99,8 @@ async def get_transformation(transformation_id: str):
             description=transformation.description,
             prompt=transformation.prompt,
             apply_default=transformation.apply_default,
+            execution_mode=transformation.execution_mode,
+            section_tokens=transformation.section_tokens,
             created=str(transformation.created),
             updated=str(transformation.updated),
         )
@@ -128,6 +136,10 @@ async def update_transformation(
             transformation.prompt = transformation_update.prompt
         if transformation_update.apply_default is not None:
             transformation.apply_default = transformation_update.apply_default
+        if transformation_update.execution_mode is not None:
+            transformation.execution_mode = transformation_update.execution_mode
+        if transformation_update.section_tokens is not None:
+            transformation.section_tokens = transformation_update.section_tokens
 
         await transformation.save()
 
@@ -138,6 +150,8 @@ async def update_transformation(
             description=transformation.description,
             prompt=transformation.prompt,
             apply_default=transformation.apply_default,
+            execution_mode=transformation.execution_mode,
+            section_tokens=transformation.section_tokens,
             created=str(transformation.created),
             updated=str(transformation.updated),
         )
@@ -191,6 +205,7 @@ async def execute_transformation(execute_request: TransformationExecuteRequest):
             dict(
                 input_text=execute_request.input_text,
                 transformation=transformation,
+                bypass_cache=execute_request.bypass_cache,
             ),
             config=dict(configurable={"model_id": execute_request.model_id}),
         )
@@ -199,6 +214,7 @@ async def execute_transformation(execute_request: TransformationExecuteRequest):
             output=result["output"],
             transformation_id=execute_request.transformation_id,
             model_id=execute_request.model_id,
+            cached=bool(result.get("cached")),
         )
 
     except HTTPException:
@@ -29,6 +29,8 @@ class TransformationsService:
                 description=trans_data["description"],
                 prompt=trans_data["prompt"],
                 apply_default=trans_data["apply_default"],
+                execution_mode=trans_data.get("execution_mode", "auto"),
+                section_tokens=trans_data.get("section_tokens"),
             )
             transformation.id = trans_data["id"]
             transformation.created = datetime.fromisoformat(trans_data["created"].replace('Z', '+00:00'))
@@ -45,6 +47,8 @@ class TransformationsService:
             description=trans_data["description"],
             prompt=trans_data["prompt"],
             apply_default=trans_data["apply_default"],
+            execution_mode=trans_data.get("execution_mode", "auto"),
+            section_tokens=trans_data.get("section_tokens"),
         )
         transformation.id = trans_data["id"]
         transformation.created = datetime.fromisoformat(trans_data["created"].replace('Z', '+00:00'))
@@ -73,6 +77,8 @@ class TransformationsService:
             description=trans_data["description"],
             prompt=trans_data["prompt"],
             apply_default=trans_data["apply_default"],
+            execution_mode=trans_data.get("execution_mode", "auto"),
+            section_tokens=trans_data.get("section_tokens"),
         )
         transformation.id = trans_data["id"]
         transformation.created = datetime.fromisoformat(trans_data["created"].replace('Z', '+00:00'))
@@ -87,6 +93,8 @@ class TransformationsService:
             "description": transformation.description,
             "prompt": transformation.prompt,
             "apply_default": transformation.apply_default,
+            "execution_mode": transformation.execution_mode,
+            "section_tokens": transformation.section_tokens,
         }
         trans_data = api_client.update_transformation(transformation.id, **updates)
         
@@ -96,6 +104,8 @@ class TransformationsService:
         transformation.description = trans_data["description"]
         transformation.prompt = trans_data["prompt"]
         transformation.apply_default = trans_data["apply_default"]
+        transformation.execution_mode = trans_data.get("execution_mode", "auto")
+        transformation.section_tokens = trans_data.get("section_tokens")
         transformation.updated = datetime.fromisoformat(trans_data["updated"].replace('Z', '+00:00'))
         
         return transformation
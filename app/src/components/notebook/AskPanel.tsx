@@ -117,6 +117,7 @@ export function AskPanel({ notebookId }: AskPanelProps) {
       console.log('Asking question with streaming:', question);
       
       let fullAnswer = '';
+      let finalAnswer = '';
       
       await apiClient.askStream(
         question,
@@ -134,8 +135,13 @@ export function AskPanel({ notebookId }: AskPanelProps) {
             if (answerRef.current) {
               answerRef.current.scrollTop = answerRef.current.scrollHeight;
             }
-          } else if (chunk.type === 'final_answer' && chunk.final_answer) {
-            fullAnswer = chunk.final_answer;
+          } else if (chunk.type === 'final_answer_token' && chunk.content) {
+            // The final answer replaces the per-search answers as it streams
+            finalAnswer += chunk.content;
+            fullAnswer = finalAnswer;
+            setAnswer(fullAnswer);
+          } else if (chunk.type === 'final_answer' && chunk.content) {
+            fullAnswer = chunk.content;
             setAnswer(fullAnswer);
           }
         },
@@ -140,6 +140,7 @@ export function ChatPanel({ notebookId }: ChatPanelProps) {
 
     try {
       let fullAnswer = '';
+      let finalAnswer = '';
 
       await apiClient.askStream(
         userMessage.content,
@@ -158,8 +159,14 @@ export function ChatPanel({ notebookId }: ChatPanelProps) {
                   : msg
               )
             );
-          } else if (chunk.type === 'final_answer' && chunk.final_answer) {
-            fullAnswer = chunk.final_answer;
+          } else if (
+            (chunk.type === 'final_answer_token' || chunk.type === 'final_answer') &&
+            chunk.content
+          ) {
+            // The final answer replaces the per-search answers as it streams
+            finalAnswer =
+              chunk.type === 'final_answer' ? chunk.content : finalAnswer + chunk.content;
+            fullAnswer = finalAnswer;
             setMessages(prev =>
               prev.map(msg =>
                 msg.id === assistantMessageId
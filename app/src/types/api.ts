@@ -116,6 +116,8 @@ export interface DefaultModels {
   large_context_model: string | null;
 }
 
+export type TransformationExecutionMode = 'auto' | 'single' | 'map_reduce' | 'refine';
+
 export interface Transformation {
   id: string;
   name: string;
@@ -123,6 +125,8 @@ export interface Transformation {
   description: string;
   prompt: string;
   apply_default: boolean;
+  execution_mode: TransformationExecutionMode;
+  section_tokens: number | null;
   created: string;
   updated: string;
 }
@@ -133,6 +137,8 @@ export interface CreateTransformationData {
   description: string;
   prompt: string;
   apply_default?: boolean;
+  execution_mode?: TransformationExecutionMode;
+  section_tokens?: number | null;
 }
 
 export interface UpdateTransformationData {
@@ -141,6 +147,8 @@ export interface UpdateTransformationData {
   description?: string;
   prompt?: string;
   apply_default?: boolean;
+  execution_mode?: TransformationExecutionMode;
+  section_tokens?: number | null;
 }
 
 export interface SearchRequest {
@@ -174,20 +182,43 @@ export interface AskRequest {
   strategy_model: string;
   answer_model: string;
   final_answer_model: string;
+  stream_answers?: boolean;
+}
+
+export interface AskStage {
+  stage: 'strategy' | 'search' | 'answer' | 'final_answer';
+  duration_ms: number;
+  input_tokens?: number;
+  output_tokens?: number;
+  term?: string;
+  searches?: number;
+  results?: number;
+  duplicates_removed?: number;
 }
 
 export interface AskResponse {
   answer: string;
   question: string;
+  stages?: AskStage[];
 }
 
 export interface AskStreamChunk {
-  type: 'strategy' | 'answer' | 'final_answer' | 'complete' | 'error';
+  type:
+    | 'strategy'
+    | 'answer_token'
+    | 'answer'
+    | 'final_answer_token'
+    | 'final_answer'
+    | 'complete'
+    | 'error';
   reasoning?: string;
   searches?: Array<{ term: string; instructions: string }>;
   content?: string;
+  answer_id?: string;
   final_answer?: string;
   message?: string;
+  stages?: AskStage[];
+  ttft_ms?: number;
 }
 
 export interface Settings {
@@ -1,10 +1,17 @@
 """Surreal-commands integration for Open Notebook"""
 
+from .chat_commands import compact_checkpoints_command
+from .embedding_commands import rebuild_embeddings_command
 from .example_commands import analyze_data_command, process_text_command
 from .podcast_commands import generate_podcast_command
+from .source_commands import bulk_ingest_command, process_source_command
 
 __all__ = [
     "generate_podcast_command",
+    "rebuild_embeddings_command",
+    "process_source_command",
+    "bulk_ingest_command",
+    "compact_checkpoints_command",
     "process_text_command",
     "analyze_data_command",
 ]
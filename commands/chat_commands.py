@@ -0,0 +1,48 @@
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+from surreal_commands import CommandInput, CommandOutput, command
+
+from open_notebook.graphs.checkpoints import (
+    CHAT_CHECKPOINT_KEEP,
+    compact_chat_checkpoints,
+)
+
+
+class CompactCheckpointsInput(CommandInput):
+    keep: int = CHAT_CHECKPOINT_KEEP
+
+
+class CompactCheckpointsOutput(CommandOutput):
+    success: bool
+    deleted: Dict[str, int] = {}
+    processing_time: float
+    error_message: Optional[str] = None
+
+
+@command("compact_checkpoints", app="open_notebook")
+async def compact_checkpoints_command(
+    input_data: CompactCheckpointsInput,
+) -> CompactCheckpointsOutput:
+    """
+    Prune the chat checkpoint file: keep the latest checkpoints of each
+    thread, drop the threads of deleted chat sessions and vacuum.
+    """
+    start_time = time.time()
+
+    try:
+        deleted = await compact_chat_checkpoints(keep=input_data.keep)
+        return CompactCheckpointsOutput(
+            success=True,
+            deleted=deleted,
+            processing_time=time.time() - start_time,
+        )
+
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"Compacting chat checkpoints failed: {e}")
+        logger.exception(e)
+        return CompactCheckpointsOutput(
+            success=False, processing_time=processing_time, error_message=str(e)
+        )
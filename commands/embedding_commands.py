@@ -0,0 +1,46 @@
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+from surreal_commands import CommandInput, CommandOutput, command
+
+from open_notebook.domain.vector_index import rebuild_vector_indexes
+
+
+class RebuildEmbeddingsInput(CommandInput):
+    reembed: bool = True
+
+
+class RebuildEmbeddingsOutput(CommandOutput):
+    success: bool
+    counts: Dict[str, int] = {}
+    processing_time: float
+    error_message: Optional[str] = None
+
+
+@command("rebuild_embeddings", app="open_notebook")
+async def rebuild_embeddings_command(
+    input_data: RebuildEmbeddingsInput,
+) -> RebuildEmbeddingsOutput:
+    """
+    Re-embed all content with the current embedding model and rebuild the
+    vector indexes. Run this after changing the default embedding model.
+    """
+    start_time = time.time()
+
+    try:
+        logger.info(f"Rebuilding vector indexes (reembed={input_data.reembed})")
+        counts = await rebuild_vector_indexes(reembed=input_data.reembed)
+        processing_time = time.time() - start_time
+        logger.info(f"Vector indexes rebuilt in {processing_time:.2f}s: {counts}")
+        return RebuildEmbeddingsOutput(
+            success=True, counts=counts, processing_time=processing_time
+        )
+
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"Rebuilding vector indexes failed: {e}")
+        logger.exception(e)
+        return RebuildEmbeddingsOutput(
+            success=False, processing_time=processing_time, error_message=str(e)
+        )
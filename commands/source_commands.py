@@ -0,0 +1,147 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from surreal_commands import CommandInput, CommandOutput, command
+
+from open_notebook.domain.ingestion import run_ingestion
+from open_notebook.domain.transformation import Transformation
+from open_notebook.graphs.source import source_graph
+from open_notebook.progress import CommandProgress, progress_reporter, report_progress
+
+
+class SourceProcessingInput(CommandInput):
+    content_state: Dict[str, Any]
+    notebook_id: Optional[str] = None
+    transformations: List[str] = []
+    embed: bool = False
+    force: bool = False
+
+
+class SourceProcessingOutput(CommandOutput):
+    success: bool
+    source_id: Optional[str] = None
+    title: Optional[str] = None
+    embedded_chunks: int = 0
+    insights: int = 0
+    duplicate: bool = False
+    processing_time: float
+    error_message: Optional[str] = None
+
+
+@command("process_source", app="open_notebook")
+async def process_source_command(
+    input_data: SourceProcessingInput,
+) -> SourceProcessingOutput:
+    """
+    Run the source graph in the background: extract the content, save the
+    source, vectorize it and apply the transformations. Progress is stored on
+    the command record as each stage starts.
+    """
+    start_time = time.time()
+    command_id = (
+        str(input_data.execution_context.command_id)
+        if input_data.execution_context
+        else None
+    )
+
+    async def run() -> SourceProcessingOutput:
+        transformations = [
+            await Transformation.get(transformation_id)
+            for transformation_id in input_data.transformations
+        ]
+        result = await source_graph.ainvoke(
+            {
+                "content_state": input_data.content_state,
+                "notebook_id": input_data.notebook_id,
+                "apply_transformations": transformations,
+                "embed": input_data.embed,
+                "force": input_data.force,
+            }
+        )
+        source = result["source"]
+        embedded_chunks = (
+            await source.get_embedded_chunks() if input_data.embed else 0
+        )
+        await report_progress("done")
+        return SourceProcessingOutput(
+            success=True,
+            source_id=str(source.id),
+            title=source.title,
+            embedded_chunks=embedded_chunks,
+            insights=len(result.get("transformation") or []),
+            duplicate=bool(result.get("duplicate")),
+            processing_time=time.time() - start_time,
+        )
+
+    try:
+        logger.info(f"Processing source in command {command_id}")
+        if command_id:
+            with progress_reporter(CommandProgress(command_id)):
+                output = await run()
+        else:
+            output = await run()
+        logger.info(
+            f"Processed source {output.source_id} in {output.processing_time:.2f}s"
+        )
+        return output
+
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"Source processing failed: {e}")
+        logger.exception(e)
+        return SourceProcessingOutput(
+            success=False, processing_time=processing_time, error_message=str(e)
+        )
+
+
+class BulkIngestionInput(CommandInput):
+    run_id: str
+    concurrency: Dict[str, int] = {}
+
+
+class BulkIngestionOutput(CommandOutput):
+    success: bool
+    run_id: str
+    done: int = 0
+    failed: int = 0
+    processing_time: float
+    error_message: Optional[str] = None
+
+
+@command("bulk_ingest", app="open_notebook")
+async def bulk_ingest_command(input_data: BulkIngestionInput) -> BulkIngestionOutput:
+    """
+    Process the pending items of an ingestion run. Submitting it again for
+    the same run resumes it: finished items are skipped.
+    """
+    start_time = time.time()
+    command_id = (
+        str(input_data.execution_context.command_id)
+        if input_data.execution_context
+        else None
+    )
+
+    try:
+        if command_id:
+            with progress_reporter(CommandProgress(command_id)):
+                counts = await run_ingestion(input_data.run_id, input_data.concurrency)
+        else:
+            counts = await run_ingestion(input_data.run_id, input_data.concurrency)
+        return BulkIngestionOutput(
+            success=True,
+            run_id=input_data.run_id,
+            processing_time=time.time() - start_time,
+            **counts,
+        )
+
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"Bulk ingestion of run {input_data.run_id} failed: {e}")
+        logger.exception(e)
+        return BulkIngestionOutput(
+            success=False,
+            run_id=input_data.run_id,
+            processing_time=processing_time,
+            error_message=str(e),
+        )
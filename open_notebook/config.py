@@ -1,5 +1,26 @@
 import os
 
+from loguru import logger
+
+
+def env_int(name: str, default: int) -> int:
+    """Integer setting from the environment, or `default` if unset or invalid."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Float setting from the environment, or `default` if unset or invalid."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {name}, using default {default}")
+        return default
+
+
 # ROOT DATA FOLDER
 DATA_FOLDER = "./data"
 
@@ -0,0 +1,270 @@
+"""
+Bounded async connection pool for SurrealDB.
+
+Connections are opened once, authenticated once and then reused by every
+repository call running on the event loop the pool was started on.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from loguru import logger
+from surrealdb import AsyncSurreal  # type: ignore
+
+from open_notebook.config import env_float, env_int
+from open_notebook.exceptions import DatabaseOperationError
+
+
+class _PooledConnection:
+    """A live SurrealDB connection plus the bookkeeping the pool needs."""
+
+    def __init__(self, db: AsyncSurreal) -> None:
+        self.db = db
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Keeps between `min_size` and `max_size` authenticated connections open.
+
+    Idle connections that have not been used for `health_check_interval`
+    seconds are pinged before being handed out, and broken connections are
+    replaced transparently.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str],
+        password: Optional[str],
+        namespace: Optional[str],
+        database: Optional[str],
+        min_size: int = 1,
+        max_size: int = 10,
+        acquire_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        connect_retries: int = 3,
+    ) -> None:
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size: min_size={min_size}, max_size={max_size}"
+            )
+        self.url = url
+        self.username = username
+        self.password = password
+        self.namespace = namespace
+        self.database = database
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_retries = connect_retries
+
+        self._idle: List[_PooledConnection] = []
+        self._size = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._closed = True
+
+    @classmethod
+    def from_env(cls, url: str, password: Optional[str]) -> "ConnectionPool":
+        return cls(
+            url=url,
+            username=os.environ.get("SURREAL_USER"),
+            password=password,
+            namespace=os.environ.get("SURREAL_NAMESPACE"),
+            database=os.environ.get("SURREAL_DATABASE"),
+            min_size=env_int("SURREAL_POOL_MIN_SIZE", 1),
+            max_size=env_int("SURREAL_POOL_MAX_SIZE", 10),
+            acquire_timeout=env_float("SURREAL_POOL_ACQUIRE_TIMEOUT", 10.0),
+            health_check_interval=env_float(
+                "SURREAL_POOL_HEALTH_CHECK_INTERVAL", 30.0
+            ),
+        )
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or in use."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """The event loop the pool was started on."""
+        return self._loop
+
+    def is_bound_to_running_loop(self) -> bool:
+        """True if the pool was started on the loop that is currently running."""
+        if self._closed or self._loop is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def start(self) -> None:
+        if not self._closed:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.max_size)
+        self._lock = asyncio.Lock()
+        self._closed = False
+        try:
+            await self._fill_to_min()
+        except DatabaseOperationError as e:
+            # Keep serving: connections are opened on demand and the
+            # maintenance task keeps retrying to reach min_size.
+            logger.error(f"SurrealDB pool could not reach min_size on start: {e}")
+        if self.health_check_interval > 0:
+            self._maintenance_task = asyncio.create_task(self._maintain())
+        logger.info(
+            f"SurrealDB pool started with {self._size} connections "
+            f"(min={self.min_size}, max={self.max_size})"
+        )
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+        logger.info("SurrealDB pool closed")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncSurreal]:
+        if self._closed or self._semaphore is None:
+            raise DatabaseOperationError("Connection pool is not running")
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(), timeout=self.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            raise DatabaseOperationError(
+                f"Timed out after {self.acquire_timeout}s waiting for a database connection"
+            )
+
+        conn: Optional[_PooledConnection] = None
+        try:
+            conn = await self._checkout()
+            try:
+                yield conn.db
+            except Exception:
+                # Query errors leave the socket usable; only drop it if it no
+                # longer answers a ping.
+                if not await self._is_healthy(conn):
+                    await self._discard(conn)
+                    conn = None
+                raise
+            except BaseException:
+                # Cancelled mid-query: the socket may still carry a pending
+                # response, so never hand it to another caller.
+                asyncio.ensure_future(self._discard(conn))
+                conn = None
+                raise
+        finally:
+            if conn is not None:
+                self._release(conn)
+            self._semaphore.release()
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if time.monotonic() - conn.last_used < self.health_check_interval:
+                return conn
+            if await self._is_healthy(conn):
+                return conn
+            logger.warning("Dropping unhealthy SurrealDB connection from pool")
+            await self._discard(conn)
+        return await self._open()
+
+    def _release(self, conn: _PooledConnection) -> None:
+        if self._closed:
+            asyncio.ensure_future(self._discard(conn))
+            return
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+
+    async def _open(self) -> _PooledConnection:
+        last_error: Optional[Exception] = None
+        for attempt in range(1, self.connect_retries + 1):
+            db = AsyncSurreal(self.url)
+            try:
+                await db.signin({"username": self.username, "password": self.password})
+                await db.use(self.namespace, self.database)
+                self._size += 1
+                return _PooledConnection(db)
+            except Exception as e:
+                last_error = e
+                logger.warning(
+                    f"SurrealDB connection attempt {attempt}/{self.connect_retries} failed: {e}"
+                )
+                try:
+                    await db.close()
+                except Exception:
+                    pass
+                if attempt < self.connect_retries:
+                    await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+        raise DatabaseOperationError(
+            f"Could not open a database connection: {last_error}"
+        )
+
+    async def _discard(self, conn: _PooledConnection) -> None:
+        self._size -= 1
+        try:
+            await conn.db.close()
+        except Exception as e:
+            logger.debug(f"Error closing SurrealDB connection: {e}")
+
+    async def _is_healthy(self, conn: _PooledConnection) -> bool:
+        try:
+            await asyncio.wait_for(conn.db.query("RETURN true;"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _fill_to_min(self) -> None:
+        assert self._lock is not None
+        async with self._lock:
+            while not self._closed and self._size < self.min_size:
+                self._idle.append(await self._open())
+
+    async def _maintain(self) -> None:
+        """Periodically ping idle connections and top the pool up to min_size."""
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                now = time.monotonic()
+                for conn in list(self._idle):
+                    if now - conn.last_used < self.health_check_interval:
+                        continue
+                    # Take it out while pinging so nobody checks it out meanwhile
+                    if conn not in self._idle:
+                        continue
+                    self._idle.remove(conn)
+                    if await self._is_healthy(conn):
+                        conn.last_used = time.monotonic()
+                        self._idle.append(conn)
+                    else:
+                        logger.warning("Replacing unhealthy SurrealDB connection")
+                        await self._discard(conn)
+                await self._fill_to_min()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"SurrealDB pool maintenance failed: {e}")
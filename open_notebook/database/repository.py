@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
@@ -6,6 +7,8 @@ from typing import Any, Dict, List, Optional, TypeVar, Union
 from loguru import logger
 from surrealdb import AsyncSurreal, RecordID  # type: ignore
 
+from open_notebook.database.connection_pool import ConnectionPool
+
 T = TypeVar("T", Dict[str, Any], List[Dict[str, Any]])
 
 
@@ -26,14 +29,47 @@ def get_database_password():
     return os.getenv("SURREAL_PASSWORD") or os.getenv("SURREAL_PASS")
 
 
+# Values that never contain a RecordID, checked by exact type
+_LEAF_TYPES = frozenset({str, int, float, bool, type(None), datetime, bytes})
+_NUMERIC_TYPES = frozenset({float, int})
+# Fields that only ever hold plain data, whatever their size
+_PLAIN_FIELDS = frozenset({"embedding"})
+
+
 def parse_record_ids(obj: Any) -> Any:
-    """Recursively parse and convert RecordIDs into strings."""
-    if isinstance(obj, dict):
-        return {k: parse_record_ids(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [parse_record_ids(item) for item in obj]
-    elif isinstance(obj, RecordID):
+    """
+    Recursively parse and convert RecordIDs into strings.
+
+    Containers without RecordIDs are returned as they are instead of being
+    copied, numeric lists such as embeddings are recognised with one C-level
+    pass and skipped, and _PLAIN_FIELDS are not looked into at all.
+    """
+    if isinstance(obj, RecordID):
         return str(obj)
+    if isinstance(obj, dict):
+        converted: Optional[Dict[Any, Any]] = None
+        for key, value in obj.items():
+            if type(value) in _LEAF_TYPES or key in _PLAIN_FIELDS:
+                continue
+            new_value = parse_record_ids(value)
+            if new_value is not value:
+                if converted is None:
+                    converted = dict(obj)
+                converted[key] = new_value
+        return obj if converted is None else converted
+    if isinstance(obj, list):
+        if not obj or set(map(type, obj)) <= _NUMERIC_TYPES:
+            return obj
+        converted_list: Optional[List[Any]] = None
+        for i, item in enumerate(obj):
+            if type(item) in _LEAF_TYPES:
+                continue
+            new_item = parse_record_ids(item)
+            if new_item is not item:
+                if converted_list is None:
+                    converted_list = list(obj)
+                converted_list[i] = new_item
+        return obj if converted_list is None else converted_list
     return obj
 
 
@@ -44,8 +80,60 @@ def ensure_record_id(value: Union[str, RecordID]) -> RecordID:
     return RecordID.parse(value)
 
 
+_pool: Optional[ConnectionPool] = None
+
+
+async def init_db_pool() -> ConnectionPool:
+    """Start the shared connection pool on the running event loop."""
+    global _pool
+    if _pool is None or not _pool.is_bound_to_running_loop():
+        if _pool is not None:
+            _discard_pool(_pool)
+        _pool = ConnectionPool.from_env(get_database_url(), get_database_password())
+        await _pool.start()
+    return _pool
+
+
+def _discard_pool(pool: ConnectionPool) -> None:
+    """
+    Let go of a pool started on another event loop. Its connections can only
+    be closed on that loop, so this is scheduled there while it still runs;
+    otherwise the loop is gone and its connections are dropped with it.
+    """
+    loop = pool.loop
+    if loop is not None and loop.is_running():
+        logger.info("Closing the SurrealDB pool of another event loop")
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+    else:
+        logger.warning(
+            "Discarding the SurrealDB pool of an event loop that no longer runs"
+        )
+
+
+async def close_db_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_db_pool() -> Optional[ConnectionPool]:
+    """Return the shared pool if it serves the current event loop."""
+    if _pool is not None and _pool.is_bound_to_running_loop():
+        return _pool
+    return None
+
+
 @asynccontextmanager
 async def db_connection():
+    # Pooled connections are bound to the loop that opened them. Callers on
+    # other loops (e.g. Streamlit's asyncio.run) get a short-lived connection.
+    pool = get_db_pool()
+    if pool is not None:
+        async with pool.acquire() as connection:
+            yield connection
+        return
+
     db = AsyncSurreal(get_database_url())
     await db.signin(
         {
@@ -1,8 +1,29 @@
+import base64
+import json
+import re
 from datetime import datetime
-from typing import Any, ClassVar, Dict, List, Optional, Type, TypeVar, cast
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+)
 
 from loguru import logger
-from pydantic import BaseModel, ValidationError, field_validator, model_validator
+from pydantic import (
+    BaseModel,
+    PrivateAttr,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+from surrealdb import RecordID  # type: ignore
 
 from open_notebook.database.repository import (
     ensure_record_id,
@@ -21,15 +42,50 @@ from open_notebook.exceptions import (
 
 T = TypeVar("T", bound="ObjectModel")
 
+ORDER_BY_PATTERN = re.compile(r"^\s*(\w+)(?:\s+(asc|desc))?\s*$", re.IGNORECASE)
+
 
 class ObjectModel(BaseModel):
     id: Optional[str] = None
     table_name: ClassVar[str] = ""
+    # Heavy columns that get() and get_all() skip unless asked for with load=.
+    # Embedding vectors are stored on the rows of several tables but never
+    # needed by the models; subclasses add their own large fields.
+    deferred_fields: ClassVar[Tuple[str, ...]] = ("embedding",)
+    # Fields get_embedding_content() reads; save() only re-embeds when one of
+    # them changed. Empty means every save re-embeds.
+    embedding_fields: ClassVar[Tuple[str, ...]] = ()
     created: Optional[datetime] = None
     updated: Optional[datetime] = None
+    # Field values as last read from or written to the database, None for
+    # objects that were not loaded from it
+    _persisted: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    # Fields that were loaded, for objects loaded with get_all(fields=...)
+    _loaded_fields: Optional[Set[str]] = PrivateAttr(default=None)
 
     @classmethod
-    async def get_all(cls: Type[T], order_by=None) -> List[T]:
+    async def get_all(
+        cls: Type[T],
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        fields: Optional[List[str]] = None,
+        load: Optional[List[str]] = None,
+    ) -> List[T]:
+        """
+        Fetch records of this model.
+
+        order_by: "<field> [asc|desc]". With a limit or cursor the results are
+            keyset-paginated on (field, id), by default on "updated desc".
+        cursor: page_cursor() of the previous page.
+        filters: {field: value}. Lists match with IN, and booleans treat a
+            missing field as false, like the model defaults.
+        fields: only load these fields (id and the sort field are always
+            loaded). Each loaded field is validated and every other field is
+            None; such objects cannot be saved.
+        load: deferred fields to load as well, e.g. ["embedding"].
+        """
         try:
             # If called from a specific subclass, use its table_name
             if cls.table_name:
@@ -40,27 +96,140 @@ class ObjectModel(BaseModel):
                 raise InvalidInputError(
                     "get_all() must be called from a specific model class"
                 )
-            if order_by:
-                query = f"SELECT * FROM {table_name} ORDER BY {order_by}"
-            else:
-                query = f"SELECT * FROM {table_name}"
+            paginate = limit is not None or cursor is not None
+            if order_by is None and paginate:
+                order_by = "updated desc"
+            sort_field, direction = (
+                cls._parse_order_by(order_by) if order_by else (None, None)
+            )
 
-            result = await repo_query(query)
+            conditions: List[str] = []
+            vars: Dict[str, Any] = {}
+            for i, (field, value) in enumerate((filters or {}).items()):
+                cls._check_field(field)
+                name = f"filter_{i}"
+                if field == "id":
+                    value = (
+                        [ensure_record_id(v) for v in value]
+                        if isinstance(value, list)
+                        else ensure_record_id(value)
+                    )
+                if isinstance(value, list):
+                    conditions.append(f"{field} IN ${name}")
+                elif isinstance(value, bool):
+                    conditions.append(f"({field} ?? false) = ${name}")
+                else:
+                    conditions.append(f"{field} = ${name}")
+                vars[name] = value
+
+            if cursor:
+                cursor_field, vars["cursor_value"], vars["cursor_id"] = (
+                    cls._decode_cursor(cursor)
+                )
+                if cursor_field != sort_field:
+                    raise InvalidInputError("Cursor does not match the sort order")
+                op = "<" if direction == "desc" else ">"
+                conditions.append(
+                    f"({sort_field} {op} $cursor_value OR "
+                    f"({sort_field} = $cursor_value AND id {op} $cursor_id))"
+                )
+
+            if fields:
+                for field in fields:
+                    cls._check_field(field)
+                selected = ["id"] + ([sort_field] if sort_field else []) + fields
+                projection = ", ".join(dict.fromkeys(selected))
+            else:
+                projection = cls._select_all(load)
+            query = f"SELECT {projection} FROM {table_name}"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            if sort_field:
+                query += f" ORDER BY {sort_field} {direction}"
+                if paginate:
+                    query += f", id {direction}"
+            if limit is not None:
+                query += " LIMIT $limit"
+                vars["limit"] = limit
+
+            result = await repo_query(query, vars)
             objects = []
             for obj in result:
                 try:
-                    objects.append(target_class(**obj))
+                    instance = (
+                        target_class._from_partial(obj)
+                        if fields
+                        else target_class(**obj)
+                    )
+                    objects.append(instance._mark_clean())
                 except Exception as e:
                     logger.critical(f"Error creating object: {str(e)}")
 
             return objects
+        except InvalidInputError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching all {cls.table_name}: {str(e)}")
             logger.exception(e)
             raise DatabaseOperationError(e)
 
     @classmethod
-    async def get(cls: Type[T], id: str) -> T:
+    def page_cursor(
+        cls, page: List[T], limit: Optional[int], order_by: Optional[str] = None
+    ) -> Optional[str]:
+        """Cursor for the page after `page`, or None if it was the last one."""
+        if not page or limit is None or len(page) < limit:
+            return None
+        sort_field, _ = cls._parse_order_by(order_by or "updated desc")
+        value = getattr(page[-1], sort_field)
+        if isinstance(value, datetime):
+            value = {"datetime": value.isoformat()}
+        payload = json.dumps([sort_field, value, page[-1].id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def _decode_cursor(cls, cursor: str) -> Tuple[str, Any, RecordID]:
+        try:
+            field, value, record_id = json.loads(base64.urlsafe_b64decode(cursor))
+            if isinstance(value, dict):
+                value = datetime.fromisoformat(value["datetime"])
+            return field, value, ensure_record_id(record_id)
+        except Exception:
+            raise InvalidInputError("Invalid cursor")
+
+    @classmethod
+    def _parse_order_by(cls, order_by: str) -> Tuple[str, str]:
+        match = ORDER_BY_PATTERN.match(order_by)
+        if not match:
+            raise InvalidInputError(f"Invalid order_by: {order_by}")
+        field, direction = match.group(1), (match.group(2) or "asc").lower()
+        cls._check_field(field)
+        return field, direction
+
+    @classmethod
+    def _check_field(cls, field: str) -> None:
+        if field != "id" and field not in cls.model_fields:
+            raise InvalidInputError(f"Unknown field for {cls.table_name}: {field}")
+
+    @classmethod
+    def _from_partial(cls: Type[T], data: Dict[str, Any]) -> T:
+        """Build an object from a projected row, leaving missing fields None."""
+        obj = cls.model_construct(**{name: None for name in cls.model_fields})
+        for key, value in data.items():
+            if key in cls.model_fields:
+                # Validates and converts this one field, e.g. dicts to models
+                cls.__pydantic_validator__.validate_assignment(obj, key, value)
+        obj._loaded_fields = set(data) & set(cls.model_fields)
+        return obj
+
+    @classmethod
+    def _select_all(cls, load: Optional[List[str]] = None) -> str:
+        omitted = [field for field in cls.deferred_fields if field not in (load or [])]
+        return f"* OMIT {', '.join(omitted)}" if omitted else "*"
+
+    @classmethod
+    async def get(cls: Type[T], id: str, load: Optional[List[str]] = None) -> T:
+        """Fetch one record by id. Deferred fields are only loaded if in `load`."""
         if not id:
             raise InvalidInputError("ID cannot be empty")
         try:
@@ -77,9 +246,12 @@ class ObjectModel(BaseModel):
                     raise InvalidInputError(f"No class found for table {table_name}")
                 target_class = cast(Type[T], found_class)
 
-            result = await repo_query("SELECT * FROM $id", {"id": ensure_record_id(id)})
+            result = await repo_query(
+                f"SELECT {target_class._select_all(load)} FROM $id",
+                {"id": ensure_record_id(id)},
+            )
             if result:
-                return target_class(**result[0])
+                return target_class(**result[0])._mark_clean()
             else:
                 raise NotFoundError(f"{table_name} with id {id} not found")
         except Exception as e:
@@ -109,15 +281,56 @@ class ObjectModel(BaseModel):
     def get_embedding_content(self) -> Optional[str]:
         return None
 
-    async def save(self) -> None:
-        from open_notebook.domain.models import model_manager
+    def _mark_clean(self: T) -> T:
+        self._persisted = self.model_dump()
+        return self
 
+    def dirty_fields(self) -> Set[str]:
+        """
+        Fields changed since the object was loaded or last saved. Every field
+        is dirty for objects that were not loaded from the database.
+        """
+        current = self.model_dump()
+        if self.id is None or self._persisted is None:
+            return set(current)
+        return {
+            key
+            for key, value in current.items()
+            if key not in self._persisted or self._persisted[key] != value
+        }
+
+    async def save(self, reembed: bool = False) -> None:
+        """
+        Create the record, or update only the fields that changed. The
+        embedding is recomputed when an embedding field changed, for new
+        records, or when `reembed` is set.
+        """
+        from open_notebook.domain.embeddings import embed_text
+        from open_notebook.domain.models import model_manager
+        from open_notebook.domain.notebook_context import notebook_context_cache
+        from open_notebook.domain.vector_backends import get_vector_backend
+
+        if self._loaded_fields is not None:
+            # Its other fields are None, which would fail validation or be
+            # embedded as if they were empty
+            raise InvalidInputError(
+                f"{self.id} was loaded with only {sorted(self._loaded_fields)}; "
+                "load it with get() before saving it"
+            )
         try:
             self.model_validate(self.model_dump(), strict=True)
-            data = self._prepare_save_data()
+            dirty = self.dirty_fields()
+            data = {
+                key: value
+                for key, value in self._prepare_save_data().items()
+                if key in dirty
+            }
             data["updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            if self.needs_embedding():
+            embed = reembed or not self.embedding_fields or self.id is None
+            if not embed:
+                embed = any(field in dirty for field in self.embedding_fields)
+            if self.needs_embedding() and embed:
                 embedding_content = self.get_embedding_content()
                 if embedding_content:
                     EMBEDDING_MODEL = await model_manager.get_embedding_model()
@@ -126,7 +339,7 @@ class ObjectModel(BaseModel):
                             "No embedding model found. Content will not be searchable."
                         )
                     data["embedding"] = (
-                        (await EMBEDDING_MODEL.aembed([embedding_content]))[0]
+                        await embed_text(EMBEDDING_MODEL, embedding_content)
                         if EMBEDDING_MODEL
                         else []
                     )
@@ -135,12 +348,13 @@ class ObjectModel(BaseModel):
                 data["created"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 repo_result = await repo_create(self.__class__.table_name, data)
             else:
-                data["created"] = (
-                    self.created.strftime("%Y-%m-%d %H:%M:%S")
-                    if isinstance(self.created, datetime)
-                    else self.created
-                )
-                logger.debug(f"Updating record with id {self.id}")
+                if "created" in data:
+                    data["created"] = (
+                        self.created.strftime("%Y-%m-%d %H:%M:%S")
+                        if isinstance(self.created, datetime)
+                        else self.created
+                    )
+                logger.debug(f"Updating {sorted(data)} of record {self.id}")
                 repo_result = await repo_update(
                     self.__class__.table_name, self.id, data
                 )
@@ -151,6 +365,13 @@ class ObjectModel(BaseModel):
                         setattr(self, key, type(getattr(self, key))(**value))
                     else:
                         setattr(self, key, value)
+            self._mark_clean()
+
+            if data.get("embedding"):
+                await get_vector_backend().index_item(
+                    self.id, self.__class__.table_name, self.id, data["embedding"]
+                )
+            notebook_context_cache.invalidate(self.id)
 
         except ValidationError as e:
             logger.error(f"Validation failed: {e}")
@@ -166,9 +387,15 @@ class ObjectModel(BaseModel):
     async def delete(self) -> bool:
         if self.id is None:
             raise InvalidInputError("Cannot delete object without an ID")
+        from open_notebook.domain.notebook_context import notebook_context_cache
+        from open_notebook.domain.vector_backends import get_vector_backend
+
         try:
             logger.debug(f"Deleting record with id {self.id}")
-            return await repo_delete(self.id)
+            result = await repo_delete(self.id)
+            await get_vector_backend().remove(self.id)
+            notebook_context_cache.invalidate(self.id)
+            return result
         except Exception as e:
             logger.error(
                 f"Error deleting {self.__class__.table_name} with id {self.id}: {str(e)}"
@@ -0,0 +1,162 @@
+"""
+Embedding requests with a persistent, content-addressed cache.
+
+Vectors are cached in a local SQLite file keyed by (provider/model name,
+sha256 of the whitespace- and Unicode-normalised text), so re-saving an
+unchanged note, re-vectorizing a source or embedding boilerplate chunks
+shared by many documents does not call the provider again. The cache is
+capped at EMBEDDING_CACHE_MAX_ENTRIES rows and evicts the least recently
+used ones; 0 disables it.
+"""
+
+import asyncio
+import hashlib
+import os
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from esperanto import EmbeddingModel
+from loguru import logger
+
+from open_notebook.config import DATA_FOLDER, env_int
+from open_notebook.executors import run_in_thread
+from open_notebook.progress import report_progress
+from open_notebook.sqlite_cache import SQLiteLRUCache
+
+EMBEDDING_BATCH_SIZE = env_int("EMBEDDING_BATCH_SIZE", 64)
+EMBEDDING_CONCURRENCY = env_int("EMBEDDING_CONCURRENCY", 4)
+EMBEDDING_CACHE_FILE = os.getenv(
+    "EMBEDDING_CACHE_FILE", f"{DATA_FOLDER}/sqlite-db/embedding_cache.sqlite"
+)
+EMBEDDING_CACHE_MAX_ENTRIES = env_int("EMBEDDING_CACHE_MAX_ENTRIES", 50_000)
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+def model_key(embedding_model: EmbeddingModel) -> str:
+    provider = getattr(embedding_model, "provider", type(embedding_model).__name__)
+    return f"{provider}/{getattr(embedding_model, 'model_name', '')}"
+
+
+class EmbeddingCache(SQLiteLRUCache):
+    """float32 vectors keyed by embedding model and text hash."""
+
+    table = "embedding_cache"
+
+    def encode(self, value: List[float]) -> bytes:
+        return array("f", value).tobytes()
+
+    def decode(self, stored: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(stored)
+        return vector.tolist()
+
+    @staticmethod
+    def _key(model: str, text_hash: bytes) -> bytes:
+        return model.encode("utf-8") + b"\x00" + text_hash
+
+    def get_many(self, model: str, hashes: Sequence[bytes]) -> Dict[bytes, List[float]]:
+        keys = {self._key(model, key): key for key in hashes}
+        return {keys[key]: vector for key, vector in self.lookup(list(keys)).items()}
+
+    def put_many(self, model: str, vectors: Dict[bytes, List[float]]) -> None:
+        self.store({self._key(model, key): vector for key, vector in vectors.items()})
+
+
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_FILE, EMBEDDING_CACHE_MAX_ENTRIES)
+
+
+async def _embed_uncached(
+    embedding_model: EmbeddingModel,
+    texts: List[str],
+    batch_size: int,
+    concurrency: int,
+    done: int = 0,
+    total: Optional[int] = None,
+) -> List[List[float]]:
+    """`done` and `total` only feed progress reports, e.g. to count cache hits."""
+    batch_size = max(1, batch_size)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    total = total if total is not None else len(texts)
+
+    async def embed_batch(idx: int, batch: List[str]) -> List[List[float]]:
+        nonlocal done
+        async with semaphore:
+            logger.debug(
+                f"Embedding batch {idx + 1}/{len(batches)} ({len(batch)} texts)"
+            )
+            vectors = await embedding_model.aembed(batch)
+        done += len(batch)
+        await report_progress("embedding", done, total)
+        return vectors
+
+    results = await asyncio.gather(
+        *(embed_batch(idx, batch) for idx, batch in enumerate(batches))
+    )
+    embeddings = [embedding for batch in results for embedding in batch]
+    if len(embeddings) != len(texts):
+        raise ValueError(
+            f"Embedding model returned {len(embeddings)} vectors for {len(texts)} texts"
+        )
+    return embeddings
+
+
+async def embed_in_batches(
+    embedding_model: EmbeddingModel,
+    texts: List[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    concurrency: int = EMBEDDING_CONCURRENCY,
+) -> List[List[float]]:
+    """
+    Embed texts in batches, with at most `concurrency` requests in flight.
+    Cached vectors are reused and only the remaining texts are sent, each
+    distinct text once.
+    """
+    if not texts:
+        return []
+    if not embedding_cache.enabled:
+        return await _embed_uncached(embedding_model, texts, batch_size, concurrency)
+
+    model = model_key(embedding_model)
+    hashes = [text_hash(text) for text in texts]
+    try:
+        cached = await run_in_thread(embedding_cache.get_many, model, hashes)
+    except Exception as e:
+        logger.warning(f"Embedding cache lookup failed: {e}")
+        cached = {}
+
+    pending: Dict[bytes, str] = {}
+    for key, text in zip(hashes, texts):
+        if key not in cached and key not in pending:
+            pending[key] = text
+    embedding_cache.hits += len(texts) - len(pending)
+    embedding_cache.misses += len(pending)
+
+    if pending:
+        fresh = await _embed_uncached(
+            embedding_model,
+            list(pending.values()),
+            batch_size,
+            concurrency,
+            done=len(texts) - len(pending),
+            total=len(texts),
+        )
+        new_vectors = dict(zip(pending.keys(), fresh))
+        try:
+            await run_in_thread(embedding_cache.put_many, model, new_vectors)
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+        cached.update(new_vectors)
+    return [cached[key] for key in hashes]
+
+
+async def embed_text(embedding_model: EmbeddingModel, text: str) -> List[float]:
+    return (await embed_in_batches(embedding_model, [text]))[0]
@@ -0,0 +1,334 @@
+"""
+Bulk ingestion of many sources into a notebook.
+
+A run is created from a directory, a JSON manifest or a JSONL/text list of
+URLs: every item gets an ingestion_item record with its status. run_ingestion()
+then pipelines the items through extraction, saving, embedding and
+transformations, with a separate concurrency limit per stage so slow
+extraction does not starve the embedding provider or the other way around.
+
+Progress is stored per item as it moves through the stages, so a run that
+crashed can be resumed by calling run_ingestion() again: finished items are
+skipped, and items that already have a source continue from the stage they
+had reached.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, ClassVar, Dict, List, Optional
+
+from loguru import logger
+
+from open_notebook.config import env_int
+from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.domain.base import ObjectModel
+from open_notebook.domain.notebook import Source
+from open_notebook.domain.transformation import Transformation
+from open_notebook.exceptions import InvalidInputError, NotFoundError
+from open_notebook.progress import progress_reporter, report_progress
+
+INGEST_EXTRACT_CONCURRENCY = env_int("INGEST_EXTRACT_CONCURRENCY", 4)
+INGEST_EMBED_CONCURRENCY = env_int("INGEST_EMBED_CONCURRENCY", 2)
+INGEST_TRANSFORM_CONCURRENCY = env_int("INGEST_TRANSFORM_CONCURRENCY", 2)
+# Documents picked up from a directory; anything else (e.g. images) is skipped
+DOCUMENT_EXTENSIONS = frozenset(
+    {".pdf", ".md", ".markdown", ".txt", ".html", ".htm", ".docx", ".pptx", ".epub"}
+)
+ITEM_INSERT_BATCH_SIZE = 500
+STAGES = ("extract", "embed", "transform")
+
+
+class IngestionRun(ObjectModel):
+    table_name: ClassVar[str] = "ingestion_run"
+    notebook_id: Optional[str] = None
+    origin: Optional[str] = None
+    transformations: List[str] = []
+    embed: bool = True
+    force: bool = False
+    status: str = "pending"
+    total: int = 0
+    command: Optional[str] = None
+
+
+def normalize_item(entry: Any, base: Optional[Path] = None) -> Dict[str, Any]:
+    """Turn a manifest entry (a URL, a path or an object) into an item."""
+    if isinstance(entry, str):
+        entry = {"url": entry} if "://" in entry else {"file_path": entry}
+    if not isinstance(entry, dict):
+        raise InvalidInputError(f"Invalid ingestion item: {entry!r}")
+
+    item = {
+        key: entry[key]
+        for key in ("url", "file_path", "content", "title")
+        if entry.get(key)
+    }
+    if "file_path" in item and base and not os.path.isabs(item["file_path"]):
+        item["file_path"] = str(base / item["file_path"])
+    sources = [key for key in ("url", "file_path", "content") if key in item]
+    if len(sources) != 1:
+        raise InvalidInputError(
+            "Each ingestion item needs exactly one of url, file_path or content"
+        )
+    key = entry.get("key") or item.get("url") or item.get("file_path")
+    if not key:
+        key = "content:" + hashlib.sha256(item["content"].encode()).hexdigest()
+    return dict(key=key, input=item)
+
+
+def discover_items(path: str) -> List[Dict[str, Any]]:
+    """
+    Items from a directory (every document file below it), a JSON manifest
+    (a list of entries), or a JSONL or text file with one entry per line.
+    An entry is a URL, a file path, or an object with url, file_path or
+    content and optional title and key.
+    """
+    root = Path(path)
+    if root.is_dir():
+        return [
+            dict(key=str(file.relative_to(root)), input={"file_path": str(file)})
+            for file in sorted(root.rglob("*"))
+            if file.is_file() and file.suffix.lower() in DOCUMENT_EXTENSIONS
+        ]
+    if not root.is_file():
+        raise InvalidInputError(f"Path not found: {path}")
+
+    text = root.read_text(encoding="utf-8")
+    if root.suffix.lower() == ".json":
+        entries = json.loads(text)
+        if not isinstance(entries, list):
+            raise InvalidInputError("A JSON manifest must be a list of entries")
+    else:
+        entries = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entries.append(json.loads(line) if line.startswith("{") else line)
+    return [normalize_item(entry, root.parent) for entry in entries]
+
+
+async def create_run(
+    items: List[Dict[str, Any]],
+    notebook_id: Optional[str],
+    transformations: Optional[List[str]] = None,
+    embed: bool = True,
+    force: bool = False,
+    origin: Optional[str] = None,
+) -> IngestionRun:
+    """Create a run and its pending items. Items with a repeated key are dropped."""
+    unique = list({item["key"]: item for item in items}.values())
+    if not unique:
+        raise InvalidInputError("Nothing to ingest")
+    run = IngestionRun(
+        notebook_id=notebook_id,
+        origin=origin,
+        transformations=transformations or [],
+        embed=embed,
+        force=force,
+        total=len(unique),
+    )
+    await run.save()
+
+    run_id = ensure_record_id(run.id)
+    for start in range(0, len(unique), ITEM_INSERT_BATCH_SIZE):
+        rows = [
+            dict(
+                run=run_id,
+                key=item["key"],
+                input=item["input"],
+                status="pending",
+                transformed=[],
+                attempts=0,
+            )
+            for item in unique[start : start + ITEM_INSERT_BATCH_SIZE]
+        ]
+        await repo_query(
+            "INSERT INTO ingestion_item $rows RETURN NONE", {"rows": rows}
+        )
+    logger.info(f"Created ingestion run {run.id} with {len(unique)} items")
+    return run
+
+
+async def _update_item(item_id: Any, **data: Any) -> None:
+    await repo_query(
+        "UPDATE $item MERGE $data RETURN NONE",
+        {"item": ensure_record_id(item_id), "data": data},
+    )
+
+
+async def _process_item(
+    item: Dict[str, Any],
+    run: IngestionRun,
+    transformations: List[Transformation],
+    limits: Dict[str, asyncio.Semaphore],
+) -> bool:
+    from open_notebook.graphs.source import (
+        check_duplicate,
+        content_process,
+        save_source,
+        transform_content,
+    )
+
+    item_id = item["id"]
+    try:
+        source: Optional[Source] = None
+        if item.get("source"):
+            try:
+                source = await Source.get(item["source"])
+            except NotFoundError:
+                source = None
+
+        if source is None:
+            state: Dict[str, Any] = {
+                "content_state": dict(item["input"]),
+                "notebook_id": run.notebook_id,
+                "embed": False,
+                "force": run.force,
+            }
+            state.update(await check_duplicate(state))  # type: ignore
+            if not state.get("duplicate"):
+                async with limits["extract"]:
+                    await _update_item(item_id, status="extracting")
+                    state.update(await content_process(state))  # type: ignore
+                content_state = state["content_state"]
+                if item["input"].get("title") and not content_state.title:
+                    content_state.title = item["input"]["title"]
+                state.update(await save_source(state))  # type: ignore
+            source = state["source"]
+            if state.get("duplicate"):
+                await _update_item(
+                    item_id, status="done", source=source.id, duplicate=True
+                )
+                return True
+            await _update_item(item_id, status="saved", source=source.id)
+
+        if run.embed and not item.get("embedded"):
+            async with limits["embed"]:
+                await _update_item(item_id, status="embedding")
+                await source.vectorize()
+            await _update_item(item_id, embedded=True)
+
+        transformed = list(item.get("transformed") or [])
+        for transformation in transformations:
+            if transformation.id in transformed:
+                continue
+            async with limits["transform"]:
+                await _update_item(item_id, status="transforming")
+                await transform_content(
+                    {"source": source, "transformation": transformation}
+                )
+            transformed.append(transformation.id)
+            await _update_item(item_id, transformed=transformed)
+
+        await _update_item(item_id, status="done", error=None)
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to ingest {item['key']}: {e}")
+        await _update_item(
+            item_id,
+            status="failed",
+            error=str(e),
+            attempts=(item.get("attempts") or 0) + 1,
+        )
+        return False
+
+
+async def run_ingestion(
+    run_id: str, concurrency: Optional[Dict[str, int]] = None
+) -> Dict[str, int]:
+    """
+    Process every item of the run that is not done yet. `concurrency` maps
+    extract, embed and transform to the number of items allowed in that stage
+    at once. Returns the number of items done and failed in this pass.
+    """
+    run = await IngestionRun.get(run_id)
+    transformations = [
+        await Transformation.get(transformation_id)
+        for transformation_id in run.transformations
+    ]
+    sizes = dict(
+        extract=INGEST_EXTRACT_CONCURRENCY,
+        embed=INGEST_EMBED_CONCURRENCY,
+        transform=INGEST_TRANSFORM_CONCURRENCY,
+    )
+    sizes.update(concurrency or {})
+    limits = {stage: asyncio.Semaphore(max(1, sizes[stage])) for stage in STAGES}
+
+    items = await repo_query(
+        "SELECT * FROM ingestion_item WHERE run = $run AND status != 'done' "
+        "ORDER BY key",
+        {"run": ensure_record_id(run.id)},
+    )
+    skipped = run.total - len(items)
+    logger.info(
+        f"Ingestion run {run.id}: {len(items)} items to process, {skipped} already done"
+    )
+    run.status = "running"
+    await run.save()
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    counts = dict(done=0, failed=0)
+
+    async def worker() -> None:
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            # Stage reports of the item's own pipeline would be noise here
+            with progress_reporter(None):
+                ok = await _process_item(item, run, transformations, limits)
+            counts["done" if ok else "failed"] += 1
+            await report_progress(
+                "ingesting", skipped + counts["done"] + counts["failed"], run.total
+            )
+
+    # One worker per stage slot keeps every stage busy without holding more
+    # extracted documents in memory than the stages can take
+    workers = min(len(items), sum(max(1, size) for size in sizes.values()))
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+
+    run.status = "completed" if counts["failed"] == 0 else "completed_with_errors"
+    await run.save()
+    logger.info(f"Ingestion run {run.id} finished: {counts}")
+    return counts
+
+
+async def get_run_status(
+    run_id: str, status: Optional[str] = None, limit: int = 100, start: int = 0
+) -> Dict[str, Any]:
+    """Counts per item status, and the items, optionally of one status."""
+    run = await IngestionRun.get(run_id)
+    vars: Dict[str, Any] = {
+        "run": ensure_record_id(run.id),
+        "limit": limit,
+        "start": start,
+    }
+    counts = await repo_query(
+        "SELECT status, count() AS count FROM ingestion_item WHERE run = $run "
+        "GROUP BY status",
+        vars,
+    )
+    condition = "run = $run"
+    if status:
+        condition += " AND status = $status"
+        vars["status"] = status
+    items = await repo_query(
+        f"""
+        SELECT id, key, status, source, error, attempts, updated
+        FROM ingestion_item WHERE {condition}
+        ORDER BY key LIMIT $limit START $start
+        """,
+        vars,
+    )
+    return dict(
+        run=run,
+        counts={row["status"]: row["count"] for row in counts},
+        items=items,
+    )
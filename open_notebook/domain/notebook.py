@@ -1,15 +1,23 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
 from typing import Any, ClassVar, Dict, List, Literal, Optional, Tuple
 
 from loguru import logger
 from pydantic import BaseModel, Field, field_validator
+from surrealdb import RecordID  # type: ignore
 
 from open_notebook.database.repository import ensure_record_id, repo_query
 from open_notebook.domain.base import ObjectModel
+from open_notebook.domain.embeddings import embed_in_batches, embed_text
 from open_notebook.domain.models import model_manager
+from open_notebook.domain.vector_backends import get_vector_backend
 from open_notebook.exceptions import DatabaseOperationError, InvalidInputError
-from open_notebook.utils import split_text
+from open_notebook.progress import report_progress
+from open_notebook.utils import asplit_text
+
+# Rows per INSERT statement when writing chunks; keeps each statement small
+# while the whole write still goes out as one transactional query.
+EMBEDDING_INSERT_BATCH_SIZE = 500
 
 
 class Notebook(ObjectModel):
@@ -42,6 +50,28 @@ class Notebook(ObjectModel):
             logger.exception(e)
             raise DatabaseOperationError(e)
 
+    async def get_source_ids(self) -> List[str]:
+        """Ids of the sources in this notebook, without loading the sources."""
+        try:
+            return await repo_query(
+                "SELECT VALUE in FROM reference WHERE out = $id",
+                {"id": ensure_record_id(self.id)},
+            )
+        except Exception as e:
+            logger.error(f"Error fetching source ids for notebook {self.id}: {str(e)}")
+            raise DatabaseOperationError(e)
+
+    async def get_note_ids(self) -> List[str]:
+        """Ids of the notes in this notebook, without loading the notes."""
+        try:
+            return await repo_query(
+                "SELECT VALUE in FROM artifact WHERE out = $id",
+                {"id": ensure_record_id(self.id)},
+            )
+        except Exception as e:
+            logger.error(f"Error fetching note ids for notebook {self.id}: {str(e)}")
+            raise DatabaseOperationError(e)
+
     async def get_notes(self) -> List["Note"]:
         try:
             srcs = await repo_query(
@@ -142,10 +172,65 @@ class SourceInsight(ObjectModel):
 
 class Source(ObjectModel):
     table_name: ClassVar[str] = "source"
+    # The extracted text can be megabytes; it is loaded with load=["full_text"]
+    # or load_full_text() where it is needed
+    deferred_fields: ClassVar[Tuple[str, ...]] = ("embedding", "full_text")
     asset: Optional[Asset] = None
     title: Optional[str] = None
     topics: Optional[List[str]] = Field(default_factory=list)
     full_text: Optional[str] = None
+    # Normalized full_text hash and origin fingerprint, for duplicate detection
+    content_hash: Optional[str] = None
+    fingerprint: Optional[str] = None
+
+    @classmethod
+    async def find_existing(
+        cls, fingerprint: Optional[str] = None, content_hash: Optional[str] = None
+    ) -> Optional[str]:
+        """Id of a source with this origin fingerprint or content hash, if any."""
+        conditions = []
+        if fingerprint:
+            conditions.append("fingerprint = $fingerprint")
+        if content_hash:
+            conditions.append("content_hash = $content_hash")
+        if not conditions:
+            return None
+        try:
+            result = await repo_query(
+                f"SELECT VALUE id FROM source WHERE {' OR '.join(conditions)} "
+                "ORDER BY created LIMIT 1",
+                {"fingerprint": fingerprint, "content_hash": content_hash},
+            )
+            return result[0] if result else None
+        except Exception as e:
+            logger.error(f"Error looking up duplicate sources: {str(e)}")
+            raise DatabaseOperationError(e)
+
+    async def load_full_text(self) -> Optional[str]:
+        """full_text, read from the database if the source was loaded without it."""
+        if self.full_text is None and self.id:
+            try:
+                result = await repo_query(
+                    "SELECT VALUE full_text FROM $id", {"id": ensure_record_id(self.id)}
+                )
+            except Exception as e:
+                logger.error(f"Error loading text of source {self.id}: {str(e)}")
+                raise DatabaseOperationError(e)
+            self.full_text = result[0] if result else None
+            # Loaded, not changed: save() must not write it back
+            if self._persisted is not None:
+                self._persisted["full_text"] = self.full_text
+        return self.full_text
+
+    async def is_in_notebook(self, notebook_id: str) -> bool:
+        result = await repo_query(
+            "SELECT VALUE id FROM reference WHERE in = $id AND out = $notebook_id",
+            {
+                "id": ensure_record_id(self.id),
+                "notebook_id": ensure_record_id(notebook_id),
+            },
+        )
+        return bool(result)
 
     async def get_context(
         self, context_size: Literal["short", "long"] = "short"
@@ -157,7 +242,7 @@ class Source(ObjectModel):
                 id=self.id,
                 title=self.title,
                 insights=insights,
-                full_text=self.full_text,
+                full_text=await self.load_full_text(),
             )
         else:
             return dict(id=self.id, title=self.title, insights=insights)
@@ -178,11 +263,48 @@ class Source(ObjectModel):
             logger.exception(e)
             raise DatabaseOperationError(f"Failed to count chunks for source: {str(e)}")
 
+    @classmethod
+    async def get_counts(cls, source_ids: List[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Insight and embedded chunk counts for many sources in one query.
+
+        Returns {source_id: {"insights_count": n, "embedded_chunks": m}};
+        sources that do not exist are left out.
+        """
+        if not source_ids:
+            return {}
+        try:
+            result = await repo_query(
+                """
+                SELECT
+                    id,
+                    (SELECT count() AS count FROM source_insight
+                        WHERE source = $parent.id GROUP ALL)[0].count ?? 0
+                        AS insights_count,
+                    (SELECT count() AS count FROM source_embedding
+                        WHERE source = $parent.id GROUP ALL)[0].count ?? 0
+                        AS embedded_chunks
+                FROM $ids
+                """,
+                {"ids": [ensure_record_id(source_id) for source_id in source_ids]},
+            )
+            return {
+                row["id"]: dict(
+                    insights_count=row["insights_count"],
+                    embedded_chunks=row["embedded_chunks"],
+                )
+                for row in result
+            }
+        except Exception as e:
+            logger.error(f"Error fetching counts for sources: {str(e)}")
+            logger.exception(e)
+            raise DatabaseOperationError("Failed to fetch counts for sources")
+
     async def get_insights(self) -> List[SourceInsight]:
         try:
             result = await repo_query(
                 """
-                SELECT * FROM source_insight WHERE source=$id
+                SELECT * OMIT embedding FROM source_insight WHERE source=$id
                 """,
                 {"id": ensure_record_id(self.id)},
             )
@@ -197,67 +319,88 @@ class Source(ObjectModel):
             raise InvalidInputError("Notebook ID must be provided")
         return await self.relate("reference", notebook_id)
 
-    async def vectorize(self) -> None:
+    async def vectorize(self, incremental: bool = False) -> Dict[str, int]:
+        """
+        Chunk full_text, embed the chunks in batches and write this source's
+        source_embedding rows in a single transaction.
+
+        With incremental=True the new chunks are matched by content hash
+        against the stored ones: unchanged chunks keep their rows and vectors
+        (only their order is updated if they moved), stale rows are deleted
+        and only new or edited chunks are embedded. Stored vectors must come
+        from the current embedding model, so rebuilds use the full mode.
+
+        Returns counts of chunks, embedded (new) chunks, reused and deleted rows.
+        """
         logger.info(f"Starting vectorization for source {self.id}")
+        stats = dict(chunks=0, embedded=0, reused=0, deleted=0)
         EMBEDDING_MODEL = await model_manager.get_embedding_model()
+        if not EMBEDDING_MODEL:
+            logger.warning("No embedding model found. Source will not be searchable.")
+            return stats
 
         try:
-            if not self.full_text:
+            full_text = await self.load_full_text()
+            if not full_text:
                 logger.warning(f"No text to vectorize for source {self.id}")
-                return
+                return stats
 
-            chunks = split_text(
-                self.full_text,
-            )
+            await report_progress("chunking")
+            chunks = await asplit_text(full_text)
             chunk_count = len(chunks)
+            stats["chunks"] = chunk_count
             logger.info(f"Split into {chunk_count} chunks for source {self.id}")
 
             if chunk_count == 0:
                 logger.warning("No chunks created after splitting")
-                return
-
-            # Process chunks concurrently using async gather
-            logger.info("Starting concurrent processing of chunks")
-
-            async def process_chunk(
-                idx: int, chunk: str
-            ) -> Tuple[int, List[float], str]:
-                logger.debug(f"Processing chunk {idx}/{chunk_count}")
-                try:
-                    embedding = (await EMBEDDING_MODEL.aembed([chunk]))[0]
-                    cleaned_content = chunk
-                    logger.debug(f"Successfully processed chunk {idx}")
-                    return (idx, embedding, cleaned_content)
-                except Exception as e:
-                    logger.error(f"Error processing chunk {idx}: {str(e)}")
-                    raise
-
-            # Create tasks for all chunks and process them concurrently
-            tasks = [process_chunk(idx, chunk) for idx, chunk in enumerate(chunks)]
-            results = await asyncio.gather(*tasks)
-
-            logger.info(f"Parallel processing complete. Got {len(results)} results")
-
-            # Insert results in order (they're already ordered by index)
-            for idx, embedding, content in results:
-                logger.debug(f"Inserting chunk {idx} into database")
-                await repo_query(
+                return stats
+
+            source_id = ensure_record_id(self.id)
+            if incremental:
+                existing = await repo_query(
                     """
-                    CREATE source_embedding CONTENT {
-                            "source": $source_id,
-                            "order": $order,
-                            "content": $content,
-                            "embedding": $embedding,
-                    };""",
-                    {
-                        "source_id": ensure_record_id(self.id),
-                        "order": idx,
-                        "content": content,
-                        "embedding": embedding,
-                    },
+                    SELECT
+                        id,
+                        order,
+                        crypto::sha256(content) AS hash,
+                        array::len(embedding ?? []) > 0 AS embedded
+                    FROM source_embedding WHERE source = $source_id
+                    """,
+                    {"source_id": source_id},
                 )
+                changed, moved, stale = diff_chunks(chunks, existing)
+            else:
+                changed, moved, stale = list(range(chunk_count)), [], []
 
-            logger.info(f"Vectorization complete for source {self.id}")
+            vectors = await embed_in_batches(
+                EMBEDDING_MODEL, [chunks[order] for order in changed]
+            )
+            embeddings = dict(zip(changed, vectors))
+            logger.info(f"Embedded {len(embeddings)} chunks for source {self.id}")
+
+            rows = [
+                {
+                    "source": source_id,
+                    "order": order,
+                    "content": chunks[order],
+                    "embedding": embedding,
+                }
+                for order, embedding in embeddings.items()
+            ]
+            await report_progress("storing", len(rows), len(rows))
+            if incremental:
+                await update_source_embeddings(rows, moved, stale)
+            else:
+                await replace_source_embeddings(source_id, rows)
+            await get_vector_backend().index_chunks(self.id, embeddings)
+
+            stats.update(
+                embedded=len(changed),
+                reused=chunk_count - len(changed),
+                deleted=len(stale),
+            )
+            logger.info(f"Vectorization complete for source {self.id}: {stats}")
+            return stats
 
         except Exception as e:
             logger.error(f"Error vectorizing source {self.id}: {str(e)}")
@@ -273,9 +416,9 @@ class Source(ObjectModel):
             raise InvalidInputError("Insight type and content must be provided")
         try:
             embedding = (
-                (await EMBEDDING_MODEL.aembed([content]))[0] if EMBEDDING_MODEL else []
+                await embed_text(EMBEDDING_MODEL, content) if EMBEDDING_MODEL else []
             )
-            return await repo_query(
+            result = await repo_query(
                 """
                 CREATE source_insight CONTENT {
                         "source": $source_id,
@@ -290,6 +433,14 @@ class Source(ObjectModel):
                     "embedding": embedding,
                 },
             )
+            if result and embedding:
+                await get_vector_backend().index_item(
+                    result[0]["id"], "source_insight", self.id, embedding
+                )
+            from open_notebook.domain.notebook_context import notebook_context_cache
+
+            notebook_context_cache.invalidate(self.id)
+            return result
         except Exception as e:
             logger.error(f"Error adding insight to source {self.id}: {str(e)}")
             raise  # DatabaseOperationError(e)
@@ -297,6 +448,7 @@ class Source(ObjectModel):
 
 class Note(ObjectModel):
     table_name: ClassVar[str] = "note"
+    embedding_fields: ClassVar[Tuple[str, ...]] = ("content",)
     title: Optional[str] = None
     note_type: Optional[Literal["human", "ai"]] = None
     content: Optional[str] = None
@@ -371,23 +523,108 @@ async def vector_search(
 ):
     if not keyword:
         raise InvalidInputError("Search keyword cannot be empty")
+    matches = await vector_search_many([keyword], results, source, note, minimum_score)
+    return matches[0]
+
+
+async def vector_search_many(
+    keywords: List[str],
+    results: int,
+    source: bool = True,
+    note: bool = True,
+    minimum_score=0.2,
+) -> List[List[Dict[str, Any]]]:
+    """
+    vector_search() for several keywords: they are embedded in one batched
+    call and searched concurrently. Returns the results of each keyword.
+    """
+    if not keywords or not all(keywords):
+        raise InvalidInputError("Search keyword cannot be empty")
     try:
         EMBEDDING_MODEL = await model_manager.get_embedding_model()
-        embed = (await EMBEDDING_MODEL.aembed([keyword]))[0]
-        results = await repo_query(
-            """
-            SELECT * FROM fn::vector_search($embed, $results, $source, $note, $minimum_score);
-            """,
-            {
-                "embed": embed,
-                "results": results,
-                "source": source,
-                "note": note,
-                "minimum_score": minimum_score,
-            },
+        embeddings = await embed_in_batches(EMBEDDING_MODEL, keywords)
+        backend = get_vector_backend()
+        return list(
+            await asyncio.gather(
+                *(
+                    backend.search(embed, results, source, note, minimum_score)
+                    for embed in embeddings
+                )
+            )
         )
-        return results
     except Exception as e:
         logger.error(f"Error performing vector search: {str(e)}")
         logger.exception(e)
         raise DatabaseOperationError(e)
+
+
+async def replace_source_embeddings(
+    source_id: RecordID, rows: List[Dict[str, Any]]
+) -> None:
+    """Atomically swap a source's chunks for `rows` in one round trip."""
+    statements = [
+        "BEGIN TRANSACTION;",
+        "DELETE source_embedding WHERE source = $source_id;",
+    ]
+    vars: Dict[str, Any] = {"source_id": source_id}
+    for n, start in enumerate(range(0, len(rows), EMBEDDING_INSERT_BATCH_SIZE)):
+        vars[f"rows_{n}"] = rows[start : start + EMBEDDING_INSERT_BATCH_SIZE]
+        statements.append(f"INSERT INTO source_embedding $rows_{n} RETURN NONE;")
+    statements.append("COMMIT TRANSACTION;")
+    await repo_query("\n".join(statements), vars)
+
+
+def diff_chunks(
+    chunks: List[str], existing: List[Dict[str, Any]]
+) -> Tuple[List[int], List[Dict[str, Any]], List[Any]]:
+    """
+    Match new chunks against stored rows ({id, order, hash, embedded}) by
+    content hash.
+
+    Returns the orders of the chunks that need embedding, the reused rows
+    whose order changed (as {id, order}) and the ids of rows that are no
+    longer needed. Duplicate chunks are matched to stored rows one to one;
+    rows without an embedding are never reused.
+    """
+    available: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for row in sorted(existing, key=lambda row: row["order"]):
+        key = row["hash"].lower() if row.get("embedded") else None
+        available.setdefault(key, []).append(row)
+
+    changed: List[int] = []
+    moved: List[Dict[str, Any]] = []
+    for order, chunk in enumerate(chunks):
+        rows = available.get(hashlib.sha256(chunk.encode("utf-8")).hexdigest())
+        if not rows:
+            changed.append(order)
+            continue
+        row = rows.pop(0)
+        if row["order"] != order:
+            moved.append({"id": ensure_record_id(row["id"]), "order": order})
+    stale = [
+        ensure_record_id(row["id"]) for rows in available.values() for row in rows
+    ]
+    return changed, moved, stale
+
+
+async def update_source_embeddings(
+    rows: List[Dict[str, Any]], moved: List[Dict[str, Any]], stale: List[Any]
+) -> None:
+    """Apply an incremental chunk diff in one transactional round trip."""
+    statements = ["BEGIN TRANSACTION;"]
+    vars: Dict[str, Any] = {}
+    if stale:
+        vars["stale"] = stale
+        statements.append("DELETE $stale RETURN NONE;")
+    if moved:
+        vars["moved"] = moved
+        statements.append(
+            "FOR $row IN $moved { UPDATE $row.id MERGE { order: $row.order }; };"
+        )
+    for n, start in enumerate(range(0, len(rows), EMBEDDING_INSERT_BATCH_SIZE)):
+        vars[f"rows_{n}"] = rows[start : start + EMBEDDING_INSERT_BATCH_SIZE]
+        statements.append(f"INSERT INTO source_embedding $rows_{n} RETURN NONE;")
+    if len(statements) == 1:
+        return
+    statements.append("COMMIT TRANSACTION;")
+    await repo_query("\n".join(statements), vars)
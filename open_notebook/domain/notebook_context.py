@@ -0,0 +1,299 @@
+"""
+Cached assembly of the context a notebook's chat sees.
+
+The context is rebuilt on every chat turn. Each selected source or note is
+rendered once into its context fragment, the dict the chat prompt shows,
+together with its token count, and kept per notebook under its id and
+context size. A turn then costs one query for the versions of the selected
+items (their `updated` timestamp and, for sources, the ids of their
+insights) and one batched query for the items that changed since the last
+turn, instead of loading every source and its insights one by one.
+
+Saving or deleting a source, insight or note drops its fragments at once;
+writes made by other processes, such as insights added by the worker, change
+the version and are picked up on the next turn.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from loguru import logger
+
+from open_notebook.config import env_int
+from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.domain.notebook import Notebook, SourceInsight
+from open_notebook.exceptions import DatabaseOperationError
+from open_notebook.executors import run_in_thread
+from open_notebook.utils import token_count
+
+NOTEBOOK_CONTEXT_CACHE_NOTEBOOKS = env_int("NOTEBOOK_CONTEXT_CACHE_NOTEBOOKS", 64)
+
+ContextSize = Literal["short", "long"]
+# Characters of a note's content shown in the short context
+SHORT_NOTE_CHARS = 100
+
+
+@dataclass
+class ContextFragment:
+    version: str
+    context: Dict[str, Any]
+    tokens: int
+    insight_ids: Tuple[str, ...] = ()
+
+
+class NotebookContextCache:
+    """Context fragments per notebook, for the most recently used notebooks."""
+
+    def __init__(self, max_notebooks: int) -> None:
+        self.max_notebooks = max_notebooks
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._notebooks: "OrderedDict[str, Dict[Tuple[str, str], ContextFragment]]"
+        self._notebooks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_notebooks > 0
+
+    def get(
+        self, notebook_id: str, key: Tuple[str, str], version: str
+    ) -> Optional[ContextFragment]:
+        with self._lock:
+            fragments = self._notebooks.get(notebook_id)
+            fragment = fragments.get(key) if fragments else None
+            if fragment is None or fragment.version != version:
+                self.misses += 1
+                return None
+            self._notebooks.move_to_end(notebook_id)
+            self.hits += 1
+            return fragment
+
+    def put(
+        self, notebook_id: str, key: Tuple[str, str], fragment: ContextFragment
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._notebooks.setdefault(notebook_id, {})[key] = fragment
+            self._notebooks.move_to_end(notebook_id)
+            while len(self._notebooks) > self.max_notebooks:
+                self._notebooks.popitem(last=False)
+
+    def retain(self, notebook_id: str, keys: set) -> None:
+        """Forget the fragments of items that left the notebook's context."""
+        with self._lock:
+            fragments = self._notebooks.get(notebook_id)
+            if not fragments:
+                return
+            for key in [key for key in fragments if key[0] not in keys]:
+                del fragments[key]
+
+    def invalidate(self, item_id: Any) -> None:
+        """Drop the fragments of a source or note, or of an insight's source."""
+        item_id = str(item_id)
+        with self._lock:
+            for fragments in self._notebooks.values():
+                stale = [
+                    key
+                    for key, fragment in fragments.items()
+                    if key[0] == item_id or item_id in fragment.insight_ids
+                ]
+                for key in stale:
+                    del fragments[key]
+                self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            fragments = sum(len(f) for f in self._notebooks.values())
+        return dict(
+            enabled=self.enabled,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0,
+            invalidations=self.invalidations,
+            notebooks=len(self._notebooks),
+            fragments=fragments,
+            max_notebooks=self.max_notebooks,
+        )
+
+
+notebook_context_cache = NotebookContextCache(NOTEBOOK_CONTEXT_CACHE_NOTEBOOKS)
+
+
+def _record_id(item_id: str, table: str) -> str:
+    return item_id if item_id.startswith(f"{table}:") else f"{table}:{item_id}"
+
+
+def _version(row: Dict[str, Any]) -> str:
+    return "|".join([str(row.get("updated"))] + sorted(row.get("insights") or []))
+
+
+def _render(row: Dict[str, Any], size: ContextSize) -> Dict[str, Any]:
+    if row["id"].startswith("note:"):
+        content = row.get("content")
+        if size == "short" and content:
+            content = content[:SHORT_NOTE_CHARS]
+        return dict(id=row["id"], title=row.get("title"), content=content)
+    context = dict(
+        id=row["id"],
+        title=row.get("title"),
+        insights=[
+            SourceInsight(**insight).model_dump()
+            for insight in row.get("insights") or []
+        ],
+    )
+    if size == "long":
+        context["full_text"] = row.get("full_text")
+    return context
+
+
+async def _fetch_versions(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    rows = await repo_query(
+        """
+        SELECT
+            id,
+            <string> updated AS updated,
+            (SELECT VALUE <string> id FROM source_insight
+                WHERE source = $parent.id) AS insights
+        FROM $ids
+        """,
+        {"ids": [ensure_record_id(item_id) for item_id in ids]},
+    )
+    return {str(row["id"]): row for row in rows}
+
+
+async def _fetch_items(
+    ids: List[str], long_ids: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Sources with their insights and notes, in one query."""
+    rows = await repo_query(
+        """
+        SELECT
+            id,
+            title,
+            content,
+            IF id INSIDE $long THEN full_text END AS full_text,
+            (SELECT * OMIT embedding FROM source_insight
+                WHERE source = $parent.id) AS insights
+        FROM $ids
+        """,
+        {
+            "ids": [ensure_record_id(item_id) for item_id in ids],
+            "long": [ensure_record_id(item_id) for item_id in long_ids],
+        },
+    )
+    return {str(row["id"]): row for row in rows}
+
+
+async def notebook_context(
+    notebook_id: str,
+    items: List[Tuple[str, ContextSize]],
+    newest_first: bool = False,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    Context of the given sources and notes, as (id, size) pairs with table
+    prefixed ids. Returns the source and note fragments in the order given,
+    or most recently updated first, and their total token count. Items that
+    no longer exist are left out.
+    """
+    if not items:
+        notebook_context_cache.retain(notebook_id, set())
+        return [], [], 0
+    try:
+        versions = await _fetch_versions([item_id for item_id, _ in items])
+        fragments: Dict[Tuple[str, str], ContextFragment] = {}
+        missing: List[Tuple[str, ContextSize]] = []
+        for item_id, size in items:
+            row = versions.get(item_id)
+            if row is None:
+                continue
+            fragment = notebook_context_cache.get(
+                notebook_id, (item_id, size), _version(row)
+            )
+            if fragment:
+                fragments[(item_id, size)] = fragment
+            else:
+                missing.append((item_id, size))
+
+        if missing:
+            rows = await _fetch_items(
+                [item_id for item_id, _ in missing],
+                [item_id for item_id, size in missing if size == "long"],
+            )
+            for item_id, size in missing:
+                row = rows.get(item_id)
+                if row is None:
+                    continue
+                context = _render(row, size)
+                fragment = ContextFragment(
+                    version=_version(versions[item_id]),
+                    context=context,
+                    tokens=await run_in_thread(token_count, str(context)),
+                    insight_ids=tuple(versions[item_id].get("insights") or []),
+                )
+                notebook_context_cache.put(notebook_id, (item_id, size), fragment)
+                fragments[(item_id, size)] = fragment
+            logger.debug(
+                f"Rendered {len(missing)} of {len(items)} context items "
+                f"of notebook {notebook_id}"
+            )
+        notebook_context_cache.retain(notebook_id, {item_id for item_id, _ in items})
+        if newest_first:
+            items = sorted(
+                items,
+                key=lambda item: str(versions.get(item[0], {}).get("updated")),
+                reverse=True,
+            )
+    except Exception as e:
+        logger.error(f"Error building context for notebook {notebook_id}: {str(e)}")
+        logger.exception(e)
+        raise DatabaseOperationError(e)
+
+    sources: List[Dict[str, Any]] = []
+    notes: List[Dict[str, Any]] = []
+    total_tokens = 0
+    for key in items:
+        fragment = fragments.get(key)
+        if fragment is None:
+            continue
+        (notes if key[0].startswith("note:") else sources).append(fragment.context)
+        total_tokens += fragment.tokens
+    return sources, notes, total_tokens
+
+
+async def configured_context(
+    notebook_id: str, sources: Dict[str, str], notes: Dict[str, str]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    notebook_context() for a context configuration: {id: status} for sources
+    and notes, where the status says whether the item is "not in" the
+    context, in it with its "insights" or with its "full content".
+    """
+    items: List[Tuple[str, ContextSize]] = []
+    for source_id, status in sources.items():
+        if "not in" in status:
+            continue
+        if "insights" in status:
+            items.append((_record_id(source_id, "source"), "short"))
+        elif "full content" in status:
+            items.append((_record_id(source_id, "source"), "long"))
+    for note_id, status in notes.items():
+        if "full content" in status:
+            items.append((_record_id(note_id, "note"), "long"))
+    return await notebook_context(notebook_id, items)
+
+
+async def full_notebook_context(
+    notebook: Notebook,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """Short context of every source and note of the notebook, newest first."""
+    items: List[Tuple[str, ContextSize]] = [
+        (str(source_id), "short") for source_id in await notebook.get_source_ids()
+    ]
+    items += [(str(note_id), "short") for note_id in await notebook.get_note_ids()]
+    return await notebook_context(notebook.id, items, newest_first=True)
@@ -1,4 +1,4 @@
-from typing import ClassVar, Optional
+from typing import ClassVar, Literal, Optional
 
 from pydantic import Field
 
@@ -12,6 +12,12 @@ class Transformation(ObjectModel):
     description: str
     prompt: str
     apply_default: bool
+    # How documents longer than one section are processed: "single" sends the
+    # whole text in one call, "map_reduce" transforms sections in parallel and
+    # combines the results, "refine" updates the result section by section.
+    # "auto" uses map_reduce only past TRANSFORMATION_SINGLE_CALL_MAX_TOKENS.
+    execution_mode: Literal["auto", "single", "map_reduce", "refine"] = "auto"
+    section_tokens: Optional[int] = None
 
 
 class DefaultPrompts(RecordModel):
@@ -0,0 +1,75 @@
+"""
+Cache of transformation results.
+
+Applying a transformation to a source again (re-running a summary,
+re-ingesting a document) returns the stored result instead of calling the
+model, as long as nothing that shapes the output changed. Results are kept
+in a local SQLite file keyed by a hash of the rendered transformation prompt,
+the default transformation instructions, the model, the execution mode and the
+normalised content. Entries expire after TRANSFORMATION_CACHE_TTL seconds and
+the least recently used ones are evicted beyond
+TRANSFORMATION_CACHE_MAX_ENTRIES; 0 disables the cache.
+"""
+
+import hashlib
+import os
+from typing import Dict, Optional
+
+from open_notebook.config import DATA_FOLDER, env_float, env_int
+from open_notebook.sqlite_cache import SQLiteLRUCache
+
+TRANSFORMATION_CACHE_FILE = os.getenv(
+    "TRANSFORMATION_CACHE_FILE",
+    f"{DATA_FOLDER}/sqlite-db/transformation_cache.sqlite",
+)
+TRANSFORMATION_CACHE_MAX_ENTRIES = env_int("TRANSFORMATION_CACHE_MAX_ENTRIES", 5_000)
+TRANSFORMATION_CACHE_TTL = env_float("TRANSFORMATION_CACHE_TTL", 30 * 24 * 3600)
+
+
+def _sha256(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    prompt: str,
+    instructions: Optional[str],
+    model_id: str,
+    content_hash: str,
+    variant: str = "",
+) -> bytes:
+    """
+    Key of a transformation result. `variant` holds whatever else changes the
+    output for the same inputs, such as the execution mode and section size.
+    """
+    parts = [_sha256(prompt), _sha256(instructions), model_id, content_hash, variant]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()
+
+
+class TransformationCache(SQLiteLRUCache):
+    """Transformation outputs keyed by cache_key(), with expiry."""
+
+    table = "transformation_cache"
+
+    def get(self, key: bytes) -> Optional[str]:
+        if not self.enabled:
+            return None
+        output = self.lookup([key]).get(key)
+        if output is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return output
+
+    def put(self, key: bytes, output: str) -> None:
+        if self.enabled:
+            self.store({key: output})
+
+    def stats(self) -> Dict[str, object]:
+        return dict(super().stats(), ttl=self.ttl)
+
+
+transformation_cache = TransformationCache(
+    TRANSFORMATION_CACHE_FILE,
+    TRANSFORMATION_CACHE_MAX_ENTRIES,
+    TRANSFORMATION_CACHE_TTL,
+)
@@ -0,0 +1,709 @@
+"""
+Pluggable backends behind vector_search.
+
+- SurrealVectorBackend (default) runs fn::vector_search in the database.
+- NumpyVectorBackend keeps every chunk, insight and note embedding in a
+  memory-mapped NumPy matrix under DATA_FOLDER and answers searches in
+  process with a matmul plus argpartition.
+
+The backend is chosen with VECTOR_SEARCH_BACKEND ("surreal" or "numpy").
+Both return the same result shape as fn::vector_search:
+{id, parent_id, title, similarity, matches}.
+"""
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from open_notebook.config import DATA_FOLDER, env_float
+from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.domain.vector_index import (
+    HNSW_SEARCH_LIMIT,
+    bump_vector_generation,
+    embedding_dimension,
+    get_vector_generation,
+    indexes_ready,
+)
+from open_notebook.exceptions import ConfigurationError
+
+VECTOR_INDEX_FOLDER = f"{DATA_FOLDER}/vector_index"
+VECTOR_TABLES = ("source_embedding", "source_insight", "note")
+# Small integer code per row so table filters stay vectorised; 0 = free row
+TABLE_CODES = {table: code for code, table in enumerate(VECTOR_TABLES, start=1)}
+SYNC_PAGE_SIZE = 1000
+SEARCH_BLOCK_ROWS = 65536
+
+
+class _ReadWriteLock:
+    """
+    asyncio lock for many concurrent readers or one writer. A waiting writer
+    blocks new readers, so a steady flow of searches cannot starve it.
+    """
+
+    def __init__(self) -> None:
+        self._writer = asyncio.Lock()
+        self._readers = 0
+        self._no_readers = asyncio.Event()
+        self._no_readers.set()
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[None]:
+        async with self._writer:
+            self._readers += 1
+            self._no_readers.clear()
+        try:
+            yield
+        finally:
+            self._readers -= 1
+            if self._readers == 0:
+                self._no_readers.set()
+
+    @asynccontextmanager
+    async def write(self) -> AsyncIterator[None]:
+        async with self._writer:
+            await self._no_readers.wait()
+            yield
+
+
+class VectorSearchBackend(ABC):
+    """Interface for vector search backends."""
+
+    name: str = ""
+
+    async def load(self) -> None:
+        """Prepare the backend. Called once at API startup."""
+
+    async def close(self) -> None:
+        """Release resources. Called at API shutdown."""
+
+    @abstractmethod
+    async def search(
+        self,
+        embedding: List[float],
+        results: int,
+        source: bool = True,
+        note: bool = True,
+        minimum_score: float = 0.2,
+    ) -> List[Dict[str, Any]]:
+        """Return the best matches for an already embedded query."""
+
+    async def index_chunks(
+        self, source_id: str, embeddings: Dict[int, List[float]]
+    ) -> None:
+        """
+        A source was (re)vectorized. `embeddings` maps the order of each chunk
+        that was written to its vector; chunks that are no longer stored for
+        the source were deleted.
+        """
+
+    async def index_item(
+        self, item_id: str, table: str, parent_id: str, embedding: List[float]
+    ) -> None:
+        """An insight or note was saved with a new embedding."""
+
+    async def remove(self, record_id: str) -> None:
+        """A record was deleted, along with anything derived from it."""
+
+
+class SurrealVectorBackend(VectorSearchBackend):
+    """Searches in SurrealDB; the database already holds every embedding."""
+
+    name = "surreal"
+
+    async def search(
+        self,
+        embedding: List[float],
+        results: int,
+        source: bool = True,
+        note: bool = True,
+        minimum_score: float = 0.2,
+    ) -> List[Dict[str, Any]]:
+        vars = {
+            "embed": embedding,
+            "results": results,
+            "source": source,
+            "note": note,
+            "minimum_score": minimum_score,
+        }
+        if results <= HNSW_SEARCH_LIMIT and await indexes_ready():
+            try:
+                return await repo_query(
+                    """
+                    SELECT * FROM fn::vector_search($embed, $results, $source, $note, $minimum_score);
+                    """,
+                    vars,
+                )
+            except Exception as e:
+                logger.warning(f"Indexed vector search failed, using exact scan: {e}")
+        return await repo_query(
+            """
+            SELECT * FROM fn::vector_search_exact($embed, $results, $source, $note, $minimum_score);
+            """,
+            vars,
+        )
+
+
+class NumpyVectorBackend(VectorSearchBackend):
+    """
+    In-process exact cosine search over a memory-mapped matrix.
+
+    Rows are L2-normalised so cosine similarity is a single matmul. Deleted
+    rows are tombstoned and reused. Changes made through save(), vectorize()
+    and delete() in this process are applied immediately. Every change, also
+    from processes that never load the index (the command worker, scripts),
+    bumps the generation counter in the database; a search that finds it
+    moved reconciles the index with the database first, comparing each row's
+    `updated` stamp, and reloads every vector after a rebuild. A periodic
+    reconciliation runs as well.
+    """
+
+    name = "numpy"
+
+    def __init__(
+        self,
+        folder: str = VECTOR_INDEX_FOLDER,
+        dtype: str = "float32",
+        sync_interval: float = 300.0,
+    ) -> None:
+        try:
+            import numpy as np
+        except ImportError:
+            raise ConfigurationError(
+                "The numpy vector backend requires numpy to be installed"
+            )
+        if dtype not in ("float32", "float16"):
+            raise ConfigurationError(f"Unsupported vector index dtype: {dtype}")
+        self.np = np
+        self.folder = folder
+        self.dtype = dtype
+        self.sync_interval = sync_interval
+
+        self.dimension: Optional[int] = None
+        self._vectors: Any = None  # np.memmap of shape (capacity, dimension)
+        self._codes: Any = None  # int8 TABLE_CODES per row, 0 for free rows
+        self._count = 0  # rows in use, live or tombstoned
+        self._ids: List[Optional[str]] = []
+        self._tables: List[Optional[str]] = []
+        self._parents: List[Optional[str]] = []
+        self._stamps: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._children: Dict[str, Set[int]] = {}
+        self._free: List[int] = []
+        self._dirty = False
+        self._lock = _ReadWriteLock()
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sync_lock = asyncio.Lock()
+        # Database counters the index is known to be up to date with
+        self._generation = -1
+        self._rebuild: Optional[int] = None
+        self._loaded = False
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.folder, "vectors.npy")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.folder, "meta.json")
+
+    # ------------------------------------------------------------------ load
+
+    async def load(self) -> None:
+        dimension = await embedding_dimension()
+        if not dimension:
+            logger.warning("No embedding model configured, numpy vector index idle")
+            return
+        async with self._lock.write():
+            if not self._open_from_disk(dimension):
+                self._reset(dimension)
+            self._loaded = True
+        await self.sync()
+        if self.sync_interval > 0 and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_periodically())
+        logger.info(
+            f"Numpy vector index loaded: {len(self._row_of)} vectors, "
+            f"dimension {self.dimension}, {self.dtype}"
+        )
+
+    async def close(self) -> None:
+        if self._sync_task:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        async with self._lock.write():
+            self._persist()
+
+    def _open_from_disk(self, dimension: int) -> bool:
+        np = self.np
+        if not (os.path.exists(self._vectors_path) and os.path.exists(self._meta_path)):
+            return False
+        try:
+            with open(self._meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("dimension") != dimension or meta.get("dtype") != self.dtype:
+                logger.info("Vector index on disk does not match the model, rebuilding")
+                return False
+            vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+            rows = meta["rows"]
+            if vectors.shape[1] != dimension or vectors.shape[0] < len(rows):
+                return False
+        except Exception as e:
+            logger.warning(f"Could not open vector index on disk: {e}")
+            return False
+
+        self.dimension = dimension
+        self._vectors = vectors
+        self._count = len(rows)
+        self._rebuild = meta.get("rebuild")
+        self._ids, self._tables, self._parents, self._stamps = [], [], [], []
+        self._row_of, self._children, self._free = {}, {}, []
+        self._codes = np.zeros(vectors.shape[0], dtype=np.int8)
+        for row, entry in enumerate(rows):
+            # Older files have no stamps; those rows are reloaded on sync
+            item_id, table, parent, stamp = (
+                (list(entry) + [None])[:4] if entry else (None, None, None, None)
+            )
+            self._ids.append(item_id)
+            self._tables.append(table)
+            self._parents.append(parent)
+            self._stamps.append(stamp)
+            if item_id is None:
+                self._free.append(row)
+                continue
+            self._codes[row] = TABLE_CODES[table]
+            self._row_of[item_id] = row
+            self._children.setdefault(parent, set()).add(row)
+        return True
+
+    def _reset(self, dimension: int, capacity: int = 1024) -> None:
+        np = self.np
+        os.makedirs(self.folder, exist_ok=True)
+        self.dimension = dimension
+        self._vectors = np.lib.format.open_memmap(
+            self._vectors_path, mode="w+", dtype=self.dtype, shape=(capacity, dimension)
+        )
+        self._codes = np.zeros(capacity, dtype=np.int8)
+        self._count = 0
+        self._ids, self._tables, self._parents, self._stamps = [], [], [], []
+        self._row_of, self._children, self._free = {}, {}, []
+        self._rebuild = None
+        self._drop_meta()
+        self._dirty = True
+
+    def _grow(self, needed: int) -> None:
+        np = self.np
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        tmp_path = f"{self._vectors_path}.tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=self.dtype, shape=(new_capacity, self.dimension)
+        )
+        grown[: self._count] = self._vectors[: self._count]
+        grown.flush()
+        # Searches running in a worker thread keep their reference to the old
+        # mapping, which stays valid after the rename.
+        os.replace(tmp_path, self._vectors_path)
+        self._vectors = grown
+        codes = np.zeros(new_capacity, dtype=np.int8)
+        codes[: self._count] = self._codes[: self._count]
+        self._codes = codes
+
+    def _drop_meta(self) -> None:
+        try:
+            os.remove(self._meta_path)
+        except FileNotFoundError:
+            pass
+
+    def _mark_dirty(self) -> None:
+        # meta.json on disk means "vectors.npy matches these rows". Drop it
+        # before the first unpersisted change so that a crash leads to a
+        # rebuild instead of vectors being served under the wrong ids.
+        if not self._dirty:
+            self._drop_meta()
+            self._dirty = True
+
+    def _persist(self) -> None:
+        if not self._dirty or self._vectors is None:
+            return
+        self._vectors.flush()
+        rows = [
+            [self._ids[row], self._tables[row], self._parents[row], self._stamps[row]]
+            if self._ids[row] is not None
+            else None
+            for row in range(self._count)
+        ]
+        meta = dict(
+            dimension=self.dimension, dtype=self.dtype, rebuild=self._rebuild, rows=rows
+        )
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+        self._dirty = False
+
+    # ------------------------------------------------------------- mutation
+
+    def _normalise(self, vectors: Any) -> Any:
+        np = self.np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _add_rows(
+        self, items: List[Tuple[str, str, str, Optional[str]]], vectors: Any
+    ) -> None:
+        """Insert or replace rows; `items` are (item_id, table, parent_id, stamp)."""
+        matrix = self._normalise(vectors)
+        if matrix.shape[1] != self.dimension:
+            logger.warning(
+                f"Skipping {len(items)} vectors of dimension {matrix.shape[1]}, "
+                f"index expects {self.dimension}"
+            )
+            return
+        self._mark_dirty()
+        rows = []
+        for item_id, table, parent, stamp in items:
+            row = self._row_of.get(item_id)
+            if row is None:
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    self._grow(self._count + 1)
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(None)
+                    self._tables.append(None)
+                    self._parents.append(None)
+                    self._stamps.append(None)
+            else:
+                self._children.get(self._parents[row], set()).discard(row)
+            self._ids[row] = item_id
+            self._tables[row] = table
+            self._parents[row] = parent
+            self._stamps[row] = stamp
+            self._row_of[item_id] = row
+            self._children.setdefault(parent, set()).add(row)
+            self._codes[row] = TABLE_CODES[table]
+            rows.append(row)
+        self._vectors[rows] = matrix.astype(self.dtype)
+
+    def _remove_rows(self, rows: Set[int]) -> None:
+        if rows:
+            self._mark_dirty()
+        for row in rows:
+            item_id = self._ids[row]
+            if item_id is None:
+                continue
+            self._row_of.pop(item_id, None)
+            parent_rows = self._children.get(self._parents[row])
+            if parent_rows is not None:
+                parent_rows.discard(row)
+                if not parent_rows:
+                    self._children.pop(self._parents[row], None)
+            self._ids[row] = self._tables[row] = self._parents[row] = None
+            self._stamps[row] = None
+            self._codes[row] = 0
+            self._free.append(row)
+
+    def _stamp(self, value: Any) -> Optional[str]:
+        return None if value is None else str(value)
+
+    async def _changed(self) -> None:
+        """Bump the database generation so other processes sync on their next search."""
+        try:
+            generation, _ = await bump_vector_generation()
+        except Exception as e:
+            logger.warning(f"Could not bump the vector index generation: {e}")
+            return
+        if self._loaded and generation == self._generation + 1:
+            # Nobody else changed anything since the last sync
+            self._generation = generation
+
+    async def index_chunks(
+        self, source_id: str, embeddings: Dict[int, List[float]]
+    ) -> None:
+        if not self._loaded:
+            await self._changed()
+            return
+        try:
+            chunks = await repo_query(
+                "SELECT id, order, updated FROM source_embedding WHERE source = $source_id",
+                {"source_id": ensure_record_id(source_id)},
+            )
+            live = {chunk["id"] for chunk in chunks}
+            items = []
+            vectors = []
+            for chunk in chunks:
+                if chunk["order"] in embeddings:
+                    stamp = self._stamp(chunk.get("updated"))
+                    items.append((chunk["id"], "source_embedding", source_id, stamp))
+                    vectors.append(embeddings[chunk["order"]])
+            async with self._lock.write():
+                # Chunks reused by an incremental vectorize keep their rows
+                stale = {
+                    row
+                    for row in self._children.get(source_id, set())
+                    if self._tables[row] == "source_embedding"
+                    and self._ids[row] not in live
+                }
+                self._remove_rows(stale)
+                if items:
+                    self._add_rows(items, vectors)
+        except Exception as e:
+            logger.error(f"Failed to update vector index for source {source_id}: {e}")
+        await self._changed()
+
+    async def index_item(
+        self, item_id: str, table: str, parent_id: str, embedding: List[float]
+    ) -> None:
+        if not embedding:
+            return
+        if self._loaded:
+            # The stamp is unknown here; the next sync reloads this one row
+            async with self._lock.write():
+                self._add_rows([(item_id, table, parent_id, None)], [embedding])
+        await self._changed()
+
+    async def remove(self, record_id: str) -> None:
+        if self._loaded:
+            async with self._lock.write():
+                rows = set(self._children.get(record_id, set()))
+                if record_id in self._row_of:
+                    rows.add(self._row_of[record_id])
+                if rows:
+                    self._remove_rows(rows)
+        await self._changed()
+
+    # ----------------------------------------------------------------- sync
+
+    async def _sync_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Vector index sync failed: {e}")
+
+    async def sync(self, if_changed: bool = False) -> None:
+        """
+        Reconcile the index with the database: add missing rows, reload rows
+        whose `updated` stamp changed and drop stale ones. After a rebuild
+        every vector is reloaded. With `if_changed`, only sync if the
+        generation counter moved since the last sync.
+        """
+        async with self._sync_lock:
+            generation, rebuild = await get_vector_generation()
+            if if_changed and generation <= self._generation and (
+                rebuild == self._rebuild
+            ):
+                return
+            dimension = await embedding_dimension()
+            if not dimension:
+                return
+            if dimension != self.dimension or (
+                self._rebuild is not None and rebuild != self._rebuild
+            ):
+                logger.info("Embeddings were replaced, reloading the vector index")
+                async with self._lock.write():
+                    self._reset(dimension)
+            self._rebuild = rebuild
+            for table in VECTOR_TABLES:
+                await self._sync_table(table)
+            if not if_changed:
+                # Searches may sync often; the full meta.json is written
+                # by the periodic sync and at shutdown
+                async with self._lock.write():
+                    self._persist()
+            self._generation = generation
+
+    async def _sync_table(self, table: str) -> None:
+        parent_field = "id" if table == "note" else "source"
+        rows = await repo_query(
+            f"SELECT id, {parent_field} AS parent, updated FROM {table} "
+            "WHERE embedding != NONE"
+        )
+        db_rows = {
+            row["id"]: (row["parent"], self._stamp(row.get("updated"))) for row in rows
+        }
+        async with self._lock.write():
+            indexed = {
+                self._ids[row]: row
+                for row in range(self._count)
+                if self._tables[row] == table
+            }
+            stale = indexed.keys() - db_rows.keys()
+            self._remove_rows({indexed[item_id] for item_id in stale})
+        changed = [
+            item_id
+            for item_id, (_, stamp) in db_rows.items()
+            if item_id not in indexed or self._stamps[indexed[item_id]] != stamp
+        ]
+        for start in range(0, len(changed), SYNC_PAGE_SIZE):
+            page = changed[start : start + SYNC_PAGE_SIZE]
+            vectors = await repo_query(
+                "SELECT id, embedding FROM $ids",
+                {"ids": [ensure_record_id(item_id) for item_id in page]},
+            )
+            vectors = [
+                v
+                for v in vectors
+                if v.get("embedding") and len(v["embedding"]) == self.dimension
+            ]
+            if not vectors:
+                continue
+            async with self._lock.write():
+                self._add_rows(
+                    [(v["id"], table, *db_rows[v["id"]]) for v in vectors],
+                    [v["embedding"] for v in vectors],
+                )
+        if stale or changed:
+            logger.debug(f"Vector index sync {table}: ~{len(changed)} -{len(stale)}")
+
+    # --------------------------------------------------------------- search
+
+    def _top_rows(
+        self,
+        query: Any,
+        vectors: Any,
+        allowed: Any,
+        candidates: int,
+        minimum_score: float,
+    ) -> List[Tuple[int, float]]:
+        np = self.np
+        scores = np.empty(vectors.shape[0], dtype=np.float32)
+        # Blocks keep float16 upcasts and memmap page-ins bounded
+        for start in range(0, vectors.shape[0], SEARCH_BLOCK_ROWS):
+            block = vectors[start : start + SEARCH_BLOCK_ROWS]
+            scores[start : start + block.shape[0]] = (
+                block.astype(np.float32, copy=False) @ query
+            )
+        keep = allowed & (scores >= minimum_score)
+        hits = int(keep.sum())
+        if hits == 0:
+            return []
+        scores = np.where(keep, scores, -np.inf)
+        k = min(candidates, hits)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    async def search(
+        self,
+        embedding: List[float],
+        results: int,
+        source: bool = True,
+        note: bool = True,
+        minimum_score: float = 0.2,
+    ) -> List[Dict[str, Any]]:
+        np = self.np
+        if not self._loaded:
+            # E.g. no embedding model was configured at startup
+            return await SurrealVectorBackend().search(
+                embedding, results, source, note, minimum_score
+            )
+        try:
+            await self.sync(if_changed=True)
+        except Exception as e:
+            logger.warning(f"Vector index sync failed, searching as is: {e}")
+        if self._count == 0:
+            return []
+        query = self._normalise(embedding)[0]
+        if query.shape[0] != self.dimension:
+            raise ConfigurationError(
+                f"Query has dimension {query.shape[0]}, index has {self.dimension}"
+            )
+
+        wanted = []
+        if source:
+            wanted += [TABLE_CODES["source_embedding"], TABLE_CODES["source_insight"]]
+        if note:
+            wanted.append(TABLE_CODES["note"])
+        # Chunks are grouped per source, so look further than `results` rows
+        candidates = max(results * 8, 200)
+        # `vectors` is a view of the matrix, so rows must not be reused or the
+        # file remapped until scoring is done
+        async with self._lock.read():
+            count = self._count
+            vectors = self._vectors[:count]
+            allowed = np.isin(self._codes[:count], wanted)
+            table_names = self._tables[:count]
+            ids = self._ids[:count]
+            parents = self._parents[:count]
+            top = await asyncio.to_thread(
+                self._top_rows, query, vectors, allowed, candidates, minimum_score
+            )
+        if not top:
+            return []
+
+        details = await repo_query(
+            """
+            SELECT id, content, title, insight_type, source.title AS source_title
+            FROM $ids
+            """,
+            {"ids": [ensure_record_id(ids[row]) for row, _ in top]},
+        )
+        detail_of = {d["id"]: d for d in details}
+
+        grouped: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for row, score in top:
+            detail = detail_of.get(ids[row])
+            if not detail:
+                continue
+            table = table_names[row]
+            if table == "source_embedding":
+                key_id = parents[row]
+                title = detail.get("source_title")
+            elif table == "source_insight":
+                key_id = ids[row]
+                title = f"{detail.get('insight_type')} - {detail.get('source_title') or ''}"
+            else:
+                key_id = ids[row]
+                title = detail.get("title")
+            key = (key_id, parents[row])
+            if key not in grouped:
+                grouped[key] = dict(
+                    id=key_id,
+                    parent_id=parents[row],
+                    title=title,
+                    similarity=score,
+                    matches=[],
+                )
+            grouped[key]["matches"].append(detail.get("content"))
+
+        ranked = sorted(grouped.values(), key=lambda r: r["similarity"], reverse=True)
+        return ranked[:results]
+
+
+_backend: Optional[VectorSearchBackend] = None
+
+
+def get_vector_backend() -> VectorSearchBackend:
+    """Return the configured backend (VECTOR_SEARCH_BACKEND, default 'surreal')."""
+    global _backend
+    if _backend is None:
+        choice = os.getenv("VECTOR_SEARCH_BACKEND", "surreal").lower()
+        if choice == "numpy":
+            _backend = NumpyVectorBackend(
+                dtype=os.getenv("VECTOR_INDEX_DTYPE", "float32"),
+                sync_interval=env_float("VECTOR_INDEX_SYNC_INTERVAL", 300),
+            )
+        elif choice == "surreal":
+            _backend = SurrealVectorBackend()
+        else:
+            raise ConfigurationError(f"Unknown vector search backend: {choice}")
+    return _backend
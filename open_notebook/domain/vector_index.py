@@ -0,0 +1,317 @@
+"""
+HNSW vector indexes over the embedding fields of source_embedding,
+source_insight and note.
+
+An HNSW index needs a fixed DIMENSION, which depends on the configured
+embedding model, so the indexes are defined from here instead of from a
+migration. They are built CONCURRENTLY, so the database keeps serving while
+the existing vectors are indexed. Their state is kept in the
+open_notebook:vector_index record so that every process knows whether
+fn::vector_search can be used or whether it has to fall back to
+fn::vector_search_exact. The record also holds the dimension of the embedding
+model, so it is only probed again when the model changes.
+
+The open_notebook:vector_generation record counts changes to stored
+embeddings, so processes that keep their own copy of them (the numpy
+backend) notice changes made by other processes, and counts rebuilds, after
+which every embedding may have been replaced.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from loguru import logger
+
+from open_notebook.database.repository import ensure_record_id, repo_query
+from open_notebook.domain.embeddings import embed_in_batches
+from open_notebook.domain.models import model_manager
+from open_notebook.exceptions import ConfigurationError, DatabaseOperationError
+
+VECTOR_INDEXES: Dict[str, str] = {
+    "source_embedding": "idx_source_embedding_vector",
+    "source_insight": "idx_source_insight_vector",
+    "note": "idx_note_vector",
+}
+INDEX_STATE_RECORD = "open_notebook:vector_index"
+GENERATION_RECORD = "open_notebook:vector_generation"
+# How long a process trusts its cached index state before re-reading it
+INDEX_STATE_TTL = 60.0
+REEMBED_PAGE_SIZE = 200
+# Rows fn::vector_search takes from each table's index (the KNN operator in
+# migrations/8.surrealql only accepts literal sizes); larger searches are exact
+HNSW_SEARCH_LIMIT = 200
+INDEX_BUILD_POLL_INTERVAL = 2.0
+
+_dimension_cache: Dict[str, int] = {}
+_state_cache: Optional[Dict[str, Any]] = None
+_state_checked_at = 0.0
+
+
+async def embedding_dimension() -> Optional[int]:
+    """Vector size produced by the default embedding model, or None if unset."""
+    defaults = await model_manager.get_defaults()
+    model_id = defaults.default_embedding_model
+    if not model_id:
+        return None
+    if model_id not in _dimension_cache:
+        state = await get_index_state()
+        if state and state.get("embedding_model") == model_id and state.get(
+            "dimension"
+        ):
+            _dimension_cache[model_id] = state["dimension"]
+            return state["dimension"]
+        model = await model_manager.get_embedding_model()
+        if not model:
+            return None
+        probe = await model.aembed(["dimension probe"])
+        _dimension_cache[model_id] = len(probe[0])
+    return _dimension_cache[model_id]
+
+
+async def get_index_state(force: bool = False) -> Optional[Dict[str, Any]]:
+    global _state_cache, _state_checked_at
+    if force or time.monotonic() - _state_checked_at > INDEX_STATE_TTL:
+        result = await repo_query(
+            "SELECT * FROM $record", {"record": ensure_record_id(INDEX_STATE_RECORD)}
+        )
+        _state_cache = result[0] if result else None
+        _state_checked_at = time.monotonic()
+    return _state_cache
+
+
+async def indexes_ready() -> bool:
+    try:
+        state = await get_index_state()
+    except Exception as e:
+        logger.warning(f"Could not read vector index state: {e}")
+        return False
+    return bool(state and state.get("ready"))
+
+
+async def _set_index_state(
+    dimension: Optional[int],
+    embedding_model: Optional[str],
+    ready: bool,
+    building: bool = False,
+) -> None:
+    global _state_cache, _state_checked_at
+    data = dict(
+        dimension=dimension,
+        embedding_model=embedding_model,
+        ready=ready,
+        building=building,
+    )
+    await repo_query(
+        "UPSERT $record CONTENT $data",
+        {"record": ensure_record_id(INDEX_STATE_RECORD), "data": data},
+    )
+    _state_cache = data
+    _state_checked_at = time.monotonic()
+
+
+async def get_vector_generation() -> Tuple[int, int]:
+    """The (generation, rebuild) counters of the stored embeddings."""
+    result = await repo_query(
+        "SELECT generation, rebuild FROM $record",
+        {"record": ensure_record_id(GENERATION_RECORD)},
+    )
+    state = result[0] if result else {}
+    return state.get("generation") or 0, state.get("rebuild") or 0
+
+
+async def bump_vector_generation(rebuild: bool = False) -> Tuple[int, int]:
+    """Record that stored embeddings changed; returns the new counters."""
+    result = await repo_query(
+        f"""
+        UPSERT $record SET
+            generation = (generation OR 0) + 1,
+            rebuild = (rebuild OR 0) + {1 if rebuild else 0}
+        RETURN generation, rebuild
+        """,
+        {"record": ensure_record_id(GENERATION_RECORD)},
+    )
+    return result[0]["generation"], result[0]["rebuild"]
+
+
+async def _stored_dimensions() -> Set[int]:
+    dimensions: Set[int] = set()
+    for table in VECTOR_INDEXES:
+        result = await repo_query(
+            f"""
+            SELECT array::len(embedding) AS dimension FROM {table}
+            WHERE embedding != NONE AND array::len(embedding) > 0
+            GROUP BY dimension
+            """
+        )
+        dimensions.update(row["dimension"] for row in result)
+    return dimensions
+
+
+async def define_vector_indexes(dimension: int) -> None:
+    """Start building the indexes; wait_for_vector_indexes() tells when done."""
+    statements = [
+        f"DEFINE INDEX OVERWRITE {index} ON TABLE {table} FIELDS embedding "
+        f"HNSW DIMENSION {int(dimension)} DIST COSINE CONCURRENTLY;"
+        for table, index in VECTOR_INDEXES.items()
+    ]
+    await repo_query("\n".join(statements))
+    logger.info(f"Building HNSW vector indexes with dimension {dimension}")
+
+
+async def _index_build_status(table: str, index: str) -> str:
+    result = await repo_query(f"INFO FOR INDEX {index} ON TABLE {table};")
+    info = result[0] if isinstance(result, list) and result else result
+    # Indexes that are not being built have no building status
+    building = info.get("building") if isinstance(info, dict) else None
+    if not building:
+        return "ready"
+    if building.get("status") == "error":
+        raise DatabaseOperationError(
+            f"Building {index} failed: {building.get('error', 'unknown error')}"
+        )
+    return building.get("status", "ready")
+
+
+async def wait_for_vector_indexes(
+    poll_interval: float = INDEX_BUILD_POLL_INTERVAL,
+) -> None:
+    pending = dict(VECTOR_INDEXES)
+    while pending:
+        for table, index in list(pending.items()):
+            if await _index_build_status(table, index) == "ready":
+                del pending[table]
+        if pending:
+            await asyncio.sleep(poll_interval)
+    logger.info("HNSW vector indexes are ready")
+
+
+async def _build_vector_indexes(dimension: int, model_id: Optional[str]) -> None:
+    """Define the indexes and mark them ready once built; exact scans until then."""
+    await _set_index_state(dimension, model_id, ready=False, building=True)
+    await define_vector_indexes(dimension)
+    await wait_for_vector_indexes()
+    await _set_index_state(dimension, model_id, ready=True)
+
+
+async def remove_vector_indexes() -> None:
+    statements = [
+        f"REMOVE INDEX IF EXISTS {index} ON TABLE {table};"
+        for table, index in VECTOR_INDEXES.items()
+    ]
+    await repo_query("\n".join(statements))
+
+
+async def ensure_vector_indexes() -> bool:
+    """
+    Define the vector indexes if they are missing and the stored vectors match
+    the configured embedding model, and wait until they are built. Returns True
+    when indexed search is usable. Meant to run in the background: searches
+    use exact scans while the indexes are built.
+    """
+    state = await get_index_state(force=True)
+    dimension = await embedding_dimension()
+    if not dimension:
+        logger.info("No embedding model configured, skipping vector indexes")
+        return False
+    model_id = (await model_manager.get_defaults()).default_embedding_model
+
+    if state and state.get("ready") and state.get("dimension") == dimension:
+        if state.get("embedding_model") != model_id:
+            logger.warning(
+                "The embedding model changed but kept the same dimension. Existing "
+                "vectors are not comparable with new ones until embeddings are rebuilt."
+            )
+        return True
+
+    stored = await _stored_dimensions()
+    if stored - {dimension}:
+        logger.warning(
+            f"Stored embeddings have dimension(s) {sorted(stored)} but the embedding "
+            f"model produces {dimension}. Vector search will use exact scans until "
+            "embeddings are rebuilt."
+        )
+        await remove_vector_indexes()
+        await _set_index_state(dimension, model_id, ready=False)
+        return False
+
+    if state and state.get("building") and state.get("dimension") == dimension:
+        # Started by another process or before a restart; the database keeps
+        # building it, so wait for that build instead of starting over
+        await wait_for_vector_indexes()
+        await _set_index_state(dimension, model_id, ready=True)
+        return True
+
+    await _build_vector_indexes(dimension, model_id)
+    return True
+
+
+async def _reembed_table(table: str) -> int:
+    model = await model_manager.get_embedding_model()
+    if not model:
+        raise ConfigurationError("No embedding model configured")
+
+    count = 0
+    start = 0
+    while True:
+        rows = await repo_query(
+            f"""
+            SELECT id, content FROM {table}
+            WHERE content != NONE AND content != ''
+            ORDER BY id LIMIT $limit START $start
+            """,
+            {"limit": REEMBED_PAGE_SIZE, "start": start},
+        )
+        if not rows:
+            break
+        embeddings = await embed_in_batches(model, [row["content"] for row in rows])
+        await repo_query(
+            "FOR $row IN $rows { UPDATE $row.id SET embedding = $row.embedding; };",
+            {
+                "rows": [
+                    {"id": ensure_record_id(row["id"]), "embedding": embedding}
+                    for row, embedding in zip(rows, embeddings)
+                ]
+            },
+        )
+        count += len(rows)
+        start += REEMBED_PAGE_SIZE
+    return count
+
+
+async def _reembed_sources() -> int:
+    from open_notebook.domain.notebook import Source
+
+    result = await repo_query("SELECT source FROM source_embedding GROUP BY source")
+    for row in result:
+        source = await Source.get(row["source"])
+        await source.vectorize()
+    return len(result)
+
+
+async def rebuild_vector_indexes(reembed: bool = True) -> Dict[str, int]:
+    """
+    Rebuild the vector indexes for the current embedding model.
+
+    With reembed=True every embedded source, every insight and every note is
+    embedded again first, which is required after switching embedding models.
+    Searches fall back to exact scans while the rebuild runs.
+    """
+    dimension = await embedding_dimension()
+    if not dimension:
+        raise ConfigurationError("No embedding model configured")
+    model_id = (await model_manager.get_defaults()).default_embedding_model
+
+    await _set_index_state(dimension, model_id, ready=False)
+    await remove_vector_indexes()
+
+    counts: Dict[str, int] = {}
+    if reembed:
+        counts["sources"] = await _reembed_sources()
+        counts["insights"] = await _reembed_table("source_insight")
+        counts["notes"] = await _reembed_table("note")
+        logger.info(f"Re-embedded content: {counts}")
+        await bump_vector_generation(rebuild=True)
+
+    await _build_vector_indexes(dimension, model_id)
+    return counts
@@ -0,0 +1,198 @@
+"""
+Shared executors for CPU-bound work that must not run on the event loop.
+
+- run_cpu_bound() sends a picklable function to a ProcessPoolExecutor, so
+  pure-Python work such as chunking or tokenizing a large document runs in
+  parallel and does not hold the GIL of the serving process.
+- run_in_thread() uses a ThreadPoolExecutor, for work that releases the GIL
+  or whose arguments are too expensive to pickle.
+
+Both pools are created lazily and sized with CPU_PROCESS_WORKERS and
+CPU_THREAD_WORKERS. Each pool records queue depth and task latency, which
+executor_stats() reports.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from loguru import logger
+
+from open_notebook.config import env_int
+
+T = TypeVar("T")
+
+CPU_PROCESS_WORKERS = env_int("CPU_PROCESS_WORKERS", min(4, os.cpu_count() or 1))
+CPU_THREAD_WORKERS = env_int("CPU_THREAD_WORKERS", min(8, (os.cpu_count() or 1) + 4))
+
+
+class ExecutorMetrics:
+    """Counters for one pool. Wait is submit-to-start, run is start-to-finish."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+        self.max_run = 0.0
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.submitted += 1
+
+    def on_done(self, wait: float, run: Optional[float], failed: bool) -> None:
+        with self._lock:
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if run is not None:
+                self.total_run += run
+                self.max_run = max(self.max_run, run)
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def snapshot(self, workers: int) -> Dict[str, Any]:
+        """
+        A pool runs at most `workers` tasks at a time, so the tasks in flight
+        beyond that are the ones waiting for a worker.
+        """
+        with self._lock:
+            finished = self.completed + self.failed
+            in_flight = self.submitted - finished
+            return dict(
+                queue_depth=max(0, in_flight - max(1, workers)),
+                in_flight=in_flight,
+                submitted=self.submitted,
+                completed=self.completed,
+                failed=self.failed,
+                avg_wait_ms=round(self.total_wait / finished * 1000, 2)
+                if finished
+                else 0.0,
+                max_wait_ms=round(self.max_wait * 1000, 2),
+                avg_run_ms=round(self.total_run / finished * 1000, 2)
+                if finished
+                else 0.0,
+                max_run_ms=round(self.max_run * 1000, 2),
+            )
+
+
+def _timed_call(
+    fn: Callable[..., T], args: Tuple, kwargs: Dict[str, Any]
+) -> Tuple[T, float, float]:
+    """Runs inside the worker; reports when it started and how long it ran."""
+    started = time.time()
+    result = fn(*args, **kwargs)
+    return result, started, time.time() - started
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+process_metrics = ExecutorMetrics()
+thread_metrics = ExecutorMetrics()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """The shared process pool, or None when CPU_PROCESS_WORKERS is 0."""
+    global _process_pool
+    if CPU_PROCESS_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _process_pool is None:
+            # spawn: forking a process that runs an event loop and worker
+            # threads can copy held locks into the child
+            _process_pool = ProcessPoolExecutor(
+                max_workers=CPU_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(
+                max_workers=max(1, CPU_THREAD_WORKERS), thread_name_prefix="cpu"
+            )
+        return _thread_pool
+
+
+async def _run(
+    executor: Executor,
+    metrics: ExecutorMetrics,
+    fn: Callable[..., T],
+    args: Tuple,
+    kwargs: Dict[str, Any],
+) -> T:
+    loop = asyncio.get_running_loop()
+    submitted = time.time()
+    metrics.on_submit()
+    try:
+        result, started, run = await loop.run_in_executor(
+            executor, _timed_call, fn, args, kwargs
+        )
+    except BaseException:
+        metrics.on_done(time.time() - submitted, None, failed=True)
+        raise
+    metrics.on_done(max(0.0, started - submitted), run, failed=False)
+    return result
+
+
+async def run_in_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run `fn` on the shared thread pool."""
+    return await _run(get_thread_pool(), thread_metrics, fn, args, kwargs)
+
+
+async def run_cpu_bound(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run `fn` on the shared process pool. `fn`, its arguments and its result
+    must be picklable. Falls back to the thread pool when process workers are
+    disabled or the pool is broken.
+    """
+    global _process_pool
+    pool = get_process_pool()
+    if pool is None:
+        return await run_in_thread(fn, *args, **kwargs)
+    try:
+        return await _run(pool, process_metrics, fn, args, kwargs)
+    except BrokenProcessPool:
+        logger.error("Process pool is broken, recreating it and using a thread")
+        with _pool_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        pool.shutdown(wait=False)
+        return await run_in_thread(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Any]:
+    return dict(
+        process=dict(
+            workers=CPU_PROCESS_WORKERS,
+            **process_metrics.snapshot(CPU_PROCESS_WORKERS),
+        ),
+        thread=dict(
+            workers=CPU_THREAD_WORKERS,
+            **thread_metrics.snapshot(CPU_THREAD_WORKERS),
+        ),
+    )
+
+
+def shutdown_executors() -> None:
+    global _process_pool, _thread_pool
+    with _pool_lock:
+        process_pool, _process_pool = _process_pool, None
+        thread_pool, _thread_pool = _thread_pool, None
+    if process_pool:
+        process_pool.shutdown(wait=True, cancel_futures=True)
+    if thread_pool:
+        thread_pool.shutdown(wait=True, cancel_futures=True)
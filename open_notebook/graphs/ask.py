@@ -1,17 +1,21 @@
 import operator
-from typing import Annotated, List
+import time
+from typing import Annotated, Any, Dict, List, Optional, Tuple
 
 from ai_prompter import Prompter
 from langchain_core.output_parsers.pydantic import PydanticOutputParser
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
+from loguru import logger
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
-from open_notebook.domain.notebook import vector_search
+from open_notebook.domain.notebook import vector_search_many
 from open_notebook.graphs.utils import provision_langchain_model
-from open_notebook.utils import clean_thinking_content
+from open_notebook.utils import atoken_count, clean_thinking_content
+
+SEARCH_RESULTS = 10
 
 
 class SubGraphState(TypedDict):
@@ -19,7 +23,7 @@ class SubGraphState(TypedDict):
     term: str
     # type: Literal["text", "vector"]
     instructions: str
-    results: dict
+    results: List[dict]
     answer: str
 
 
@@ -44,8 +48,84 @@ class Strategy(BaseModel):
 class ThreadState(TypedDict):
     question: str
     strategy: Strategy
+    search_results: List[List[dict]]
     answers: Annotated[list, operator.add]
     final_answer: str
+    # Latency and token usage of each step, in the order they finished
+    stages: Annotated[list, operator.add]
+
+
+async def _stage(
+    stage: str, started: float, prompt_tokens: int, ai_message: Any, **extra
+) -> Dict[str, Any]:
+    """
+    Duration and token usage of one model call, from the provider's usage
+    metadata when it reports it, else estimated from the prompt and answer.
+    """
+    usage = getattr(ai_message, "usage_metadata", None) or {}
+    output_tokens = usage.get("output_tokens")
+    if output_tokens is None:
+        output_tokens = await atoken_count(str(ai_message.content))
+    return dict(
+        stage=stage,
+        duration_ms=round((time.monotonic() - started) * 1000, 2),
+        input_tokens=usage.get("input_tokens") or prompt_tokens,
+        output_tokens=output_tokens,
+        **extra,
+    )
+
+
+async def _invoke(
+    system_prompt: str,
+    model_id: Optional[str],
+    config: Optional[RunnableConfig] = None,
+    **kwargs,
+) -> Tuple[Any, int]:
+    """
+    Call the model on the prompt; returns the message and the prompt size.
+    Passing the node's config on lets graph.astream(stream_mode="messages")
+    see the tokens as the model produces them.
+    """
+    tokens = await atoken_count(system_prompt)
+    model = await provision_langchain_model(
+        system_prompt, model_id, "tools", tokens=tokens, max_tokens=2000, **kwargs
+    )
+    return await model.ainvoke(system_prompt, config), tokens
+
+
+def dedupe_results(
+    branches: List[List[Dict[str, Any]]],
+) -> Tuple[List[List[Dict[str, Any]]], int]:
+    """
+    Give each retrieved chunk to a single search: the one whose result
+    matched it best, the earliest on ties. A result keeps only the chunks
+    (`matches`) it was given and is dropped when none are left, so the answer
+    models never read the same chunk twice. Returns the results of each
+    search and the number of chunks removed.
+    """
+    owner: Dict[Tuple[str, str], Tuple[float, int]] = {}
+    for index, results in enumerate(branches):
+        for result in results:
+            similarity = result.get("similarity") or 0.0
+            for match in result.get("matches") or [""]:
+                key = (str(result["id"]), str(match))
+                if key not in owner or similarity > owner[key][0]:
+                    owner[key] = (similarity, index)
+
+    deduped: List[List[Dict[str, Any]]] = []
+    removed = 0
+    for index, results in enumerate(branches):
+        kept = []
+        for result in results:
+            matches = result.get("matches") or [""]
+            own = [m for m in matches if owner[(str(result["id"]), str(m))][1] == index]
+            removed += len(matches) - len(own)
+            if own and result.get("matches"):
+                kept.append(dict(result, matches=own))
+            elif own:
+                kept.append(result)
+        deduped.append(kept)
+    return deduped, removed
 
 
 async def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict:
@@ -53,81 +133,109 @@ async def call_model_with_messages(state: ThreadState, config: RunnableConfig) -
     system_prompt = Prompter(prompt_template="ask/entry", parser=parser).render(
         data=state
     )
-    model = await provision_langchain_model(
+    started = time.monotonic()
+    ai_message, tokens = await _invoke(
         system_prompt,
         config.get("configurable", {}).get("strategy_model"),
-        "tools",
-        max_tokens=2000,
         structured=dict(type="json"),
     )
-    # model = model.bind_tools(tools)
-    # First get the raw response from the model
-    ai_message = await model.ainvoke(system_prompt)
 
     # Clean the thinking content from the response
     cleaned_content = clean_thinking_content(ai_message.content)
 
     # Parse the cleaned JSON content
     strategy = parser.parse(cleaned_content)
-
-    return {"strategy": strategy}
+    stage = await _stage("strategy", started, tokens, ai_message)
+
+    return {"strategy": strategy, "stages": [stage]}
+
+
+async def run_searches(state: ThreadState, config: RunnableConfig) -> dict:
+    """
+    Embed the terms of all searches in one call, run the searches
+    concurrently and remove the chunks retrieved by more than one of them.
+    """
+    started = time.monotonic()
+    terms = [search.term for search in state["strategy"].searches]
+    searched = [term for term in terms if term]
+    if not searched:
+        return {"search_results": [[] for _ in terms], "stages": []}
+    found = iter(await vector_search_many(searched, SEARCH_RESULTS, True, True))
+    results, removed = dedupe_results(
+        [next(found) if term else [] for term in terms]
+    )
+    stage = dict(
+        stage="search",
+        duration_ms=round((time.monotonic() - started) * 1000, 2),
+        searches=len(searched),
+        results=sum(len(r) for r in results),
+        duplicates_removed=removed,
+    )
+    return {"search_results": results, "stages": [stage]}
 
 
 async def trigger_queries(state: ThreadState, config: RunnableConfig):
-    return [
+    sends = [
         Send(
             "provide_answer",
             {
                 "question": state["question"],
                 "instructions": s.instructions,
                 "term": s.term,
+                "results": results,
                 # "type": s.type,
             },
         )
-        for s in state["strategy"].searches
+        for s, results in zip(state["strategy"].searches, state["search_results"])
+        if results
     ]
+    # Nothing found: the final answer says so
+    return sends or "write_final_answer"
 
 
 async def provide_answer(state: SubGraphState, config: RunnableConfig) -> dict:
-    payload = state
+    payload = dict(state)
     # if state["type"] == "text":
     #     results = text_search(state["term"], 10, True, True)
-    # else:
-    results = await vector_search(state["term"], 10, True, True)
-    if len(results) == 0:
-        return {"answers": []}
-    payload["results"] = results
-    ids = [r["id"] for r in results]
-    payload["ids"] = ids
+    payload["ids"] = [r["id"] for r in state["results"]]
     system_prompt = Prompter(prompt_template="ask/query_process").render(data=payload)
-    model = await provision_langchain_model(
-        system_prompt,
-        config.get("configurable", {}).get("answer_model"),
-        "tools",
-        max_tokens=2000,
+    started = time.monotonic()
+    ai_message, tokens = await _invoke(
+        system_prompt, config.get("configurable", {}).get("answer_model"), config
     )
-    ai_message = await model.ainvoke(system_prompt)
-    return {"answers": [clean_thinking_content(ai_message.content)]}
+    stage = await _stage("answer", started, tokens, ai_message, term=state["term"])
+    return {
+        "answers": [clean_thinking_content(ai_message.content)],
+        "stages": [stage],
+    }
 
 
 async def write_final_answer(state: ThreadState, config: RunnableConfig) -> dict:
     system_prompt = Prompter(prompt_template="ask/final_answer").render(data=state)
-    model = await provision_langchain_model(
+    started = time.monotonic()
+    ai_message, tokens = await _invoke(
         system_prompt,
         config.get("configurable", {}).get("final_answer_model"),
-        "tools",
-        max_tokens=2000,
+        config,
     )
-    ai_message = await model.ainvoke(system_prompt)
-    return {"final_answer": clean_thinking_content(ai_message.content)}
+    stage = await _stage("final_answer", started, tokens, ai_message)
+    logger.debug(f"Ask stages: {state.get('stages', []) + [stage]}")
+    return {
+        "final_answer": clean_thinking_content(ai_message.content),
+        "stages": [stage],
+    }
 
 
 agent_state = StateGraph(ThreadState)
 agent_state.add_node("agent", call_model_with_messages)
+agent_state.add_node("search", run_searches)
 agent_state.add_node("provide_answer", provide_answer)
 agent_state.add_node("write_final_answer", write_final_answer)
 agent_state.add_edge(START, "agent")
-agent_state.add_conditional_edges("agent", trigger_queries, ["provide_answer"])
+agent_state.add_edge("agent", "search")
+agent_state.add_conditional_edges(
+    "search", trigger_queries, ["provide_answer", "write_final_answer"]
+)
 agent_state.add_edge("provide_answer", "write_final_answer")
 agent_state.add_edge("write_final_answer", END)
 
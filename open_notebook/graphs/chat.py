@@ -1,17 +1,33 @@
 import asyncio
 import sqlite3
-from typing import Annotated, Optional
+import threading
+import weakref
+from typing import Annotated, Any, Dict, Optional
 
 from ai_prompter import Prompter
 from langchain_core.messages import SystemMessage
-from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
+from langgraph.graph.state import CompiledStateGraph
+from loguru import logger
 from typing_extensions import TypedDict
 
 from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE
 from open_notebook.domain.notebook import Notebook
+from open_notebook.graphs.chat_context import (
+    CHAT_HISTORY_SHARE,
+    assemble_context,
+    assemble_history,
+    get_context_budget,
+    message_text,
+    token_sizes,
+)
+from open_notebook.graphs.checkpoints import (
+    PooledAsyncSqliteSaver,
+    configure_connection,
+)
 from open_notebook.graphs.utils import provision_langchain_model
 
 
@@ -20,31 +36,136 @@ class ThreadState(TypedDict):
     notebook: Optional[Notebook]
     context: Optional[str]
     context_config: Optional[dict]
+    # Running summary of the first `summarized` messages, which are no longer
+    # sent to the model
+    history_summary: Optional[str]
+    summarized: Optional[int]
 
 
-def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict:
-    system_prompt = Prompter(prompt_template="chat").render(data=state)
-    payload = [SystemMessage(content=system_prompt)] + state.get("messages", [])
-    model = asyncio.run(
-        provision_langchain_model(
-            str(payload),
-            config.get("configurable", {}).get("model_id"),
-            "chat",
-            max_tokens=10000,
-        )
+async def call_model_with_messages(state: ThreadState, config: RunnableConfig) -> dict:
+    """
+    Fit the conversation and the context into the model's token budget, in
+    that order: the context gets whatever the system prompt and the history
+    leave, so the prompt does not keep growing with the session.
+    """
+    model_id = config.get("configurable", {}).get("model_id")
+    budget = await get_context_budget(model_id)
+    messages, summary, updates, history_tokens = await assemble_history(
+        state, int(budget * CHAT_HISTORY_SHARE), config
+    )
+    prompter = Prompter(prompt_template="chat")
+    fixed_tokens = await token_sizes.count(
+        prompter.render(data=dict(state, context=None, history_summary=None))
+    )
+    question = message_text(messages[-1]) if messages else ""
+    context, context_tokens = await assemble_context(
+        state.get("context"), question, budget - fixed_tokens - history_tokens
+    )
+    system_prompt = prompter.render(
+        data=dict(state, context=context, history_summary=summary)
+    )
+    payload = [SystemMessage(content=system_prompt)] + messages
+    logger.debug(
+        f"Chat prompt of {budget} token budget: {fixed_tokens} system, "
+        f"{history_tokens} history, {context_tokens} context"
+    )
+    model = await provision_langchain_model(
+        payload,
+        model_id,
+        "chat",
+        tokens=fixed_tokens + history_tokens + context_tokens,
+        max_tokens=10000,
     )
-    ai_message = model.invoke(payload)
-    return {"messages": ai_message}
+    # Passing the config on lets graph.astream(stream_mode="messages") see the
+    # tokens as the model produces them
+    ai_message = await model.ainvoke(payload, config)
+    return {"messages": ai_message, **updates}
 
 
-conn = sqlite3.connect(
-    LANGGRAPH_CHECKPOINT_FILE,
-    check_same_thread=False,
-)
-memory = SqliteSaver(conn)
+def call_model_with_messages_sync(state: ThreadState, config: RunnableConfig) -> dict:
+    return asyncio.run(call_model_with_messages(state, config))
+
 
 agent_state = StateGraph(ThreadState)
-agent_state.add_node("agent", call_model_with_messages)
+agent_state.add_node(
+    "agent",
+    RunnableLambda(call_model_with_messages_sync, afunc=call_model_with_messages),
+)
 agent_state.add_edge(START, "agent")
 agent_state.add_edge("agent", END)
+
+# Synchronous graph for the Streamlit UI
+conn = configure_connection(
+    sqlite3.connect(
+        LANGGRAPH_CHECKPOINT_FILE,
+        check_same_thread=False,
+    )
+)
+memory = SqliteSaver(conn)
 graph = agent_state.compile(checkpointer=memory)
+
+# The async checkpointer's connections belong to the event loop that opened them
+_async_graphs: "weakref.WeakKeyDictionary[Any, CompiledStateGraph]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_graphs_lock = threading.Lock()
+
+
+async def get_async_graph() -> CompiledStateGraph:
+    """
+    The chat graph with a pool of async checkpointer connections on the same
+    file as `graph`, for ainvoke() and astream() from the API's event loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_graphs_lock:
+        if loop in _async_graphs:
+            return _async_graphs[loop]
+    saver = await PooledAsyncSqliteSaver.create()
+    with _async_graphs_lock:
+        async_graph = _async_graphs.setdefault(
+            loop, agent_state.compile(checkpointer=saver)
+        )
+    if async_graph.checkpointer is not saver:
+        # Another caller on this loop got there first
+        await saver.aclose()
+    return async_graph
+
+
+async def close_async_graph() -> None:
+    """Close the checkpointer connections opened on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _async_graphs_lock:
+        async_graph = _async_graphs.pop(loop, None)
+    if async_graph is not None:
+        await async_graph.checkpointer.aclose()
+
+
+class StreamStats:
+    """Time to first token and total duration of streamed chat answers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.total_ttft = 0.0
+        self.max_ttft = 0.0
+        self.total_duration = 0.0
+
+    def record(self, ttft: float, duration: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self.total_ttft += ttft
+            self.max_ttft = max(self.max_ttft, ttft)
+            self.total_duration += duration
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            streams = self.streams or 1
+            return dict(
+                streams=self.streams,
+                avg_ttft_ms=round(self.total_ttft / streams * 1000, 2),
+                max_ttft_ms=round(self.max_ttft * 1000, 2),
+                avg_duration_ms=round(self.total_duration / streams * 1000, 2),
+            )
+
+
+chat_stream_stats = StreamStats()
@@ -0,0 +1,381 @@
+"""
+Token-budgeted assembly of the chat prompt.
+
+Each turn the chat graph sends the system prompt, the selected context and
+the conversation so far. Instead of sending all of it and letting long
+sessions overflow into the large context model, the prompt is fitted into the
+budget of the chat model:
+
+- the newest messages are kept verbatim in up to CHAT_HISTORY_SHARE of the
+  budget; older ones are folded into a running summary stored in the thread
+  state (CHAT_HISTORY_MODE=summarize) or dropped (CHAT_HISTORY_MODE=window),
+- the rest of the budget goes to the context: notes, insights and source
+  texts are ranked by their overlap with the question and added until the
+  budget is spent, truncating the last long text to fit.
+
+Token counts of context items and messages are cached by content hash, so
+only new or changed items are tokenized on each turn. The budget is
+CHAT_CONTEXT_BUDGET tokens, overridden per model with CHAT_CONTEXT_BUDGETS, a
+JSON object keyed by model id, "provider/model" or provider, e.g.
+{"ollama": 6000, "openai/gpt-4o-mini": 60000}.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from loguru import logger
+
+from open_notebook.config import env_float, env_int
+from open_notebook.domain.models import Model, model_manager
+from open_notebook.executors import run_in_thread
+from open_notebook.utils import clean_thinking_content, get_encoding, token_count
+
+# Stays below LARGE_CONTEXT_THRESHOLD so chats keep using the chosen model
+CHAT_CONTEXT_BUDGET = env_int("CHAT_CONTEXT_BUDGET", 48_000)
+CHAT_HISTORY_SHARE = env_float("CHAT_HISTORY_SHARE", 0.3)
+CHAT_HISTORY_MODE = os.getenv("CHAT_HISTORY_MODE", "summarize")
+TOKEN_SIZE_CACHE_ENTRIES = env_int("TOKEN_SIZE_CACHE_ENTRIES", 20_000)
+# Long texts are only truncated into what is left if at least this much is
+MIN_TRUNCATED_TOKENS = 256
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Preference between items that match the question equally well
+KIND_PRIORITY = {"note": 0.3, "insight": 0.2, "source": 0.0}
+
+SUMMARY_PROMPT = """
+Summarize the conversation below between a user and a research assistant so
+the assistant can continue it without the original messages. Keep the
+questions asked, the answers and conclusions given, the document ids cited
+(exactly as written, e.g. [source:abc]) and any preferences the user stated.
+Be concise and write plain prose.
+"""
+
+
+def _load_budgets() -> Dict[str, int]:
+    raw = os.getenv("CHAT_CONTEXT_BUDGETS")
+    if not raw:
+        return {}
+    try:
+        budgets = json.loads(raw)
+        if not isinstance(budgets, dict):
+            raise ValueError("expected an object")
+        return {str(key): int(value) for key, value in budgets.items()}
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid CHAT_CONTEXT_BUDGETS: {e}")
+        return {}
+
+
+CHAT_CONTEXT_BUDGETS = _load_budgets()
+
+
+class TokenSizeCache:
+    """LRU map from the hash of a text to its token count."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._sizes: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        with self._lock:
+            size = self._sizes.get(key)
+            if size is None:
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+            self.hits += 1
+            return size
+
+    def _store(self, key: bytes, size: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._sizes[key] = size
+            self._sizes.move_to_end(key)
+            while len(self._sizes) > self.max_entries:
+                self._sizes.popitem(last=False)
+
+    async def count(self, text: str) -> int:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        size = self._lookup(key)
+        if size is None:
+            size = await run_in_thread(token_count, text)
+            self._store(key, size)
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0,
+            entries=len(self._sizes),
+            max_entries=self.max_entries,
+        )
+
+
+token_sizes = TokenSizeCache(TOKEN_SIZE_CACHE_ENTRIES)
+
+
+async def get_context_budget(model_id: Optional[str]) -> int:
+    """Token budget of the chat prompt for `model_id` or the default chat model."""
+    if not CHAT_CONTEXT_BUDGETS:
+        return CHAT_CONTEXT_BUDGET
+    if not model_id:
+        model_id = (await model_manager.get_defaults()).default_chat_model
+    if not model_id:
+        return CHAT_CONTEXT_BUDGET
+    if model_id in CHAT_CONTEXT_BUDGETS:
+        return CHAT_CONTEXT_BUDGETS[model_id]
+    try:
+        model = await Model.get(model_id)
+    except Exception as e:
+        logger.debug(f"Could not look up model {model_id} for its budget: {e}")
+        return CHAT_CONTEXT_BUDGET
+    for key in (f"{model.provider}/{model.name}", model.provider):
+        if key in CHAT_CONTEXT_BUDGETS:
+            return CHAT_CONTEXT_BUDGETS[key]
+    return CHAT_CONTEXT_BUDGET
+
+
+def message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return " ".join(
+        part.get("text", "") if isinstance(part, dict) else str(part)
+        for part in content
+    )
+
+
+async def message_tokens(message: BaseMessage) -> int:
+    text = f"{message.type}: {message_text(message)}"
+    return await token_sizes.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextItem:
+    kind: str
+    group: str
+    position: int
+    entry: int
+    field: str
+    value: Any
+    text: str
+    tokens: int = 0
+    score: float = 0.0
+
+
+@lru_cache(maxsize=2048)
+def _terms(text: str) -> frozenset:
+    return frozenset(re.findall(r"\w{3,}", text.lower()))
+
+
+def _score(item: ContextItem, terms: frozenset) -> float:
+    if not terms:
+        return KIND_PRIORITY.get(item.kind, 0.0)
+    overlap = len(terms & _terms(item.text)) / len(terms)
+    return overlap + KIND_PRIORITY.get(item.kind, 0.0)
+
+
+def _split_context(context: Dict[str, Any]) -> Tuple[Dict[str, list], list]:
+    """
+    Break each source into its header, insights and full text, and each note
+    into its header and content, so they are ranked and trimmed separately.
+    Returns the headers per group and the items.
+    """
+    headers: Dict[str, list] = {}
+    items: List[ContextItem] = []
+    for group, entries in context.items():
+        if not isinstance(entries, list):
+            continue
+        kind = "note" if group.startswith("note") else "source"
+        headers[group] = []
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict):
+                entry = {"content": entry}
+            header = {
+                key: value
+                for key, value in entry.items()
+                if key not in ("insights", "full_text", "content")
+            }
+            headers[group].append(header)
+            for index, insight in enumerate(entry.get("insights") or []):
+                items.append(
+                    ContextItem(
+                        kind="insight",
+                        group=group,
+                        position=position,
+                        entry=index,
+                        field="insights",
+                        value=insight,
+                        text=str(insight),
+                    )
+                )
+            for field in ("full_text", "content"):
+                if entry.get(field):
+                    items.append(
+                        ContextItem(
+                            kind=kind,
+                            group=group,
+                            position=position,
+                            entry=0,
+                            field=field,
+                            value=entry[field],
+                            text=str(entry[field]),
+                        )
+                    )
+    return headers, items
+
+
+def _truncate(text: str, tokens: int) -> str:
+    encoding = get_encoding()
+    encoded = encoding.encode(text, disallowed_special=())
+    return encoding.decode(encoded[:tokens]) + "\n[...]"
+
+
+async def assemble_context(
+    context: Optional[Dict[str, Any]], question: str, budget: int
+) -> Tuple[Optional[Dict[str, Any]], int]:
+    """
+    The parts of `context` that best match `question` within `budget`
+    tokens, in the shape of `context`, and the tokens they take.
+    """
+    if not context or not isinstance(context, dict):
+        return context, 0
+    headers, items = _split_context(context)
+    terms = _terms(question)
+    used = 0
+    for group in headers.values():
+        for header in group:
+            used += await token_sizes.count(str(header))
+    for item in items:
+        item.tokens = await token_sizes.count(item.text)
+        item.score = _score(item, terms)
+
+    kept: List[ContextItem] = []
+    for item in sorted(items, key=lambda item: -item.score):
+        remaining = budget - used
+        if item.tokens <= remaining:
+            kept.append(item)
+            used += item.tokens
+        elif item.field != "insights" and remaining >= MIN_TRUNCATED_TOKENS:
+            item.value = await run_in_thread(_truncate, item.text, remaining - 8)
+            kept.append(item)
+            used = budget
+
+    # Rebuild the entries in their original order; sources left without any
+    # content are dropped along with their header
+    assembled: Dict[str, list] = {}
+    for group, group_headers in headers.items():
+        entries: List[dict] = [dict(header) for header in group_headers]
+        has_content = [False] * len(entries)
+        for item in sorted(kept, key=lambda item: (item.position, item.entry)):
+            if item.group != group:
+                continue
+            entry = entries[item.position]
+            has_content[item.position] = True
+            if item.field == "insights":
+                entry.setdefault("insights", []).append(item.value)
+            else:
+                entry[item.field] = item.value
+        assembled[group] = [
+            entry
+            for entry, content in zip(entries, has_content)
+            if content or group.startswith("note")
+        ]
+    dropped = len(items) - len(kept)
+    if dropped:
+        logger.debug(f"Left {dropped} context items out of the chat budget")
+    return assembled, used
+
+
+async def window_messages(
+    messages: Sequence[BaseMessage], start: int, budget: int
+) -> Tuple[int, int, bool]:
+    """
+    The first message to send verbatim and the tokens of the window. The
+    window starts at `start` or later and always holds the last message;
+    `overflow` tells whether messages after `start` had to be left out.
+    """
+    sizes = [await message_tokens(message) for message in messages[start:]]
+    used = 0
+    first = len(messages)
+    for index in range(len(sizes) - 1, -1, -1):
+        if used + sizes[index] > budget and first < len(messages):
+            break
+        used += sizes[index]
+        first = start + index
+    return first, used, first > start
+
+
+async def summarize_messages(
+    summary: Optional[str], messages: Sequence[BaseMessage], config: Any
+) -> str:
+    """Fold `messages` into the running `summary` of the conversation."""
+    from open_notebook.graphs.utils import provision_langchain_model
+
+    transcript = "\n\n".join(
+        f"{message.type.upper()}: {message_text(message)}" for message in messages
+    )
+    if summary:
+        transcript = f"SUMMARY OF THE EARLIER CONVERSATION: {summary}\n\n{transcript}"
+    payload = [SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)]
+    model = await provision_langchain_model(
+        transcript,
+        config.get("configurable", {}).get("model_id"),
+        "chat",
+        max_tokens=2000,
+    )
+    # Run the summary outside the agent node's callbacks, so the chat stream
+    # does not pick up its tokens as part of the answer
+    response = await model.ainvoke(
+        payload, config={"callbacks": [], "tags": ["nostream"]}
+    )
+    return clean_thinking_content(message_text(response))
+
+
+async def assemble_history(
+    state: Dict[str, Any], budget: int, config: Any
+) -> Tuple[List[BaseMessage], Optional[str], Dict[str, Any], int]:
+    """
+    The messages to send verbatim, the summary of the older ones, the updates
+    to the thread state and the tokens all of it takes. In summarize mode,
+    messages that no longer fit are folded into `history_summary`; the window
+    is then cut to half the budget so the summary is not recomputed on every
+    turn.
+    """
+    messages: List[BaseMessage] = list(state.get("messages") or [])
+    summary: Optional[str] = state.get("history_summary")
+    start = min(state.get("summarized") or 0, len(messages))
+    if CHAT_HISTORY_MODE != "summarize":
+        start = 0
+        summary = None
+    first, used, overflow = await window_messages(messages, start, budget)
+    updates: Dict[str, Any] = {}
+    if overflow and CHAT_HISTORY_MODE == "summarize":
+        first, used, _ = await window_messages(messages, start, budget // 2)
+        try:
+            summary = await summarize_messages(summary, messages[start:first], config)
+            updates = {"history_summary": summary, "summarized": first}
+        except Exception as e:
+            logger.warning(f"Could not summarize the chat history: {e}")
+            # Falling back to the window loses the older messages this turn
+            # only; they are summarized again on the next one
+    elif overflow:
+        logger.debug(f"Left {first} older messages out of the chat window")
+    if summary:
+        used += await token_sizes.count(summary)
+    return messages[first:], summary, updates, used
+
+
@@ -0,0 +1,294 @@
+"""
+Storage of chat threads in the LangGraph SQLite checkpoint file.
+
+The API checkpoints through a small pool of async connections in WAL mode,
+so turns of different chat sessions read and write concurrently instead of
+queueing behind a single connection. Every turn stores a new checkpoint with
+the whole message history, so the file only grows: compact_checkpoints()
+keeps the latest CHAT_CHECKPOINT_KEEP checkpoints of each thread, drops
+threads whose chat session was deleted and vacuums the file.
+"""
+
+import asyncio
+import os
+import sqlite3
+from contextlib import asynccontextmanager, closing
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from loguru import logger
+
+from open_notebook.config import LANGGRAPH_CHECKPOINT_FILE, env_int
+from open_notebook.database.repository import repo_query
+from open_notebook.executors import run_in_thread
+
+CHAT_CHECKPOINT_POOL_SIZE = env_int("CHAT_CHECKPOINT_POOL_SIZE", 4)
+CHAT_CHECKPOINT_KEEP = env_int("CHAT_CHECKPOINT_KEEP", 3)
+BUSY_TIMEOUT_MS = 30_000
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """WAL lets readers and a writer work at once; writers wait for each other."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class PooledAsyncSqliteSaver(BaseCheckpointSaver):
+    """
+    Checkpointer that runs every operation on one of several AsyncSqliteSaver
+    connections. A single AsyncSqliteSaver serializes all threads behind its
+    connection and lock; the pool lets up to `size` of them proceed at once.
+    """
+
+    def __init__(self, savers: List[AsyncSqliteSaver]) -> None:
+        super().__init__(serde=savers[0].serde)
+        self._savers = savers
+        self._pool: asyncio.Queue = asyncio.Queue()
+        for saver in savers:
+            self._pool.put_nowait(saver)
+
+    @classmethod
+    async def create(
+        cls,
+        path: str = LANGGRAPH_CHECKPOINT_FILE,
+        size: int = CHAT_CHECKPOINT_POOL_SIZE,
+    ) -> "PooledAsyncSqliteSaver":
+        savers = []
+        for _ in range(max(1, size)):
+            conn = await aiosqlite.connect(path)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            savers.append(AsyncSqliteSaver(conn))
+        # Create the tables once rather than racing on the first requests
+        await savers[0].setup()
+        return cls(savers)
+
+    @asynccontextmanager
+    async def _saver(self) -> AsyncIterator[AsyncSqliteSaver]:
+        saver = await self._pool.get()
+        try:
+            yield saver
+        finally:
+            self._pool.put_nowait(saver)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        async with self._saver() as saver:
+            return await saver.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async with self._saver() as saver:
+            async for checkpoint in saver.alist(
+                config, filter=filter, before=before, limit=limit
+            ):
+                yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        async with self._saver() as saver:
+            return await saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        async with self._saver() as saver:
+            await saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self._saver() as saver:
+            await saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current: Any, channel: Any) -> Any:
+        return self._savers[0].get_next_version(current, channel)
+
+    async def aclose(self) -> None:
+        for saver in self._savers:
+            await saver.conn.close()
+
+
+def _has_tables(conn: sqlite3.Connection) -> bool:
+    tables = {
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    }
+    return {"checkpoints", "writes"} <= tables
+
+
+def thread_storage(path: str = LANGGRAPH_CHECKPOINT_FILE) -> Dict[str, Dict[str, int]]:
+    """Checkpoints, pending writes and bytes stored per thread."""
+    if not os.path.exists(path):
+        return {}
+    with closing(sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)) as conn:
+        if not _has_tables(conn):
+            return {}
+        threads: Dict[str, Dict[str, int]] = {}
+        for thread_id, count, size in conn.execute(
+            """
+            SELECT thread_id, COUNT(*),
+                SUM(LENGTH(checkpoint) + IFNULL(LENGTH(metadata), 0))
+            FROM checkpoints GROUP BY thread_id
+            """
+        ):
+            threads[thread_id] = dict(checkpoints=count, writes=0, bytes=size or 0)
+        for thread_id, count, size in conn.execute(
+            "SELECT thread_id, COUNT(*), SUM(IFNULL(LENGTH(value), 0)) "
+            "FROM writes GROUP BY thread_id"
+        ):
+            thread = threads.setdefault(
+                thread_id, dict(checkpoints=0, writes=0, bytes=0)
+            )
+            thread["writes"] = count
+            thread["bytes"] += size or 0
+        return threads
+
+
+def compact_checkpoints(
+    keep: int = CHAT_CHECKPOINT_KEEP,
+    live_threads: Optional[Set[str]] = None,
+    path: str = LANGGRAPH_CHECKPOINT_FILE,
+) -> Dict[str, int]:
+    """
+    Keep the latest `keep` checkpoints of every thread (checkpoint ids sort
+    by time), delete the threads not in `live_threads` when it is given, drop
+    the writes of deleted checkpoints and vacuum the file.
+    """
+    if not os.path.exists(path):
+        return dict(checkpoints=0, writes=0, threads=0, bytes_before=0, bytes_after=0)
+    size_before = os.path.getsize(path)
+    conn = configure_connection(
+        sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    )
+    try:
+        if not _has_tables(conn):
+            return dict(
+                checkpoints=0,
+                writes=0,
+                threads=0,
+                bytes_before=size_before,
+                bytes_after=size_before,
+            )
+        conn.execute("BEGIN IMMEDIATE")
+        threads = 0
+        if live_threads is not None:
+            stale = [
+                row[0]
+                for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+                if row[0] not in live_threads
+            ]
+            conn.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ?",
+                [(thread_id,) for thread_id in stale],
+            )
+            threads = len(stale)
+        checkpoints = conn.execute(
+            """
+            DELETE FROM checkpoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns
+                        ORDER BY checkpoint_id DESC
+                    ) AS position
+                    FROM checkpoints
+                ) WHERE position > ?
+            )
+            """,
+            (max(1, keep),),
+        ).rowcount
+        writes = conn.execute(
+            """
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                AND c.checkpoint_ns = writes.checkpoint_ns
+                AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        ).rowcount
+        conn.execute("COMMIT")
+        try:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.OperationalError as e:
+            # Busy readers only delay reclaiming the space to the next run
+            logger.warning(f"Could not vacuum the checkpoint file: {e}")
+    finally:
+        conn.close()
+    return dict(
+        checkpoints=max(0, checkpoints),
+        writes=max(0, writes),
+        threads=threads,
+        bytes_before=size_before,
+        bytes_after=os.path.getsize(path),
+    )
+
+
+async def _session_notebooks() -> Dict[str, str]:
+    rows = await repo_query(
+        "SELECT <string> in AS session, <string> out AS notebook FROM refers_to"
+    )
+    return {row["session"]: row["notebook"] for row in rows}
+
+
+async def compact_chat_checkpoints(keep: int = CHAT_CHECKPOINT_KEEP) -> Dict[str, int]:
+    """compact_checkpoints(), also dropping the threads of deleted chat sessions."""
+    sessions = await repo_query("SELECT VALUE <string> id FROM chat_session")
+    result = await run_in_thread(compact_checkpoints, keep, set(sessions))
+    logger.info(f"Compacted chat checkpoints: {result}")
+    return result
+
+
+async def get_checkpoint_storage() -> Dict[str, Any]:
+    """Checkpoint storage of the chat sessions of each notebook."""
+    threads = await run_in_thread(thread_storage)
+    session_notebooks = await _session_notebooks()
+    notebooks: Dict[str, Dict[str, int]] = {}
+    unassigned = dict(sessions=0, checkpoints=0, writes=0, bytes=0)
+    for thread_id, usage in threads.items():
+        notebook_id = session_notebooks.get(thread_id)
+        if notebook_id:
+            totals = notebooks.setdefault(
+                notebook_id, dict(sessions=0, checkpoints=0, writes=0, bytes=0)
+            )
+        else:
+            totals = unassigned
+        totals["sessions"] += 1
+        for key in ("checkpoints", "writes", "bytes"):
+            totals[key] += usage[key]
+    files = [LANGGRAPH_CHECKPOINT_FILE, f"{LANGGRAPH_CHECKPOINT_FILE}-wal"]
+    return dict(
+        file_bytes=sum(os.path.getsize(f) for f in files if os.path.exists(f)),
+        notebooks=[
+            dict(notebook_id=notebook_id, **totals)
+            for notebook_id, totals in sorted(
+                notebooks.items(), key=lambda item: -item[1]["bytes"]
+            )
+        ],
+        unassigned=unassigned,
+    )
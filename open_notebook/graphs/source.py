@@ -1,4 +1,5 @@
 import operator
+import os
 from typing import Any, Dict, List, Optional
 
 from content_core import extract_content
@@ -7,12 +8,15 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Send
 from loguru import logger
-from typing_extensions import Annotated, TypedDict
+from typing_extensions import Annotated, NotRequired, TypedDict
 
 from open_notebook.domain.content_settings import ContentSettings
+from open_notebook.domain.embeddings import text_hash
 from open_notebook.domain.notebook import Asset, Source
 from open_notebook.domain.transformation import Transformation
 from open_notebook.graphs.transformation import graph as transform_graph
+from open_notebook.progress import report_progress
+from open_notebook.utils import asource_fingerprint
 
 
 class SourceState(TypedDict):
@@ -22,6 +26,11 @@ class SourceState(TypedDict):
     source: Source
     transformation: Annotated[list, operator.add]
     embed: bool
+    # Ingest even if the same URL, file or content was ingested before
+    force: NotRequired[bool]
+    fingerprint: NotRequired[Optional[str]]
+    # Set when an existing source was reused instead of ingesting again
+    duplicate: NotRequired[bool]
 
 
 class TransformationState(TypedDict):
@@ -29,6 +38,38 @@ class TransformationState(TypedDict):
     transformation: Transformation
 
 
+async def _reuse_source(source_id: str, state: SourceState) -> dict:
+    source = await Source.get(source_id)
+    notebook_id = state.get("notebook_id")
+    if notebook_id and not await source.is_in_notebook(notebook_id):
+        await source.add_to_notebook(notebook_id)
+    logger.info(f"Reusing existing source {source.id} instead of ingesting again")
+    return {"source": source, "duplicate": True}
+
+
+async def check_duplicate(state: SourceState) -> dict:
+    """Skip extraction when the same URL or file was already ingested."""
+    content_state: Dict[str, Any] = state["content_state"]
+    fingerprint = await asource_fingerprint(
+        url=content_state.get("url"), file_path=content_state.get("file_path")
+    )
+    if fingerprint and not state.get("force"):
+        existing = await Source.find_existing(fingerprint=fingerprint)
+        if existing:
+            if content_state.get("delete_source") and content_state.get("file_path"):
+                # Extraction would have removed the upload
+                try:
+                    os.remove(content_state["file_path"])
+                except OSError as e:
+                    logger.warning(f"Could not delete uploaded file: {e}")
+            return await _reuse_source(existing, state)
+    return {"fingerprint": fingerprint}
+
+
+def route_after_check(state: SourceState) -> str:
+    return END if state.get("duplicate") else "content_process"
+
+
 async def content_process(state: SourceState) -> dict:
     content_settings = ContentSettings()
     content_state: Dict[str, Any] = state["content_state"]
@@ -41,6 +82,7 @@ async def content_process(state: SourceState) -> dict:
     )
     content_state["output_format"] = "markdown"
 
+    await report_progress("extracting")
     processed_state = await extract_content(content_state)
     return {"content_state": processed_state}
 
@@ -48,11 +90,22 @@ async def content_process(state: SourceState) -> dict:
 async def save_source(state: SourceState) -> dict:
     content_state = state["content_state"]
 
+    content_hash = (
+        text_hash(content_state.content).hex() if content_state.content else None
+    )
+    if content_hash and not state.get("force"):
+        existing = await Source.find_existing(content_hash=content_hash)
+        if existing:
+            return await _reuse_source(existing, state)
+
     source = Source(
         asset=Asset(url=content_state.url, file_path=content_state.file_path),
         full_text=content_state.content,
         title=content_state.title,
+        content_hash=content_hash,
+        fingerprint=state.get("fingerprint"),
     )
+    await report_progress("saving")
     await source.save()
 
     if state["notebook_id"]:
@@ -67,7 +120,7 @@ async def save_source(state: SourceState) -> dict:
 
 
 def trigger_transformations(state: SourceState, config: RunnableConfig) -> List[Send]:
-    if len(state["apply_transformations"]) == 0:
+    if len(state["apply_transformations"]) == 0 or state.get("duplicate"):
         return []
 
     to_apply = state["apply_transformations"]
@@ -87,12 +140,13 @@ def trigger_transformations(state: SourceState, config: RunnableConfig) -> List[
 
 async def transform_content(state: TransformationState) -> Optional[dict]:
     source = state["source"]
-    content = source.full_text
+    content = await source.load_full_text()
     if not content:
         return None
     transformation: Transformation = state["transformation"]
 
     logger.debug(f"Applying transformation {transformation.name}")
+    await report_progress("transforming", transformation=transformation.name)
     result = await transform_graph.ainvoke(
         dict(input_text=content, transformation=transformation)
     )
@@ -111,11 +165,15 @@ async def transform_content(state: TransformationState) -> Optional[dict]:
 workflow = StateGraph(SourceState)
 
 # Add nodes
+workflow.add_node("check_duplicate", check_duplicate)
 workflow.add_node("content_process", content_process)
 workflow.add_node("save_source", save_source)
 workflow.add_node("transform_content", transform_content)
 # Define the graph edges
-workflow.add_edge(START, "content_process")
+workflow.add_edge(START, "check_duplicate")
+workflow.add_conditional_edges(
+    "check_duplicate", route_after_check, ["content_process", END]
+)
 workflow.add_edge("content_process", "save_source")
 workflow.add_conditional_edges(
     "save_source", trigger_transformations, ["transform_content"]
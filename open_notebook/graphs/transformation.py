@@ -1,13 +1,62 @@
+import asyncio
+import operator
+from typing import Annotated, List, Optional, Tuple, Union
+
 from ai_prompter import Prompter
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+from loguru import logger
 from typing_extensions import TypedDict
 
+from open_notebook.config import env_int
+from open_notebook.domain.embeddings import text_hash
+from open_notebook.domain.models import model_manager
 from open_notebook.domain.notebook import Source
 from open_notebook.domain.transformation import DefaultPrompts, Transformation
-from open_notebook.graphs.utils import provision_langchain_model
-from open_notebook.utils import clean_thinking_content
+from open_notebook.domain.transformation_cache import cache_key, transformation_cache
+from open_notebook.executors import run_in_thread
+from open_notebook.graphs.utils import (
+    LARGE_CONTEXT_THRESHOLD,
+    provision_langchain_model,
+)
+from open_notebook.utils import asplit_text, atoken_count, clean_thinking_content
+
+# Sections of a long document are kept well below the context of the
+# transformation model, leaving room for the prompt and the output
+TRANSFORMATION_SECTION_TOKENS = env_int("TRANSFORMATION_SECTION_TOKENS", 24_000)
+# Above this size "auto" transformations switch from one call to map-reduce,
+# just below the point where the large context model would be needed
+TRANSFORMATION_SINGLE_CALL_MAX_TOKENS = env_int(
+    "TRANSFORMATION_SINGLE_CALL_MAX_TOKENS", 100_000
+)
+
+MAP_INSTRUCTIONS = """
+# DOCUMENT PART
+The input is part {index} of {total} of a longer document. Apply the
+instructions to this part only; the results of all parts will be combined.
+"""
+
+REDUCE_INSTRUCTIONS = """
+# COMBINING PARTIAL RESULTS
+The input contains the results of applying the instructions above to
+consecutive parts of one document, in order. Combine them into a single
+result for the whole document that follows the instructions, merging
+repeated points and keeping the requested format.
+"""
+
+REFINE_INSTRUCTIONS = """
+# REFINING AN EXISTING RESULT
+The instructions above were applied to the previous parts of a longer
+document, with this result:
+
+{result}
+
+The input is part {index} of {total} of the document. Update the result so
+it covers this part as well, keeping the requested format, and return the
+complete updated result.
+"""
 
 
 class TransformationState(TypedDict):
@@ -15,25 +64,50 @@ class TransformationState(TypedDict):
     source: Source
     transformation: Transformation
     output: str
+    sections: List[str]
+    partials: Annotated[List[Tuple[int, str]], operator.add]
+    bypass_cache: bool
+    cache_key: Optional[bytes]
+    cached: bool
 
 
-async def run_transformation(state: dict, config: RunnableConfig) -> dict:
-    source: Source = state.get("source")
-    content = state.get("input_text")
-    assert source or content, "No content to transform"
-    transformation: Transformation = state["transformation"]
-    if not content:
-        content = source.full_text
+class SectionState(TypedDict):
+    source: Optional[Source]
+    transformation: Transformation
+    section: str
+    index: int
+    total: int
+
+
+def _template(transformation: Transformation) -> str:
     transformation_template_text = transformation.prompt
     default_prompts: DefaultPrompts = DefaultPrompts()
     if default_prompts.transformation_instructions:
         transformation_template_text = f"{default_prompts.transformation_instructions}\n\n{transformation_template_text}"
+    return transformation_template_text
 
-    transformation_template_text = f"{transformation_template_text}\n\n# INPUT"
 
-    system_prompt = Prompter(template_text=transformation_template_text).render(
-        data=state
+def _render(state: dict, content: str) -> str:
+    transformation: Transformation = state["transformation"]
+    return Prompter(template_text=_template(transformation)).render(
+        data=dict(state, input_text=content)
     )
+
+
+async def _transform(
+    state: dict,
+    content: str,
+    config: RunnableConfig,
+    instructions: str = "",
+) -> str:
+    """
+    Apply the state's transformation to `content`. The prompt is rendered with
+    the graph state, so templates can use keys like `source`, and with
+    `content`, which may be one section of the document, as `input_text`.
+    """
+    system_prompt = _render(state, content)
+    # Appended after rendering: they may quote model output
+    system_prompt = f"{system_prompt}{instructions}\n\n# INPUT"
     payload = [SystemMessage(content=system_prompt)] + [HumanMessage(content=content)]
     chain = await provision_langchain_model(
         str(payload),
@@ -45,18 +119,208 @@ async def run_transformation(state: dict, config: RunnableConfig) -> dict:
     response = await chain.ainvoke(payload)
 
     # Clean thinking content from the response
-    cleaned_content = clean_thinking_content(response.content)
+    return clean_thinking_content(response.content)
 
+
+async def _finish(state: dict, output: str) -> dict:
+    source: Optional[Source] = state.get("source")
     if source:
-        await source.add_insight(transformation.title, cleaned_content)
+        await source.add_insight(state["transformation"].title, output)
+    key = state.get("cache_key")
+    if key is not None and not state.get("cached"):
+        try:
+            await run_in_thread(transformation_cache.put, key, output)
+        except Exception as e:
+            logger.warning(f"Transformation cache write failed: {e}")
+    return {"output": output}
+
+
+async def _cache_key(
+    state: dict,
+    content: str,
+    config: RunnableConfig,
+    large_context: bool,
+) -> bytes:
+    """
+    The key covers the prompt as rendered for this state, so templates that
+    use other state than the input, such as `source`, get their own entries.
+    """
+    transformation: Transformation = state["transformation"]
+    defaults = await model_manager.get_defaults()
+    model_id = (
+        config.get("configurable", {}).get("model_id")
+        or defaults.default_transformation_model
+        or defaults.default_chat_model
+        or ""
+    )
+    if large_context:
+        model_id = defaults.large_context_model or model_id
+    section_tokens = transformation.section_tokens or TRANSFORMATION_SECTION_TOKENS
+    return cache_key(
+        _render(state, content),
+        DefaultPrompts().transformation_instructions,
+        model_id,
+        text_hash(content).hex(),
+        variant=f"{transformation.execution_mode}:{section_tokens}",
+    )
+
 
-    return {
-        "output": cleaned_content,
-    }
+async def split_content(state: dict, config: RunnableConfig) -> dict:
+    """
+    Return the cached result if there is one, else split the content into
+    sections if the transformation's mode calls for it.
+    """
+    source: Source = state.get("source")
+    content = state.get("input_text")
+    assert source or content, "No content to transform"
+    transformation: Transformation = state["transformation"]
+    if not content:
+        content = await source.load_full_text()
+
+    mode = transformation.execution_mode
+    section_tokens = transformation.section_tokens or TRANSFORMATION_SECTION_TOKENS
+    limit = (
+        TRANSFORMATION_SINGLE_CALL_MAX_TOKENS if mode == "auto" else section_tokens
+    )
+    tokens = await atoken_count(content)
+    single = mode == "single" or tokens <= limit
+
+    key = None
+    if transformation_cache.enabled and not state.get("bypass_cache"):
+        key = await _cache_key(
+            state,
+            content,
+            config,
+            large_context=single and tokens > LARGE_CONTEXT_THRESHOLD,
+        )
+        try:
+            cached = await run_in_thread(transformation_cache.get, key)
+        except Exception as e:
+            logger.warning(f"Transformation cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            logger.debug(f"Using cached result of transformation {transformation.name}")
+            return {"input_text": content, "output": cached, "cached": True}
+
+    if single:
+        return {"input_text": content, "sections": [content], "cache_key": key}
+
+    sections = await asplit_text(content, chunk_size=section_tokens)
+    logger.debug(
+        f"Running transformation {transformation.name} on {len(sections)} sections"
+    )
+    return {"input_text": content, "sections": sections, "cache_key": key}
+
+
+def route_sections(state: dict) -> Union[str, List[Send]]:
+    if state.get("cached"):
+        return "use_cached"
+    sections = state["sections"]
+    if len(sections) == 1:
+        return "agent"
+    if state["transformation"].execution_mode == "refine":
+        return "refine"
+    return [
+        Send(
+            "map_section",
+            {
+                "source": state.get("source"),
+                "transformation": state["transformation"],
+                "section": section,
+                "index": index,
+                "total": len(sections),
+            },
+        )
+        for index, section in enumerate(sections)
+    ]
+
+
+async def use_cached(state: dict) -> dict:
+    return await _finish(state, state["output"])
+
+
+async def run_transformation(state: dict, config: RunnableConfig) -> dict:
+    output = await _transform(state, state["input_text"], config)
+    return await _finish(state, output)
+
+
+async def map_section(state: SectionState, config: RunnableConfig) -> dict:
+    instructions = MAP_INSTRUCTIONS.format(
+        index=state["index"] + 1, total=state["total"]
+    )
+    output = await _transform(state, state["section"], config, instructions)
+    return {"partials": [(state["index"], output)]}
+
+
+async def _combine(state: dict, partials: List[str], config: RunnableConfig) -> str:
+    content = "\n\n---\n\n".join(partials)
+    return await _transform(state, content, config, REDUCE_INSTRUCTIONS)
+
+
+async def reduce_sections(state: dict, config: RunnableConfig) -> dict:
+    """
+    Combine the partial results in document order. When they do not fit in
+    one section they are combined in groups first, level by level. Each group
+    takes at least two partials so every level shrinks the list, even when
+    single partials are larger than a section.
+    """
+    transformation: Transformation = state["transformation"]
+    section_tokens = transformation.section_tokens or TRANSFORMATION_SECTION_TOKENS
+    partials = [output for _, output in sorted(state["partials"])]
+
+    while True:
+        groups: List[List[str]] = [[]]
+        size = 0
+        for partial in partials:
+            tokens = await atoken_count(partial)
+            if len(groups[-1]) >= 2 and size + tokens > section_tokens:
+                groups.append([])
+                size = 0
+            groups[-1].append(partial)
+            size += tokens
+        if len(groups) == 1:
+            break
+        partials = await asyncio.gather(
+            *(_combine(state, group, config) for group in groups)
+        )
+
+    output = await _combine(state, partials, config)
+    return await _finish(state, output)
+
+
+async def refine_sections(state: dict, config: RunnableConfig) -> dict:
+    """Transform the first section, then refine the result with each next one."""
+    sections = state["sections"]
+    output = await _transform(
+        state,
+        sections[0],
+        config,
+        MAP_INSTRUCTIONS.format(index=1, total=len(sections)),
+    )
+    for index, section in enumerate(sections[1:], start=2):
+        instructions = REFINE_INSTRUCTIONS.format(
+            result=output, index=index, total=len(sections)
+        )
+        output = await _transform(state, section, config, instructions)
+    return await _finish(state, output)
 
 
 agent_state = StateGraph(TransformationState)
+agent_state.add_node("split_content", split_content)
+agent_state.add_node("use_cached", use_cached)
 agent_state.add_node("agent", run_transformation)
-agent_state.add_edge(START, "agent")
+agent_state.add_node("map_section", map_section)
+agent_state.add_node("reduce_sections", reduce_sections)
+agent_state.add_node("refine", refine_sections)
+agent_state.add_edge(START, "split_content")
+agent_state.add_conditional_edges(
+    "split_content",
+    route_sections,
+    ["use_cached", "agent", "map_section", "refine"],
+)
+agent_state.add_edge("map_section", "reduce_sections")
+agent_state.add_edge("use_cached", END)
 agent_state.add_edge("agent", END)
+agent_state.add_edge("reduce_sections", END)
+agent_state.add_edge("refine", END)
 graph = agent_state.compile()
@@ -1,23 +1,189 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
 from esperanto import LanguageModel
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from loguru import logger
 
 from open_notebook.domain.models import model_manager
-from open_notebook.utils import token_count
+from open_notebook.rate_limits import (
+    LLM_MAX_RETRIES,
+    ModelLimiter,
+    call_with_limits,
+    call_with_retries,
+    get_limiters,
+    is_rate_limit_error,
+    limited,
+    limited_blocking,
+    retry_delay,
+)
+from open_notebook.utils import atoken_count
+
+# Above this many tokens of input, calls go to the large context model
+LARGE_CONTEXT_THRESHOLD = 105_000
+
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Wraps a chat model so that every call waits for a slot of its provider's
+    and model's limiters and is retried on rate-limit errors, whether it is
+    made from an event loop or synchronously. Streams hold their slot until
+    they end and are retried only until the first chunk arrives.
+    """
+
+    llm: BaseChatModel
+    provider: str
+    model_name: str
+    estimated_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate_limited_{self.llm._llm_type}"
+
+    @property
+    def limiters(self) -> List[ModelLimiter]:
+        return get_limiters(self.provider, self.model_name)
+
+    def _streams(self) -> bool:
+        return type(self.llm)._astream is not BaseChatModel._astream
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return call_with_retries(
+            self.limiters,
+            self.estimated_tokens,
+            lambda: self.llm._generate(messages, stop=stop, **kwargs),
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await call_with_limits(
+            self.limiters,
+            self.estimated_tokens,
+            lambda: self.llm._agenerate(messages, stop=stop, **kwargs),
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if type(self.llm)._stream is BaseChatModel._stream:
+            result = self._generate(messages, stop=stop, **kwargs)
+            message = result.generations[0].message
+            yield ChatGenerationChunk(message=message)  # type: ignore
+            return
+
+        limiters = self.limiters
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            started = False
+            try:
+                with limited_blocking(limiters, self.estimated_tokens):
+                    for chunk in self.llm._stream(messages, stop=stop, **kwargs):
+                        started = True
+                        if run_manager:
+                            run_manager.on_llm_new_token(
+                                str(chunk.message.content), chunk=chunk
+                            )
+                        yield chunk
+                return
+            except Exception as e:
+                # Retrying is only safe before anything was streamed to the caller
+                retry = (
+                    not started
+                    and is_rate_limit_error(e)
+                    and attempt < LLM_MAX_RETRIES
+                )
+                for limiter in limiters:
+                    limiter.count(**{"rate_limited" if retry else "failed": 1})
+                if not retry:
+                    raise
+                delay = retry_delay(e, attempt)
+                logger.warning(
+                    f"Rate limited by {limiters[-1].key}, retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if not self._streams():
+            result = await self._agenerate(messages, stop=stop, **kwargs)
+            message = result.generations[0].message
+            yield ChatGenerationChunk(message=message)  # type: ignore
+            return
+
+        limiters = self.limiters
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            started = False
+            try:
+                async with limited(limiters, self.estimated_tokens):
+                    async for chunk in self.llm._astream(messages, stop=stop, **kwargs):
+                        started = True
+                        if run_manager:
+                            await run_manager.on_llm_new_token(
+                                str(chunk.message.content), chunk=chunk
+                            )
+                        yield chunk
+                return
+            except Exception as e:
+                retry = (
+                    not started
+                    and is_rate_limit_error(e)
+                    and attempt < LLM_MAX_RETRIES
+                )
+                for limiter in limiters:
+                    if retry:
+                        limiter.rate_limited += 1
+                    else:
+                        limiter.failed += 1
+                if not retry:
+                    raise
+                delay = retry_delay(e, attempt)
+                logger.warning(
+                    f"Rate limited by {limiters[-1].key}, retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
 
 
 async def provision_langchain_model(
-    content, model_id, default_type, **kwargs
+    content, model_id, default_type, tokens: Optional[int] = None, **kwargs
 ) -> BaseChatModel:
     """
     Returns the best model to use based on the context size and on whether there is a specific model being requested in Config.
     If context > 105_000, returns the large_context_model
     If model_id is specified in Config, returns that model
     Otherwise, returns the default model for the given type
+    The model is wrapped in the concurrency and rate limits of its provider.
+    Callers that already know the size of `content` pass it as `tokens`.
     """
-    tokens = token_count(content)
+    if tokens is None:
+        tokens = await atoken_count(content)
 
-    if tokens > 105_000:
+    if tokens > LARGE_CONTEXT_THRESHOLD:
         logger.debug(
             f"Using large context model because the content has {tokens} tokens"
         )
@@ -29,4 +195,9 @@ async def provision_langchain_model(
 
     logger.debug(f"Using model: {model}")
     assert isinstance(model, LanguageModel), f"Model is not a LanguageModel: {model}"
-    return model.to_langchain()
+    return RateLimitedChatModel(
+        llm=model.to_langchain(),
+        provider=getattr(model, "provider", None) or type(model).__name__,
+        model_name=getattr(model, "model_name", None) or "default",
+        estimated_tokens=tokens,
+    )
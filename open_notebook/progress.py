@@ -0,0 +1,91 @@
+"""
+Progress reporting for long-running work such as source ingestion.
+
+Code deep in a pipeline (the source graph, vectorize, embed_in_batches) calls
+report_progress() without knowing who is listening. Whoever runs the work,
+e.g. a background command, installs a reporter with progress_reporter() for
+the duration; without one, reports are dropped.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from loguru import logger
+
+from open_notebook.database.repository import ensure_record_id, repo_query
+
+ProgressReporter = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_reporter: ContextVar[Optional[ProgressReporter]] = ContextVar(
+    "progress_reporter", default=None
+)
+
+
+@contextmanager
+def progress_reporter(reporter: Optional[ProgressReporter]) -> Iterator[None]:
+    """
+    Send report_progress() calls made in this context to `reporter`; with
+    None they are dropped, even if an outer context installed a reporter.
+    """
+    token = _reporter.set(reporter)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
+
+
+async def report_progress(
+    stage: str,
+    current: Optional[int] = None,
+    total: Optional[int] = None,
+    **details: Any,
+) -> None:
+    reporter = _reporter.get()
+    if reporter is None:
+        return
+    try:
+        await reporter(dict(stage=stage, current=current, total=total, **details))
+    except Exception as e:
+        logger.warning(f"Failed to report progress: {e}")
+
+
+class CommandProgress:
+    """
+    Reporter that stores progress on a surreal-commands command record, where
+    /api/commands/jobs/{id} reads it. Writes within a stage are throttled to
+    one per `min_interval` seconds; a new stage and the last step of a stage
+    are always written.
+    """
+
+    def __init__(self, command_id: str, min_interval: float = 1.0) -> None:
+        self.command_id = command_id
+        self.min_interval = min_interval
+        self.started = time.time()
+        self._stage: Optional[str] = None
+        self._written_at = 0.0
+
+    async def __call__(self, progress: Dict[str, Any]) -> None:
+        now = time.time()
+        if (
+            progress["stage"] == self._stage
+            and progress["current"] != progress["total"]
+            and now - self._written_at < self.min_interval
+        ):
+            return
+        self._stage = progress["stage"]
+        self._written_at = now
+        progress = dict(progress, elapsed=round(now - self.started, 2))
+        await repo_query(
+            "UPDATE $command SET progress = $progress RETURN NONE",
+            {"command": ensure_record_id(self.command_id), "progress": progress},
+        )
+
+
+async def get_command_progress(command_id: str) -> Optional[Dict[str, Any]]:
+    result = await repo_query(
+        "SELECT VALUE progress FROM $command",
+        {"command": ensure_record_id(command_id)},
+    )
+    return result[0] if result else None
@@ -0,0 +1,361 @@
+"""
+Concurrency and rate limits for language model calls.
+
+Every call made through a model from provision_langchain_model() takes a slot
+from the limiter of its provider and, if one is configured, of its model:
+
+- a concurrency limit (a semaphore per event loop, and one shared by the
+  threads that call the model synchronously),
+- optional token buckets for requests and prompt tokens per minute, shared by
+  every event loop of the process.
+
+Calls rejected by the provider with a rate-limit error are retried with
+jittered exponential backoff, honouring Retry-After when the error carries it.
+Limits are configured with LLM_CONCURRENCY (per provider) and LLM_RATE_LIMITS,
+a JSON object keyed by provider or "provider/model", e.g.
+{"openai": {"concurrency": 8, "requests_per_minute": 500,
+"tokens_per_minute": 200000}, "openai/gpt-4o": {"concurrency": 2}}.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from loguru import logger
+
+from open_notebook.config import env_float, env_int
+
+T = TypeVar("T")
+
+LLM_CONCURRENCY = env_int("LLM_CONCURRENCY", 8)
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 4)
+LLM_RETRY_BASE_DELAY = env_float("LLM_RETRY_BASE_DELAY", 1.0)
+LLM_RETRY_MAX_DELAY = env_float("LLM_RETRY_MAX_DELAY", 60.0)
+
+
+def _load_limits() -> Dict[str, Dict[str, Any]]:
+    raw = os.getenv("LLM_RATE_LIMITS")
+    if not raw:
+        return {}
+    try:
+        limits = json.loads(raw)
+        if not isinstance(limits, dict):
+            raise ValueError("expected an object")
+        return limits
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid LLM_RATE_LIMITS: {e}")
+        return {}
+
+
+LLM_RATE_LIMITS = _load_limits()
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units a minute up to one minute's worth. reserve()
+    takes units at once and returns how long the caller must wait for them,
+    so waiters are served in order and the bucket works across event loops.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class ModelLimiter:
+    """Limits and metrics for one provider or one provider/model."""
+
+    def __init__(
+        self,
+        key: str,
+        concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.key = key
+        self.concurrency = concurrency
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._thread_semaphore = (
+            threading.BoundedSemaphore(concurrency) if concurrency else None
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def _semaphore(self) -> Optional[asyncio.Semaphore]:
+        if not self.concurrency:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return self._semaphores[loop]
+
+    def _reserve(self, tokens: int) -> float:
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    async def acquire(self, tokens: int) -> Optional[asyncio.Semaphore]:
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        semaphore = self._semaphore()
+        if semaphore:
+            await semaphore.acquire()
+        return semaphore
+
+    def acquire_blocking(self, tokens: int) -> Optional[threading.BoundedSemaphore]:
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        if self._thread_semaphore:
+            self._thread_semaphore.acquire()
+        return self._thread_semaphore
+
+    def record_wait(self, wait: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def count(self, **changes: int) -> None:
+        """Update counters from threads, where `+=` could lose updates."""
+        with self._lock:
+            for name, change in changes.items():
+                setattr(self, name, getattr(self, name) + change)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                concurrency=self.concurrency,
+                calls=self.calls,
+                queued=self.queued,
+                in_flight=self.in_flight,
+                avg_queue_ms=round(self.total_wait / self.calls * 1000, 2)
+                if self.calls
+                else 0.0,
+                max_queue_ms=round(self.max_wait * 1000, 2),
+                rate_limited=self.rate_limited,
+                failed=self.failed,
+            )
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _get_limiter(key: str, default_concurrency: Optional[int]) -> ModelLimiter:
+    with _limiters_lock:
+        if key not in _limiters:
+            config = LLM_RATE_LIMITS.get(key, {})
+            _limiters[key] = ModelLimiter(
+                key,
+                concurrency=config.get("concurrency", default_concurrency),
+                requests_per_minute=config.get("requests_per_minute"),
+                tokens_per_minute=config.get("tokens_per_minute"),
+            )
+        return _limiters[key]
+
+
+def get_limiters(provider: str, model_name: str) -> List[ModelLimiter]:
+    """The provider's limiter, then the model's if it has its own limits."""
+    limiters = [_get_limiter(provider, LLM_CONCURRENCY or None)]
+    model_key = f"{provider}/{model_name}"
+    if model_key in LLM_RATE_LIMITS:
+        limiters.append(_get_limiter(model_key, None))
+    return limiters
+
+
+@asynccontextmanager
+async def limited(
+    limiters: List[ModelLimiter], tokens: int = 0
+) -> AsyncIterator[None]:
+    """Hold a slot of every limiter for the duration of one model call."""
+    start = time.monotonic()
+    held = []
+    for limiter in limiters:
+        limiter.queued += 1
+    try:
+        for limiter in limiters:
+            held.append(await limiter.acquire(tokens))
+    except BaseException:
+        for limiter, semaphore in zip(limiters, held):
+            if semaphore:
+                semaphore.release()
+        raise
+    finally:
+        for limiter in limiters:
+            limiter.queued -= 1
+    wait = time.monotonic() - start
+    for limiter in limiters:
+        limiter.record_wait(wait)
+        limiter.in_flight += 1
+    if wait > 1:
+        logger.debug(f"Waited {wait:.1f}s for a {limiters[-1].key} slot")
+    try:
+        yield
+    finally:
+        for limiter, semaphore in zip(limiters, held):
+            limiter.in_flight -= 1
+            if semaphore:
+                semaphore.release()
+
+
+@contextmanager
+def limited_blocking(limiters: List[ModelLimiter], tokens: int = 0) -> Iterator[None]:
+    """Blocking variant of limited() for synchronous calls, made from threads."""
+    start = time.monotonic()
+    held = []
+    for limiter in limiters:
+        limiter.count(queued=1)
+    try:
+        for limiter in limiters:
+            held.append(limiter.acquire_blocking(tokens))
+    except BaseException:
+        for semaphore in held:
+            if semaphore:
+                semaphore.release()
+        raise
+    finally:
+        for limiter in limiters:
+            limiter.count(queued=-1)
+    wait = time.monotonic() - start
+    for limiter in limiters:
+        limiter.record_wait(wait)
+        limiter.count(in_flight=1)
+    if wait > 1:
+        logger.debug(f"Waited {wait:.1f}s for a {limiters[-1].key} slot")
+    try:
+        yield
+    finally:
+        for limiter, semaphore in zip(limiters, held):
+            limiter.count(in_flight=-1)
+            if semaphore:
+                semaphore.release()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Whether the provider rejected the call with HTTP 429. Checked on the status
+    code of the error or its response, and on the provider SDK error types
+    (openai.RateLimitError, anthropic.RateLimitError, TooManyRequests, ...),
+    never on the message, which may quote arbitrary text.
+    """
+    status = getattr(error, "status_code", None) or getattr(
+        getattr(error, "response", None), "status_code", None
+    )
+    if status == 429:
+        return True
+    return any(
+        "ratelimit" in cls.__name__.lower() or cls.__name__ == "TooManyRequests"
+        for cls in type(error).__mro__
+    )
+
+
+def retry_delay(error: BaseException, attempt: int) -> float:
+    """Retry-After if the provider sent one, else jittered exponential backoff."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+        return min(retry_after, LLM_RETRY_MAX_DELAY)
+    except (TypeError, ValueError):
+        pass
+    delay = min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2**attempt)
+    return delay * random.uniform(0.5, 1.5)
+
+
+async def call_with_limits(
+    limiters: List[ModelLimiter], tokens: int, call: Callable[[], Awaitable[T]]
+) -> T:
+    """Run `call` within the limits, retrying it on rate-limit errors."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with limited(limiters, tokens):
+                return await call()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == LLM_MAX_RETRIES:
+                for limiter in limiters:
+                    limiter.failed += 1
+                raise
+            for limiter in limiters:
+                limiter.rate_limited += 1
+            delay = retry_delay(e, attempt)
+            logger.warning(
+                f"Rate limited by {limiters[-1].key}, retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{LLM_MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def call_with_retries(
+    limiters: List[ModelLimiter], tokens: int, call: Callable[[], T]
+) -> T:
+    """Blocking variant of call_with_limits() for synchronous callers."""
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            with limited_blocking(limiters, tokens):
+                return call()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == LLM_MAX_RETRIES:
+                for limiter in limiters:
+                    limiter.count(failed=1)
+                raise
+            for limiter in limiters:
+                limiter.count(rate_limited=1)
+            delay = retry_delay(e, attempt)
+            logger.warning(
+                f"Rate limited by {limiters[-1].key}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def rate_limit_stats() -> Dict[str, Any]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.key: limiter.snapshot() for limiter in limiters}
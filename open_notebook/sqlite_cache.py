@@ -0,0 +1,162 @@
+"""
+Least recently used cache in a local SQLite file, shared by every process.
+
+Each cache is one table of (key, value, created, last_used) rows in WAL mode.
+The table is capped at `max_entries` rows and the least recently used ones
+are evicted; with a `ttl`, entries older than that many seconds are dropped
+as well. Subclasses choose the table and how their keys and values are
+encoded, see EmbeddingCache and TransformationCache.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+# Evict down to this share of the cap so eviction does not run on every write
+EVICT_TO_RATIO = 0.9
+SQLITE_MAX_VARIABLES = 900
+COLUMNS = ["key", "value", "created", "last_used"]
+
+
+class SQLiteLRUCache:
+    """Values by bytes key in SQLite, with LRU eviction and optional expiry."""
+
+    table = ""
+
+    def __init__(self, path: str, max_entries: int, ttl: float = 0) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def encode(self, value: Any) -> Any:
+        """The value as stored in SQLite."""
+        return value
+
+    def decode(self, stored: Any) -> Any:
+        return stored
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = [
+                row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")
+            ]
+            if columns and columns != COLUMNS:
+                # Written by an older version; the cache can simply start over
+                logger.info(f"Recreating {self.table} with the current layout")
+                conn.execute(f"DROP TABLE {self.table}")
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key BLOB PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used "
+                f"ON {self.table} (last_used)"
+            )
+            self._entries = conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, keys: Sequence[bytes]) -> Dict[bytes, Any]:
+        """The cached values of `keys`; missing and expired keys are left out."""
+        found: Dict[bytes, Any] = {}
+        expired: List[bytes] = []
+        unique = list(dict.fromkeys(keys))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), SQLITE_MAX_VARIABLES):
+                chunk = unique[start : start + SQLITE_MAX_VARIABLES]
+                rows = conn.execute(
+                    f"SELECT key, value, created FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, value, created in rows:
+                    if self.ttl > 0 and now - created > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = self.decode(value)
+            if expired:
+                conn.executemany(
+                    f"DELETE FROM {self.table} WHERE key = ?",
+                    [(key,) for key in expired],
+                )
+                self._entries -= len(expired)
+            if found:
+                conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            if expired or found:
+                conn.commit()
+        return found
+
+    def store(self, entries: Dict[bytes, Any]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                [(key, self.encode(value), now, now) for key, value in entries.items()],
+            )
+            self._entries += max(0, cursor.rowcount)
+            if self._entries > self.max_entries:
+                self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl > 0:
+            conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+        # Other processes write to the same file, so recount before evicting
+        self._entries = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        excess = self._entries - int(self.max_entries * EVICT_TO_RATIO)
+        if excess <= 0:
+            return
+        conn.execute(
+            f"""
+            DELETE FROM {self.table} WHERE key IN (
+                SELECT key FROM {self.table} ORDER BY last_used LIMIT ?
+            )
+            """,
+            (excess,),
+        )
+        self._entries -= excess
+        logger.debug(f"Evicted {excess} entries from {self.table}")
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return dict(
+            enabled=self.enabled,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0,
+            entries=self._entries,
+            max_entries=self.max_entries,
+        )
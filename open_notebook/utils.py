@@ -1,14 +1,36 @@
+import hashlib
 import re
 import unicodedata
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
 from importlib.metadata import PackageNotFoundError, version
-from typing import Tuple
-from urllib.parse import urlparse
+from itertools import accumulate
+from typing import Deque, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlparse, urlsplit, urlunsplit
 
 import requests
 import tomli
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from packaging.version import parse as parse_version
 
+from open_notebook.executors import run_cpu_bound, run_in_thread
+
+TOKEN_ENCODING = "o200k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = TOKEN_ENCODING):
+    """
+    Return the tiktoken encoding `name`, loading it only once per process.
+
+    tiktoken keeps its own registry, but get_encoding() still takes a lock and
+    a dictionary lookup on every call; hot paths like the text splitter call
+    this through the cache instead.
+    """
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
 
 def token_count(input_string) -> int:
     """
@@ -20,12 +42,7 @@ def token_count(input_string) -> int:
     Returns:
         int: The number of tokens in the input string.
     """
-    import tiktoken
-
-    encoding = tiktoken.get_encoding("o200k_base")
-    tokens = encoding.encode(input_string)
-    token_count = len(tokens)
-    return token_count
+    return len(get_encoding().encode(input_string, disallowed_special=()))
 
 
 def token_cost(token_count, cost_per_million=0.150) -> float:
@@ -42,39 +59,176 @@ def token_cost(token_count, cost_per_million=0.150) -> float:
     return cost_per_million * (token_count / 1_000_000)
 
 
+SPLIT_SEPARATORS = [
+    "\n\n",
+    "\n",
+    ".",
+    ",",
+    " ",
+    "\u200b",  # Zero-width space
+    "\uff0c",  # Fullwidth comma
+    "\u3001",  # Ideographic comma
+    "\uff0e",  # Fullwidth full stop
+    "\u3002",  # Ideographic full stop
+    "",
+]
+
+
+class TokenTextSplitter:
+    """
+    Recursive text splitter that measures chunks in tokens.
+
+    It follows the algorithm of langchain's RecursiveCharacterTextSplitter
+    (same separator hierarchy, separators kept at the start of the next
+    piece, same merge and overlap rules) but tokenizes the document only
+    once. Every piece is a (start, end) character span into the original
+    text and its length is looked up from the token start offsets, so no
+    substring is ever re-encoded. The last separator, "", cuts on token
+    boundaries instead of single characters.
+
+    A token that straddles a cut is counted on the side where it starts,
+    so chunk sizes can differ by a token or two from encoding each chunk
+    separately.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 500,
+        chunk_overlap: int = 0,
+        separators: Optional[List[str]] = None,
+        encoding_name: str = TOKEN_ENCODING,
+    ) -> None:
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators if separators is not None else SPLIT_SEPARATORS
+        self.encoding_name = encoding_name
+
+    def token_offsets(self, text: str) -> List[int]:
+        """Character offset at which each token of `text` starts."""
+        encoding = get_encoding(self.encoding_name)
+        tokens = encoding.encode_ordinary(text)
+        if text.isascii():
+            # One byte per character: offsets are running sums of byte lengths
+            offsets = [0]
+            offsets.extend(
+                accumulate(len(b) for b in encoding.decode_tokens_bytes(tokens))
+            )
+            offsets.pop()
+            return offsets
+        return encoding.decode_with_offsets(tokens)[1]
+
+    def split_text(self, text: str) -> List[str]:
+        if not text:
+            return []
+        starts = self.token_offsets(text)
+        spans = self._split(text, starts, 0, len(text), self.separators)
+        chunks = []
+        for start, end in spans:
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    @staticmethod
+    def _length(starts: List[int], start: int, end: int) -> int:
+        return bisect_left(starts, end) - bisect_left(starts, start)
+
+    @staticmethod
+    def _pieces(
+        text: str, starts: List[int], start: int, end: int, separator: str
+    ) -> List[Tuple[int, int]]:
+        """Split a span on `separator`, keeping it at the start of each piece."""
+        if separator == "":
+            first = bisect_left(starts, start)
+            last = bisect_left(starts, end)
+            cuts = [start] + [offset for offset in starts[first:last] if offset > start]
+        else:
+            cuts = [start]
+            position = text.find(separator, start, end)
+            while position != -1:
+                if position > cuts[-1]:
+                    cuts.append(position)
+                position = text.find(separator, position + len(separator), end)
+        cuts.append(end)
+        return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+    def _split(
+        self,
+        text: str,
+        starts: List[int],
+        start: int,
+        end: int,
+        separators: List[str],
+    ) -> List[Tuple[int, int]]:
+        separator = separators[-1]
+        remaining: List[str] = []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                remaining = separators[i + 1 :]
+                break
+
+        chunks: List[Tuple[int, int]] = []
+        good: List[Tuple[int, int, int]] = []
+        for a, b in self._pieces(text, starts, start, end, separator):
+            length = self._length(starts, a, b)
+            if length < self.chunk_size:
+                good.append((a, b, length))
+                continue
+            if good:
+                chunks.extend(self._merge(good))
+                good = []
+            if remaining:
+                chunks.extend(self._split(text, starts, a, b, remaining))
+            else:
+                chunks.append((a, b))
+        if good:
+            chunks.extend(self._merge(good))
+        return chunks
+
+    def _merge(self, pieces: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+        """Join adjacent pieces into chunks of at most chunk_size tokens with overlap."""
+        chunks: List[Tuple[int, int]] = []
+        current: Deque[Tuple[int, int, int]] = deque()
+        total = 0
+        for piece in pieces:
+            length = piece[2]
+            if total + length > self.chunk_size and current:
+                chunks.append((current[0][0], current[-1][1]))
+                while total > self.chunk_overlap or (
+                    total + length > self.chunk_size and total > 0
+                ):
+                    total -= current.popleft()[2]
+            current.append(piece)
+            total += length
+        if current:
+            chunks.append((current[0][0], current[-1][1]))
+        return chunks
+
+
 def split_text(txt: str, chunk_size=500):
     """
-    Split the input text into chunks.
+    Split the input text into chunks of about `chunk_size` tokens.
 
     Args:
         txt (str): The input text to be split.
-        chunk (int): The size of each chunk. Default is 1000.
-        overlap (int): The number of characters to overlap between chunks. Default is 0.
-        separator (str): The separator to use when splitting the text. Default is " ".
+        chunk_size (int): The maximum number of tokens per chunk. Default is 500.
+            Consecutive chunks overlap by 15% of this size.
 
     Returns:
         list: A list of text chunks.
     """
     overlap = int(chunk_size * 0.15)
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        length_function=token_count,
-        separators=[
-            "\n\n",
-            "\n",
-            ".",
-            ",",
-            " ",
-            "\u200b",  # Zero-width space
-            "\uff0c",  # Fullwidth comma
-            "\u3001",  # Ideographic comma
-            "\uff0e",  # Fullwidth full stop
-            "\u3002",  # Ideographic full stop
-            "",
-        ],
+    return TokenTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap).split_text(
+        txt
     )
-    return text_splitter.split_text(txt)
 
 
 def remove_non_ascii(text) -> str:
@@ -100,6 +254,82 @@ def remove_non_printable(text) -> str:
     return re.sub(r"[^\w\s.,!?\-\n\t]", "", text, flags=re.UNICODE)
 
 
+# Below this size the round trip to an executor costs more than the work
+OFFLOAD_MIN_CHARS = 20_000
+
+
+async def atoken_count(input_string) -> int:
+    """token_count() that runs large inputs on the thread pool; tiktoken
+    releases the GIL while encoding."""
+    if len(input_string) < OFFLOAD_MIN_CHARS:
+        return token_count(input_string)
+    return await run_in_thread(token_count, input_string)
+
+
+async def asplit_text(txt: str, chunk_size=500):
+    """split_text() that runs large inputs on the process pool."""
+    if len(txt) < OFFLOAD_MIN_CHARS:
+        return split_text(txt, chunk_size=chunk_size)
+    return await run_cpu_bound(split_text, txt, chunk_size=chunk_size)
+
+
+# Query parameters that only track where a visitor came from; utm_* and mc_*
+# parameters are matched by prefix
+TRACKING_PARAMS = frozenset({"fbclid", "gclid"})
+TRACKING_PARAM_PREFIXES = ("utm_", "mc_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for duplicate detection: lowercase scheme and host
+    without www. or default port, no fragment or tracking parameters, and
+    sorted query parameters. The path is kept as given.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").removeprefix("www.")
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host += f":{parts.port}"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_PARAMS
+            and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+        )
+    )
+    return urlunsplit((scheme, host, parts.path, query, ""))
+
+
+def source_fingerprint(
+    url: Optional[str] = None, file_path: Optional[str] = None
+) -> Optional[str]:
+    """
+    Identity of a source's origin: the sha256 of its normalized URL, or of the
+    bytes of its file. None for text sources or files that cannot be read.
+    """
+    if url:
+        return "url:" + hashlib.sha256(normalize_url(url).encode()).hexdigest()
+    if file_path:
+        digest = hashlib.sha256()
+        try:
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        except OSError:
+            return None
+        return "file:" + digest.hexdigest()
+    return None
+
+
+async def asource_fingerprint(
+    url: Optional[str] = None, file_path: Optional[str] = None
+) -> Optional[str]:
+    """source_fingerprint() that hashes files on the thread pool."""
+    if not file_path:
+        return source_fingerprint(url=url)
+    return await run_in_thread(source_fingerprint, url, file_path)
 
 
 def get_version_from_github(repo_url: str, branch: str = "main") -> str:
@@ -269,3 +499,52 @@ def clean_thinking_content(content: str) -> str:
     """
     _, cleaned_content = parse_thinking_content(content)
     return cleaned_content
+
+
+class ThinkingStreamFilter:
+    """
+    Streaming counterpart of clean_thinking_content(): feed() takes the text
+    of each streamed chunk and returns what is outside <think> blocks, holding
+    back the end of a chunk that may be the start of a tag split across
+    chunks.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._thinking = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        visible = []
+        while True:
+            tag = self.CLOSE_TAG if self._thinking else self.OPEN_TAG
+            index = self._buffer.find(tag)
+            if index < 0:
+                break
+            if not self._thinking:
+                visible.append(self._buffer[:index])
+            self._buffer = self._buffer[index + len(tag) :]
+            self._thinking = not self._thinking
+        # Hold back a partial tag at the end of the buffer
+        held = 0
+        for size in range(min(len(tag) - 1, len(self._buffer)), 0, -1):
+            if tag.startswith(self._buffer[-size:]):
+                held = size
+                break
+        if not self._thinking:
+            visible.append(self._buffer[: len(self._buffer) - held])
+        self._buffer = self._buffer[len(self._buffer) - held :]
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """
+        The text held back at the end of the stream. A think block that was
+        never closed stays hidden. The filter can then take a new stream.
+        """
+        rest = "" if self._thinking else self._buffer
+        self._buffer = ""
+        self._thinking = False
+        return rest
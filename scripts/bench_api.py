@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Measure request latency of an Open Notebook API endpoint.
+
+Usage:
+    python3 scripts/bench_api.py --path /api/sources -n 200 --concurrency 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+
+async def run(base_url: str, path: str, n: int, concurrency: int, password: str | None):
+    headers = {"Authorization": f"Bearer {password}"} if password else {}
+    latencies: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=120) as client:
+        # Warm up caches, model clients and the connection pool
+        await client.get(path)
+
+        async def one():
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                resp = await client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if resp.status_code >= 400:
+                    errors += 1
+
+        wall = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(n)))
+        wall = time.perf_counter() - wall
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]  # noqa: E731
+    print(f"GET {path}  n={n} concurrency={concurrency} errors={errors}")
+    print(f"  mean {statistics.mean(latencies):8.1f} ms")
+    print(f"  p50  {p(0.50):8.1f} ms")
+    print(f"  p95  {p(0.95):8.1f} ms")
+    print(f"  p99  {p(0.99):8.1f} ms")
+    print(f"  throughput {n / wall:.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default=os.getenv("API_URL", "http://127.0.0.1:5055"))
+    parser.add_argument("--path", default="/api/sources")
+    parser.add_argument("-n", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(
+        run(
+            args.base_url,
+            args.path,
+            args.n,
+            args.concurrency,
+            os.getenv("OPEN_NOTEBOOK_PASSWORD"),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
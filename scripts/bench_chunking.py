@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measure chunking throughput of split_text against the previous splitter.
+
+The previous implementation ran langchain's RecursiveCharacterTextSplitter
+with a length function that loaded the tiktoken encoding and re-encoded every
+candidate substring. Pass a large markdown file, e.g. one extracted from a PDF.
+
+Usage:
+    python3 scripts/bench_chunking.py document.md --chunk-size 500 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from open_notebook.utils import SPLIT_SEPARATORS, split_text
+
+
+def legacy_split_text(txt: str, chunk_size: int = 500) -> list[str]:
+    import tiktoken
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    def token_count(input_string) -> int:
+        encoding = tiktoken.get_encoding("o200k_base")
+        return len(encoding.encode(input_string))
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=int(chunk_size * 0.15),
+        length_function=token_count,
+        separators=SPLIT_SEPARATORS,
+    )
+    return splitter.split_text(txt)
+
+
+def measure(name: str, fn, text: str, chunk_size: int, repeat: int) -> list[str]:
+    megabytes = len(text.encode("utf-8")) / 1_000_000
+    best = float("inf")
+    chunks: list[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn(text, chunk_size=chunk_size)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"{name:<8} {best * 1000:9.1f} ms  {megabytes / best:7.2f} MB/s  "
+        f"{len(chunks)} chunks"
+    )
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="Text or markdown file to chunk")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--skip-legacy", action="store_true", help="Only time the current splitter"
+    )
+    args = parser.parse_args()
+
+    with open(args.path, "r", encoding="utf-8") as f:
+        text = f.read()
+    print(f"{args.path}: {len(text.encode('utf-8')) / 1_000_000:.2f} MB")
+
+    # Load the encoding up front so neither run pays for the download
+    split_text("warm up", chunk_size=args.chunk_size)
+
+    if not args.skip_legacy:
+        measure("before", legacy_split_text, text, args.chunk_size, args.repeat)
+    measure("after", split_text, text, args.chunk_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
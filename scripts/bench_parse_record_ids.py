@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Microbenchmark parse_record_ids on typical query result shapes.
+
+Compares the current implementation with the previous one, which rebuilt
+every dict and list of the result.
+
+Usage:
+    python3 scripts/bench_parse_record_ids.py --dimension 1536 --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+from surrealdb import RecordID  # type: ignore
+
+from open_notebook.database.repository import parse_record_ids
+
+
+def legacy_parse_record_ids(obj):
+    if isinstance(obj, dict):
+        return {k: legacy_parse_record_ids(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_parse_record_ids(item) for item in obj]
+    elif isinstance(obj, RecordID):
+        return str(obj)
+    return obj
+
+
+def shapes(dimension: int) -> dict[str, object]:
+    now = datetime.now(timezone.utc)
+
+    def vector():
+        return [random.random() for _ in range(dimension)]
+
+    return {
+        # GET /api/sources (projected, no full_text)
+        "source list x500": [
+            {
+                "id": RecordID("source", f"s{i}"),
+                "title": f"Source {i}",
+                "topics": ["ai", "search"],
+                "asset": {"url": f"https://example.com/{i}", "file_path": None},
+                "created": now,
+                "updated": now,
+            }
+            for i in range(500)
+        ],
+        # Notes loaded with their embeddings (SELECT * on note)
+        "notes with embeddings x100": [
+            {
+                "id": RecordID("note", f"n{i}"),
+                "title": f"Note {i}",
+                "content": "lorem ipsum " * 50,
+                "note_type": "human",
+                "embedding": vector(),
+                "created": now,
+                "updated": now,
+            }
+            for i in range(100)
+        ],
+        # fn::vector_search results
+        "vector search x50": [
+            {
+                "id": RecordID("source", f"s{i}"),
+                "parent_id": RecordID("source", f"s{i}"),
+                "title": f"Source {i}",
+                "similarity": random.random(),
+                "matches": ["chunk text " * 40] * 3,
+            }
+            for i in range(50)
+        ],
+        # Bulk chunk rows with vectors
+        "chunks with embeddings x500": [
+            {
+                "id": RecordID("source_embedding", f"c{i}"),
+                "source": RecordID("source", "s1"),
+                "order": i,
+                "content": "chunk text " * 40,
+                "embedding": vector(),
+            }
+            for i in range(500)
+        ],
+    }
+
+
+def timed(fn, data, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'shape':<30} {'before':>10} {'after':>10} {'speedup':>8}")
+    for name, data in shapes(args.dimension).items():
+        assert parse_record_ids(data) == legacy_parse_record_ids(data)
+        before = timed(legacy_parse_record_ids, data, args.repeat)
+        after = timed(parse_record_ids, data, args.repeat)
+        print(f"{name:<30} {before:8.2f}ms {after:8.2f}ms {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Ingest a directory, a JSON manifest or a JSONL/text list of URLs into a notebook.
+
+Runs the ingestion pipeline in this process against the database configured
+in .env, so it needs the same settings as the API. Item status is stored in
+the database: after a crash, pass the printed run id to --resume and only the
+unfinished items are processed.
+
+Usage:
+    python3 scripts/bulk_ingest.py downloaded --notebook notebook:abc --no-embed
+    python3 scripts/bulk_ingest.py urls.jsonl --notebook notebook:abc \\
+        --transformation transformation:xyz --extract 8 --embed-concurrency 2
+    python3 scripts/bulk_ingest.py --resume ingestion_run:xyz
+    python3 scripts/bulk_ingest.py --status ingestion_run:xyz
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from open_notebook.database.repository import close_db_pool, init_db_pool
+from open_notebook.domain.ingestion import (
+    create_run,
+    discover_items,
+    get_run_status,
+    run_ingestion,
+)
+from open_notebook.progress import progress_reporter
+
+
+async def print_progress(progress: dict) -> None:
+    print(
+        f"\r{progress['stage']}: {progress['current']}/{progress['total']}",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+async def show_status(run_id: str) -> None:
+    result = await get_run_status(run_id, status="failed")
+    run = result["run"]
+    print(f"{run.id}: {run.status}, {run.total} items, {result['counts']}")
+    for item in result["items"]:
+        print(f"  failed {item['key']}: {item.get('error')}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    await init_db_pool()
+    try:
+        if args.status:
+            await show_status(args.status)
+            return
+
+        run_id = args.resume
+        if not run_id:
+            items = discover_items(args.path)
+            run = await create_run(
+                items,
+                notebook_id=args.notebook,
+                transformations=args.transformation,
+                embed=args.embed,
+                force=args.force,
+                origin=args.path,
+            )
+            run_id = run.id
+            print(f"Created {run_id} with {run.total} items", file=sys.stderr)
+
+        concurrency = {
+            stage: value
+            for stage, value in (
+                ("extract", args.extract),
+                ("embed", args.embed_concurrency),
+                ("transform", args.transform),
+            )
+            if value
+        }
+        started = time.perf_counter()
+        with progress_reporter(print_progress):
+            counts = await run_ingestion(run_id, concurrency)
+        print(file=sys.stderr)
+        print(f"{counts} in {time.perf_counter() - started:.1f}s")
+        await show_status(run_id)
+    finally:
+        await close_db_pool()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", help="Directory, manifest or URL list")
+    parser.add_argument("--notebook", help="Notebook to add the sources to")
+    parser.add_argument(
+        "--transformation",
+        action="append",
+        default=[],
+        help="Transformation to apply to every source; repeat for several",
+    )
+    parser.add_argument(
+        "--no-embed",
+        dest="embed",
+        action="store_false",
+        help="Do not embed the sources",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Ingest duplicates of existing sources"
+    )
+    parser.add_argument("--extract", type=int, help="Concurrent extractions")
+    parser.add_argument("--embed-concurrency", type=int, help="Concurrent embeddings")
+    parser.add_argument("--transform", type=int, help="Concurrent transformations")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume an existing run")
+    parser.add_argument("--status", metavar="RUN_ID", help="Show the status of a run")
+    args = parser.parse_args()
+    if not (args.path or args.resume or args.status):
+        parser.error("a path, --resume or --status is required")
+    if args.path and not args.notebook:
+        parser.error("--notebook is required to ingest a path")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,62 @@
+from open_notebook.graphs.ask import dedupe_results
+
+
+def result(id, similarity, matches=None):
+    return dict(id=id, similarity=similarity, matches=matches)
+
+
+def test_dedupe_gives_each_chunk_to_the_best_match():
+    branches = [
+        [result("source:a", 0.6, ["one", "two"])],
+        [result("source:a", 0.9, ["two", "three"])],
+    ]
+    deduped, removed = dedupe_results(branches)
+    assert deduped == [
+        [result("source:a", 0.6, ["one"])],
+        [result("source:a", 0.9, ["two", "three"])],
+    ]
+    assert removed == 1
+
+
+def test_dedupe_ties_go_to_the_earliest_search():
+    branches = [
+        [result("source:a", 0.8, ["one"])],
+        [result("source:a", 0.8, ["one"])],
+        [result("source:a", 0.8, ["one"])],
+    ]
+    deduped, removed = dedupe_results(branches)
+    assert deduped == [[result("source:a", 0.8, ["one"])], [], []]
+    assert removed == 2
+
+
+def test_dedupe_drops_results_left_without_chunks():
+    branches = [
+        [result("note:a", 0.5, ["text"]), result("note:b", 0.4, ["other"])],
+        [result("note:a", 0.7, ["text"])],
+    ]
+    deduped, removed = dedupe_results(branches)
+    assert deduped == [
+        [result("note:b", 0.4, ["other"])],
+        [result("note:a", 0.7, ["text"])],
+    ]
+    assert removed == 1
+
+
+def test_dedupe_results_without_matches_are_deduplicated_by_id():
+    branches = [
+        [result("source:a", 0.3), result("source:b", 0.9, [])],
+        [result("source:a", 0.5), result("source:b", 0.2, [])],
+    ]
+    deduped, removed = dedupe_results(branches)
+    assert deduped == [
+        [result("source:b", 0.9, [])],
+        [result("source:a", 0.5)],
+    ]
+    assert removed == 2
+
+
+def test_dedupe_keeps_distinct_results_and_empty_searches():
+    branches = [[result("source:a", 0.5, ["x"])], [], [result("source:b", 0.5, ["x"])]]
+    deduped, removed = dedupe_results(branches)
+    assert deduped == branches
+    assert removed == 0
@@ -0,0 +1,14 @@
+import asyncio
+
+import pytest
+
+from open_notebook.domain.notebook import Note
+from open_notebook.exceptions import InvalidInputError
+
+
+def test_partial_objects_cannot_be_saved():
+    note = Note._from_partial({"id": "note:a", "title": "Title"})
+    assert note.title == "Title" and note.content is None
+    note.title = "Changed"
+    with pytest.raises(InvalidInputError, match="note:a"):
+        asyncio.run(note.save())
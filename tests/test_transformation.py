@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from open_notebook.graphs import transformation
+
+
+@pytest.fixture
+def combines(monkeypatch):
+    calls = []
+
+    async def token_count(text):
+        return len(text)
+
+    async def combine(state, partials, config):
+        calls.append(list(partials))
+        return "+".join(partials)
+
+    async def finish(state, output):
+        return {"output": output}
+
+    monkeypatch.setattr(transformation, "atoken_count", token_count)
+    monkeypatch.setattr(transformation, "_combine", combine)
+    monkeypatch.setattr(transformation, "_finish", finish)
+    return calls
+
+
+def reduce(partials, section_tokens):
+    state = {
+        "transformation": SimpleNamespace(section_tokens=section_tokens),
+        "partials": list(enumerate(partials)),
+    }
+    return asyncio.run(transformation.reduce_sections(state, {}))["output"]
+
+
+def test_reduce_combines_in_one_call_when_partials_fit(combines):
+    assert reduce(["a", "b", "c"], section_tokens=10) == "a+b+c"
+    assert combines == [["a", "b", "c"]]
+
+
+def test_reduce_groups_partials_that_do_not_fit(combines):
+    assert reduce(["aa", "bb", "cc", "dd"], section_tokens=4) == "aa+bb+cc+dd"
+    assert combines == [["aa", "bb"], ["cc", "dd"], ["aa+bb", "cc+dd"]]
+
+
+def test_reduce_pairs_partials_larger_than_a_section(combines):
+    reduce(["aaaa", "bbbb", "cccc", "dddd", "eeee"], section_tokens=3)
+    assert max(len(call) for call in combines) == 2
+    assert len(combines[-1]) == 2
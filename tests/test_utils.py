@@ -0,0 +1,148 @@
+import re
+
+import pytest
+
+from open_notebook import utils
+from open_notebook.utils import ThinkingStreamFilter, TokenTextSplitter, normalize_url
+
+
+class WordEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per word."""
+
+    def encode_ordinary(self, text):
+        return re.findall(r"\s*\S+|\s+", text)
+
+    def decode_tokens_bytes(self, tokens):
+        return [token.encode("utf-8") for token in tokens]
+
+    def decode_with_offsets(self, tokens):
+        offsets, position = [], 0
+        for token in tokens:
+            offsets.append(position)
+            position += len(token)
+        return "".join(tokens), offsets
+
+
+@pytest.fixture
+def words(monkeypatch):
+    monkeypatch.setattr(utils, "get_encoding", lambda name: WordEncoding())
+
+
+def word_count(text):
+    return len(text.split())
+
+
+def test_splitter_keeps_chunks_within_chunk_size(words):
+    text = " ".join(f"word{i}" for i in range(100))
+    chunks = TokenTextSplitter(chunk_size=10).split_text(text)
+    assert all(word_count(chunk) <= 10 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_splitter_prefers_paragraph_boundaries(words):
+    first = " ".join(["alpha"] * 6)
+    second = " ".join(["beta"] * 6)
+    chunks = TokenTextSplitter(chunk_size=8).split_text(f"{first}\n\n{second}")
+    assert chunks == [first, second]
+
+
+def test_splitter_overlaps_consecutive_chunks(words):
+    text = " ".join(f"w{i}" for i in range(30))
+    chunks = TokenTextSplitter(chunk_size=10, chunk_overlap=3).split_text(text)
+    assert len(chunks) > 1
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.split()[-3:] == current.split()[:3]
+
+
+def test_splitter_handles_non_ascii_text(words):
+    text = " ".join(["café"] * 12)
+    chunks = TokenTextSplitter(chunk_size=5).split_text(text)
+    assert all(word_count(chunk) <= 5 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_splitter_cuts_on_tokens_without_separators(words):
+    chunks = TokenTextSplitter(chunk_size=4, separators=[""]).split_text(
+        "a b c d e f g h i"
+    )
+    assert chunks == ["a b c d", "e f g h", "i"]
+
+
+def test_splitter_returns_nothing_for_empty_text(words):
+    assert TokenTextSplitter().split_text("") == []
+
+
+def test_splitter_rejects_overlap_larger_than_chunk_size():
+    with pytest.raises(ValueError):
+        TokenTextSplitter(chunk_size=5, chunk_overlap=6)
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("HTTPS://WWW.Example.com/Page", "https://example.com/Page"),
+        ("https://example.com:443/a", "https://example.com/a"),
+        ("http://example.com:80/a", "http://example.com/a"),
+        ("https://example.com:8443/a", "https://example.com:8443/a"),
+        ("https://example.com/a#section", "https://example.com/a"),
+        ("https://example.com/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+        (
+            "https://example.com/a?utm_source=x&UTM_Medium=y&fbclid=1&gclid=2"
+            "&mc_cid=3&mc_eid=4&id=7",
+            "https://example.com/a?id=7",
+        ),
+    ],
+)
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_keeps_what_can_change_the_page():
+    assert normalize_url("http://example.com/a") != normalize_url(
+        "https://example.com/a"
+    )
+    assert normalize_url("https://example.com/a/") != normalize_url(
+        "https://example.com/a"
+    )
+    assert normalize_url("https://example.com/?ref=home") == (
+        "https://example.com/?ref=home"
+    )
+
+
+def stream(chunks):
+    thinking = ThinkingStreamFilter()
+    return "".join(thinking.feed(chunk) for chunk in chunks) + thinking.flush()
+
+
+def test_thinking_filter_removes_think_blocks():
+    assert stream(["<think>plan</think>Answer"]) == "Answer"
+    assert stream(["Before <think>a</think>middle<think>b</think> after"]) == (
+        "Before middle after"
+    )
+
+
+def test_thinking_filter_handles_tags_split_across_chunks():
+    chunks = ["Hi <th", "ink>hidden</th", "in", "k> there"]
+    assert stream(chunks) == "Hi  there"
+    # Split at every character
+    assert stream(list("<think>x</think>answer")) == "answer"
+
+
+def test_thinking_filter_holds_back_only_possible_tags():
+    thinking = ThinkingStreamFilter()
+    assert thinking.feed("a <") == "a "
+    assert thinking.feed("b") == "<b"
+    assert thinking.feed("1 < 2") == "1 < 2"
+
+
+def test_thinking_filter_flush_releases_a_partial_tag():
+    thinking = ThinkingStreamFilter()
+    assert thinking.feed("ends with <thi") == "ends with "
+    assert thinking.flush() == "<thi"
+
+
+def test_thinking_filter_flush_inside_think_block_drops_it():
+    thinking = ThinkingStreamFilter()
+    assert thinking.feed("Answer<think>never clos") == "Answer"
+    assert thinking.flush() == ""
+    assert thinking.feed("next") == "next"